@@ -0,0 +1,6 @@
+# Benchmark of the csv2pt ingest, on synthetic transect data files
+#   synth -- generator of synthetic transect data trees
+#   bench -- stage timings, peak memory and baseline comparison
+#   parity -- comparison of csv2pt parsing and validation with a baseline version
+#   arcpy_stub -- stand-in for arcpy, so the benchmark runs without ArcGIS
+# Run from the tools directory:  python -m benchmark --help
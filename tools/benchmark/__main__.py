@@ -0,0 +1,5 @@
+import sys
+
+from benchmark import bench
+
+sys.exit(bench.main())
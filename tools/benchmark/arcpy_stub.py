@@ -0,0 +1,69 @@
+# arcpy_stub.py
+# 10/16/2026
+# Stand-in for the few arcpy functions csv2pt calls, so the benchmark runs without ArcGIS (i.e. on Linux)
+# Only used by the benchmark.  The feature class writer keeps the row count of each feature class
+# instead of writing it, so the write stage measures the projection and array handling in csv2pt only.
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+
+import sys
+import types
+import numpy as np
+
+# Vegetation codes returned for any veg code table (set by install)
+VEG_CODES = []
+
+# Feature classes "written":  path (key) and number of rows (value)
+FEATURE_CLASSES = {}
+
+# Messages from AddMessage
+MESSAGES = []
+
+
+class SpatialReference(object):
+    def __init__(self, item=None):
+        self.factoryCode = item
+
+
+def AddMessage(message):
+    MESSAGES.append(message)
+
+
+def Exists(dataset):
+    return dataset in FEATURE_CLASSES
+
+
+def Delete_management(in_data, data_type=None):
+    FEATURE_CLASSES.pop(in_data, None)
+
+
+def Append_management(inputs, target, schema_type=None):
+    FEATURE_CLASSES[target] = FEATURE_CLASSES.get(target, 0) + FEATURE_CLASSES.get(inputs, 0)
+
+
+def NumPyArrayToFeatureClass(in_array, out_table, shape_fields, spatial_reference=None):
+    # Touch the shape fields, as the real function would read them
+    for field in shape_fields:
+        np.asarray(in_array[field]).sum()
+    FEATURE_CLASSES[out_table] = len(in_array)
+
+
+def TableToNumPyArray(in_table, field_names, skip_nulls=False):
+    field = field_names if isinstance(field_names, str) else field_names[0]
+    return np.array([(code,) for code in VEG_CODES], dtype=[(field, 'S50')])
+
+
+def install(veg_codes):
+    """ Install the stand-in as the arcpy module, with a list of vegetation codes for the veg code table
+    Must be called before csv2pt is imported
+    """
+    VEG_CODES[:] = list(veg_codes)
+    arcpy = types.ModuleType('arcpy')
+    da = types.ModuleType('arcpy.da')
+    for name in ('SpatialReference', 'AddMessage', 'Exists', 'Delete_management', 'Append_management'):
+        setattr(arcpy, name, globals()[name])
+    for name in ('NumPyArrayToFeatureClass', 'TableToNumPyArray'):
+        setattr(da, name, globals()[name])
+    arcpy.da = da
+    sys.modules['arcpy'] = arcpy
+    sys.modules['arcpy.da'] = da
+    return arcpy
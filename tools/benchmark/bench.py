@@ -0,0 +1,285 @@
+# bench.py
+# 10/16/2026
+# Benchmark the csv2pt ingest stages on a synthetic transect data tree (see synth)
+# Reports rows per second and peak memory for each stage, and compares them with a baseline JSON file.
+# Runs without ArcGIS:  arcpy is replaced by a stand-in (see arcpy_stub) before csv2pt is imported.
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+#
+# Usage (from the tools directory):
+#   python -m benchmark --sites 10 --points 2000
+#   python -m benchmark --save-baseline benchmark/baseline.json
+#   python -m benchmark --baseline benchmark/baseline.json
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from . import synth
+from . import arcpy_stub
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+
+# Stages of the ingest, in pipeline order
+STAGES = ['catalog', 'parse', 'validate', 'dataframe', 'convert', 'nparray', 'compact', 'write_fc', 'main']
+
+# Allowed drop in rows per second before a stage is reported as a regression
+TOLERANCE = 0.2
+# Stages that take less time than this (seconds) are too noisy to report as a regression
+MIN_SECONDS = 0.05
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def rss_bytes():
+    """ Resident memory of this process in bytes (0 where /proc is not available, i.e. Windows) """
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * PAGE_SIZE
+    except (IOError, OSError):
+        return 0
+
+
+def import_csv2pt(veg_codes):
+    # Import csv2pt with the arcpy stand-in
+    arcpy_stub.install(veg_codes)
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    import csv2pt
+    return csv2pt
+
+
+class MemorySampler(threading.Thread):
+    """ Samples the resident memory of the process in a background thread, for the peak memory of each stage
+
+    Properties:
+    interval -- seconds between samples
+    peak -- highest resident memory (bytes) since the last reset
+
+    """
+
+    def __init__(self, interval=0.005):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, rss_bytes())
+            time.sleep(self.interval)
+
+    def reset(self):
+        """ Start a new peak, return the current resident memory """
+        self.peak = rss_bytes()
+        return self.peak
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class StageTimer(object):
+    """ Accumulates the time, rows and peak memory of each stage
+
+    Properties:
+    sampler -- MemorySampler object
+    stages -- dictionary of stage name (key) and dictionary of seconds, rows and peak_mb (value)
+
+    """
+
+    def __init__(self, sampler):
+        self.sampler = sampler
+        self.stages = {}
+
+    def run(self, name, func, *args):
+        """ Run a stage function, adding its time and peak memory (above the memory at the start) to the stage """
+        start_rss = self.sampler.reset()
+        t0 = time.time()
+        result = func(*args)
+        elapsed = time.time() - t0
+        peak = max(self.sampler.peak, rss_bytes()) - start_rss
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'rows': 0, 'peak_mb': 0.0})
+        stage['seconds'] += elapsed
+        stage['peak_mb'] = max(stage['peak_mb'], peak / 1048576.0)
+        return result
+
+    def add_rows(self, name, rows):
+        self.stages[name]['rows'] += rows
+
+    def results(self):
+        """ Dictionary of stage name (key) and seconds, rows, rows_per_sec and peak_mb (value) """
+        _results = {}
+        for name, stage in self.stages.items():
+            _results[name] = dict(stage)
+            _results[name]['rows_per_sec'] = stage['rows'] / stage['seconds'] if stage['seconds'] else None
+            if not rss_bytes():
+                _results[name]['peak_mb'] = None
+        return _results
+
+
+def run_stages(csv2pt, in_dir, sites_file, veg_list, timer, out_gdb):
+    """ Run the csv2pt stages one file at a time, in the same order as csv2pt.main """
+    site_codes = csv2pt.make_sitelist(sites_file)
+    catalog = timer.run('catalog', csv2pt.Catalog, in_dir)
+    csv_dirs = [csv2pt.CsvPath(site, in_dir, catalog) for site in site_codes]
+    site_files = timer.run('catalog', lambda: [(csvDir, csvDir.tdfiles) for csvDir in csv_dirs])
+    n_valid = 0
+    for csvDir, tdfiles in site_files:
+        for tdfile in tdfiles:
+            file_path = csvDir.file_path(tdfile)
+            csvSource = csv2pt.CsvSource(file_path, veg_list)
+            timer.run('parse', lambda: csvSource.all_columns)
+            rows = csvSource.n_rows
+            timer.add_rows('parse', rows)
+            timer.add_rows('catalog', rows)
+            valid = timer.run('validate', lambda: csvSource.valid)
+            timer.add_rows('validate', rows)
+            if not valid:
+                continue
+            n_valid += 1
+            timer.run('dataframe', lambda: csvSource.dataframe)
+            timer.add_rows('dataframe', rows)
+            transectData = timer.run('convert', csv2pt.CsvData, csvSource)
+            timer.add_rows('convert', rows)
+            nparray = timer.run('nparray', lambda: transectData.nparray)
+            timer.add_rows('nparray', rows)
+            timer.run('compact', lambda: transectData.compact_nparray)
+            timer.add_rows('compact', rows)
+            site_visit = csv2pt.SiteVisit(*tdfile.split('_')[0:3])
+            fc_path = os.path.join(out_gdb, site_visit.fc)
+            timer.run('write_fc', csv2pt.PointFC(nparray, fc_path).create_fc)
+            timer.add_rows('write_fc', rows)
+    return n_valid
+
+
+def run_main(csv2pt, in_dir, sites_file, timer, out_gdb, err_dir, workers):
+    # End to end run of csv2pt.main
+    arcpy_stub.FEATURE_CLASSES.clear()
+    timer.run('main', csv2pt.main, in_dir, sites_file, 'veg_codes', out_gdb, err_dir, workers)
+    timer.add_rows('main', sum(arcpy_stub.FEATURE_CLASSES.values()))
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """ List of (stage, rows per second, baseline rows per second, ratio, regression flag) """
+    comparison = []
+    for name in STAGES:
+        if name in results and name in baseline.get('stages', {}):
+            rate = results[name]['rows_per_sec']
+            base_rate = baseline['stages'][name]['rows_per_sec']
+            if rate and base_rate:
+                ratio = rate / base_rate
+                regression = ratio < 1.0 - tolerance and results[name]['seconds'] >= MIN_SECONDS
+                comparison.append((name, rate, base_rate, ratio, regression))
+    return comparison
+
+
+def report(results, comparison=None):
+    # Print a table of the stage results, and the comparison with the baseline
+    print('{0:<10} {1:>10} {2:>10} {3:>14} {4:>10}'.format('stage', 'rows', 'seconds', 'rows/sec', 'peak MB'))
+    for name in STAGES:
+        if name in results:
+            stage = results[name]
+            peak = '' if stage['peak_mb'] is None else '{0:.1f}'.format(stage['peak_mb'])
+            print('{0:<10} {1:>10} {2:>10.3f} {3:>14.0f} {4:>10}'.format(
+                name, stage['rows'], stage['seconds'], stage['rows_per_sec'] or 0, peak))
+    if comparison:
+        print('')
+        print('{0:<10} {1:>14} {2:>14} {3:>8}'.format('stage', 'rows/sec', 'baseline', 'ratio'))
+        for name, rate, base_rate, ratio, regression in comparison:
+            print('{0:<10} {1:>14.0f} {2:>14.0f} {3:>8.2f} {4}'.format(
+                name, rate, base_rate, ratio, 'REGRESSION' if regression else ''))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmark',
+                                     description='Benchmark the csv2pt ingest stages on synthetic transect data')
+    parser.add_argument('--work-dir', help='directory for the synthetic data (default: a temporary directory)')
+    parser.add_argument('--in-dir', help='existing transect data directory with sites.txt, instead of synthetic data')
+    parser.add_argument('--sites', type=int, default=4, help='number of sites')
+    parser.add_argument('--years', default='2014', help='comma separated survey years')
+    parser.add_argument('--visits', type=int, default=1, help='site visits per site and year')
+    parser.add_argument('--transects', type=int, default=10, help='transects per file')
+    parser.add_argument('--points', type=int, default=1000, help='points per transect')
+    parser.add_argument('--veg-columns', default=','.join(synth.VEG_COLUMNS), help='comma separated veg columns')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='fraction of malformed rows')
+    parser.add_argument('--dupe-rate', type=float, default=0.001, help='fraction of duplicate time stamps')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--main', action='store_true', help='also time an end to end run of csv2pt.main')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes for the csv2pt.main run')
+    parser.add_argument('--baseline', help='baseline JSON file to compare with')
+    parser.add_argument('--save-baseline', help='write the results to this baseline JSON file')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed drop in rows/sec')
+    parser.add_argument('--keep', action='store_true', help='keep the synthetic data')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = synth.SynthConfig(sites=args.sites, years=[int(y) for y in args.years.split(',')],
+                               visits=args.visits, transects=args.transects, points=args.points,
+                               veg_columns=args.veg_columns.split(','), malformed_rate=args.malformed_rate,
+                               dupe_rate=args.dupe_rate, seed=args.seed)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='csv2pt_bench_')
+    in_dir = args.in_dir or os.path.join(work_dir, 'site_folders')
+    err_dir = os.path.join(work_dir, 'logs')
+    for path in (in_dir, err_dir):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+    if not args.in_dir:
+        t0 = time.time()
+        files = synth.make_tree(in_dir, config)
+        print('Generated {0} files, {1} rows in {2:.1f} seconds: {3}'.format(
+            len(files), sum(files.values()), time.time() - t0, in_dir))
+    sites_file = os.path.join(in_dir, synth.SITES_FILE)
+
+    csv2pt = import_csv2pt(config.veg_columns)
+    sampler = MemorySampler()
+    sampler.start()
+    timer = StageTimer(sampler)
+    try:
+        run_stages(csv2pt, in_dir, sites_file, config.veg_columns, timer, os.path.join(work_dir, 'bench.gdb'))
+        if args.main:
+            run_main(csv2pt, in_dir, sites_file, timer, os.path.join(work_dir, 'bench_main.gdb'), err_dir,
+                     args.workers)
+    finally:
+        sampler.stop()
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = timer.results()
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, 'r') as fh:
+            baseline = json.load(fh)
+        comparison = compare(results, baseline, args.tolerance)
+        if baseline.get('config') != (None if args.in_dir else json.loads(json.dumps(config.as_dict()))):
+            print('Note: the baseline was made with different data settings')
+    report(results, comparison)
+
+    if args.save_baseline:
+        baseline = {
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'config': None if args.in_dir else config.as_dict(),
+            'stages': results,
+        }
+        with open(args.save_baseline, 'w') as fh:
+            json.dump(baseline, fh, indent=1, sort_keys=True)
+        print('Baseline written to {0}'.format(args.save_baseline))
+
+    return 1 if comparison and any(c[4] for c in comparison) else 0
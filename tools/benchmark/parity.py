@@ -0,0 +1,237 @@
+# parity.py
+# 10/16/2026
+# Check that csv2pt parses, validates and converts transect data files the same way as a baseline version
+# Runs CsvSource and CsvData of the current csv2pt and of a baseline csv2pt (from git, or a file) on a small
+# synthetic tree (see synth) and on hand-written edge cases, and compares the validation lists and the fields
+# of the structured NumPy arrays.  Edge cases where the behavior was changed on purpose give the expected
+# results of the current version instead.
+# Runs without ArcGIS:  arcpy is replaced by a stand-in (see arcpy_stub) before csv2pt is imported.
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+#
+# Usage (from the tools directory):
+#   python -m benchmark.parity
+#   python -m benchmark.parity --baseline-rev 265c181
+#   python -m benchmark.parity --baseline-file /path/to/old/csv2pt.py --keep
+
+import os
+import sys
+import csv
+import imp
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+from . import synth
+from . import arcpy_stub
+from . import bench
+
+# Commit of the csv2pt version before the parsing and validation changes
+BASELINE_REV = '265c181'
+
+# Validation lists of CsvSource that are compared
+SOURCE_PROPERTIES = ['valid', 'missing_columns', 'veg_columns', 'lat_errors', 'lon_errors', 'time_errors',
+                     'date_errors']
+
+# Edge case files:  header and rows written before and after the edge row
+VEG_COLUMNS = ['Zm', 'Phyllo']
+HEADER = synth.BASE_COLUMNS + VEG_COLUMNS
+GOOD_ROWS = [
+    ['CORE001', '1', '6/1/2014', '8:00:00 AM', '-1.20', '-1.25', '1', "47d12.0000' N", "122d30.0000' W", '1', '0'],
+    ['CORE001', '1', '6/1/2014', '8:00:01 AM', '-1.30', '-1.35', '1', "47d12.0010' N", "122d30.0010' W", '1', '1'],
+    ['CORE001', '2', '6/1/2014', '8:10:00 AM', '-2.10', '-2.05', '0', "47d12.1000' N", "122d30.1000' W", '0', '0'],
+    ['CORE001', '2', '6/1/2014', '8:10:01 AM', '-2.20', '-2.15', '1', "47d12.1010' N", "122d30.1010' W", '0', '1'],
+]
+
+# Edge rows:  (name, column, value, expected) -- the edge row is GOOD_ROWS[1] with the column set to the value
+# (csv row 2 of the file).  expected is None where the current version must match the baseline,
+# or a dictionary of the CsvSource values the current version must give (a change on purpose)
+EDGE_ROWS = [
+    ('padded_date', 'date', ' 6/1/2014 ', None),
+    ('padded_time', 'time', ' 8:00:01 AM', None),
+    ('time_12am', 'time', '12:00:00 AM', None),
+    ('time_12pm', 'time', '12:00:00PM', None),
+    ('time_24h', 'time', '13:00:00', None),
+    ('hour_24', 'time', '24:00:00', None),
+    ('hour_13_pm', 'time', '13:00:00 PM', None),
+    ('minute_60', 'time', '8:60:00', None),
+    ('feb_29_2014', 'date', '2/29/2014', None),
+    ('feb_29_2016', 'date', '2/29/2016', None),
+    ('month_13', 'date', '13/1/2014', None),
+    ('dash_date', 'date', '6-1-2014', None),
+    ('two_digit_year', 'date', '6/1/14', {'valid': False, 'date_errors': [2]}),
+    ('year_0214', 'date', '6/1/0214', {'valid': False, 'date_errors': [2]}),
+    ('year_2214', 'date', '6/1/2214', {'valid': False, 'date_errors': [2]}),
+    ('lat_integer_minutes', 'latitude', "47d12' N", None),
+    ('lat_lowercase_dir', 'latitude', "47d12.0010' n", None),
+    ('lat_no_quote', 'latitude', "47d12.0010 N", None),
+    ('lat_blank', 'latitude', '', None),
+    ('lon_no_space', 'lon', "122d30.0010'W", None),
+    ('depth_blank', 'BSdepth_interp', '', None),
+    ('depth_na', 'BSdepth_interp', 'NA', None),
+    ('video_blank', 'video', '', None),
+    ('veg_blank', 'Zm', '', None),
+    ('site_mixed_case', 'Site', 'Core001', None),
+    ('duplicate_time', 'time', '8:00:00 AM', None),
+]
+
+# Edge files:  (name, header, rows, expected) -- whole files that are malformed
+EDGE_FILES = [
+    ('header_only', HEADER, [], {'valid': False}),
+    ('missing_column', [col for col in HEADER if col != 'video'], [row[:6] + row[7:] for row in GOOD_ROWS], None),
+    ('no_veg_columns', synth.BASE_COLUMNS, [row[:len(synth.BASE_COLUMNS)] for row in GOOD_ROWS], None),
+    ('blank_line', HEADER, GOOD_ROWS[:2] + [[]] + GOOD_ROWS[2:], None),
+]
+
+
+def load_baseline(baseline_file, baseline_rev, work_dir):
+    """ Import the baseline csv2pt as the module csv2pt_baseline, from a file or from a git commit """
+    if not baseline_file:
+        repo_dir = os.path.dirname(bench.SCRIPTS_DIR)
+        source = subprocess.check_output(['git', 'show', '{0}:tools/scripts/csv2pt.py'.format(baseline_rev)],
+                                         cwd=repo_dir)
+        baseline_file = os.path.join(work_dir, 'csv2pt_baseline.py')
+        with open(baseline_file, 'wb') as fh:
+            fh.write(source)
+    return imp.load_source('csv2pt_baseline', baseline_file)
+
+
+def write_csv(file_path, header, rows):
+    with open(file_path, 'wb') as fh:
+        writer = csv.writer(fh, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def make_edge_files(edge_dir):
+    """ Write the edge case files, return a list of (name, file path, expected) """
+    if not os.path.isdir(edge_dir):
+        os.makedirs(edge_dir)
+    cases = []
+    for i, (name, column, value, expected) in enumerate(EDGE_ROWS):
+        rows = [list(row) for row in GOOD_ROWS]
+        rows[1][HEADER.index(column)] = value
+        file_path = os.path.join(edge_dir, 'core001_2014_{0:02d}_TD.csv'.format(i + 1))
+        write_csv(file_path, HEADER, rows)
+        cases.append((name, file_path, expected))
+    for i, (name, header, rows, expected) in enumerate(EDGE_FILES):
+        file_path = os.path.join(edge_dir, 'core002_2014_{0:02d}_TD.csv'.format(i + 1))
+        write_csv(file_path, header, rows)
+        cases.append((name, file_path, expected))
+    return cases
+
+
+def outcome(csv2pt, file_path, veg_codes):
+    """ Dictionary of the CsvSource validation values and the CsvData structured array ('nparray') of a file
+    An exception is recorded as 'exception' (type and message), with the values found before it
+    """
+    _outcome = {}
+    try:
+        csvSource = csv2pt.CsvSource(file_path, veg_codes)
+        for name in SOURCE_PROPERTIES:
+            value = getattr(csvSource, name)
+            _outcome[name] = list(value) if isinstance(value, (list, tuple)) else value
+        if csvSource.valid:
+            _outcome['nparray'] = csv2pt.CsvData(csvSource).nparray
+    except Exception as e:
+        _outcome['exception'] = '{0}: {1}'.format(type(e).__name__, e)
+    return _outcome
+
+
+def same_values(a, b):
+    # Equal arrays, with NaN equal to NaN
+    if a.shape != b.shape:
+        return False
+    if a.dtype.kind == 'f' and b.dtype.kind == 'f':
+        return bool(((a == b) | (np.isnan(a) & np.isnan(b))).all())
+    if a.dtype.kind == 'M' and b.dtype.kind == 'M':
+        return bool((a.astype('<M8[us]').view(np.int64) == b.astype('<M8[us]').view(np.int64)).all())
+    return bool((a == b).all())
+
+
+def differences(current, baseline):
+    """ List of differences (strings) between the outcomes of the current and the baseline csv2pt """
+    _differences = []
+    for name in SOURCE_PROPERTIES + ['exception']:
+        if current.get(name) != baseline.get(name):
+            _differences.append('{0}: {1!r} (baseline {2!r})'.format(name, current.get(name), baseline.get(name)))
+    if 'nparray' in current and 'nparray' in baseline:
+        array, base_array = current['nparray'], baseline['nparray']
+        if len(array) != len(base_array):
+            _differences.append('nparray rows: {0} (baseline {1})'.format(len(array), len(base_array)))
+        else:
+            for field in base_array.dtype.names:
+                if field not in array.dtype.names:
+                    _differences.append('nparray field missing: {0}'.format(field))
+                elif not same_values(array[field], base_array[field]):
+                    rows = np.flatnonzero(array[field] != base_array[field])[:5].tolist()
+                    _differences.append('nparray field {0} differs, i.e. rows {1}'.format(field, rows))
+    return _differences
+
+
+def unexpected(current, expected):
+    """ List of the expected CsvSource values (for a change on purpose) that the current outcome does not give """
+    return ['{0}: {1!r} (expected {2!r})'.format(name, current.get(name), value)
+            for name, value in sorted(expected.items()) if current.get(name) != value]
+
+
+def check(csv2pt, csv2pt_baseline, cases, veg_codes):
+    """ Compare the current and the baseline csv2pt on a list of (name, file path, expected), print the results
+    :return: number of cases that failed
+    """
+    n_failed = 0
+    for name, file_path, expected in cases:
+        current = outcome(csv2pt, file_path, veg_codes)
+        baseline = outcome(csv2pt_baseline, file_path, veg_codes)
+        if expected is None:
+            problems = differences(current, baseline)
+            status = 'FAIL' if problems else 'same'
+        else:
+            problems = unexpected(current, expected)
+            status = 'FAIL' if problems else 'changed'
+            if not problems:
+                problems = ['baseline: ' + '; '.join('{0}={1!r}'.format(key, baseline[key])
+                                                    for key in sorted(baseline) if key != 'nparray')]
+        n_failed += status == 'FAIL'
+        print('{0:<8} {1}{2}'.format(status, name, '' if current.get('valid') else ' (invalid)'))
+        for problem in problems:
+            print('         {0}'.format(problem))
+    return n_failed
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmark.parity',
+                                     description='Compare csv2pt parsing and validation with a baseline version')
+    parser.add_argument('--baseline-rev', default=BASELINE_REV, help='git commit of the baseline csv2pt')
+    parser.add_argument('--baseline-file', help='baseline csv2pt.py file, instead of a git commit')
+    parser.add_argument('--work-dir', help='directory for the test data (default: a temporary directory)')
+    parser.add_argument('--sites', type=int, default=5, help='number of sites of the synthetic tree')
+    parser.add_argument('--points', type=int, default=200, help='points per transect of the synthetic tree')
+    parser.add_argument('--seed', type=int, default=3, help='random seed of the synthetic tree')
+    parser.add_argument('--keep', action='store_true', help='keep the test data')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = synth.SynthConfig(sites=args.sites, transects=3, points=args.points, veg_columns=VEG_COLUMNS,
+                               malformed_rate=0.001, dupe_rate=0.01, null_rate=0.01, seed=args.seed)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='csv2pt_parity_')
+    try:
+        tree_dir = os.path.join(work_dir, 'site_folders')
+        cases = [(os.path.basename(path), path, None) for path in sorted(synth.make_tree(tree_dir, config))]
+        cases += make_edge_files(os.path.join(work_dir, 'edge_cases'))
+        csv2pt = bench.import_csv2pt(VEG_COLUMNS)
+        csv2pt_baseline = load_baseline(args.baseline_file, args.baseline_rev, work_dir)
+        n_failed = check(csv2pt, csv2pt_baseline, cases, VEG_COLUMNS)
+    finally:
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print('{0} of {1} cases differ from the baseline'.format(n_failed, len(cases)))
+    return 1 if n_failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+# synth.py
+# 10/16/2026
+# Generate synthetic SVMP transect data files for benchmarking csv2pt
+# Writes a directory tree like the MRC deliveries:  in_dir/sitecode/sitecode_YYYY_##_TD.csv
+# and a site list file (sites.txt) in in_dir.
+# Transects run offshore from a random start point near Puget Sound, one point per second,
+# with depth, video and vegetation values that vary along the transect.
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+
+import os
+import csv
+import datetime
+import numpy as np
+
+# Vegetation columns written to the files by default
+VEG_COLUMNS = ['Zm', 'Phyllo', 'undiff', 'Zj', 'other']
+
+# Columns written before the vegetation columns (same names as the MRC files)
+BASE_COLUMNS = ['Site', 'trk', 'date', 'time', 'BSdepth', 'BSdepth_interp', 'video', 'latitude', 'lon']
+
+# Site code prefixes, numbered like the SVMP sites (e.g. core001, flats12, cps1234)
+SITE_PREFIXES = [('core', 3), ('flats', 2), ('cps', 4), ('nps', 4), ('swh', 4)]
+
+SITES_FILE = 'sites.txt'
+
+
+class SynthConfig(object):
+    """ Represents the settings for a synthetic transect data tree
+
+    Properties:
+    sites -- number of sites
+    years -- list of survey years
+    visits -- number of site visits (files) per site and year
+    transects -- number of transects per file
+    points -- number of points per transect
+    veg_columns -- list of vegetation columns
+    malformed_rate -- fraction of rows with a malformed latitude, longitude, date or time value
+        (any malformed row makes a file invalid, so the later stages skip it)
+    dupe_rate -- fraction of rows with the same time stamp as the row before
+    null_rate -- fraction of blank depth, video and vegetation values
+    seed -- seed for the random number generator
+
+    """
+
+    def __init__(self, sites=4, years=(2014,), visits=1, transects=10, points=1000, veg_columns=None,
+                 malformed_rate=0.0, dupe_rate=0.001, null_rate=0.001, seed=1):
+        self.sites = sites
+        self.years = list(years)
+        self.visits = visits
+        self.transects = transects
+        self.points = points
+        self.veg_columns = list(veg_columns or VEG_COLUMNS)
+        self.malformed_rate = malformed_rate
+        self.dupe_rate = dupe_rate
+        self.null_rate = null_rate
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+def site_codes(n_sites):
+    """ List of site codes, cycling through the site code prefixes
+
+    >>> site_codes(3)
+    ['core001', 'flats01', 'cps0001']
+    """
+    _codes = []
+    for i in range(n_sites):
+        prefix, digits = SITE_PREFIXES[i % len(SITE_PREFIXES)]
+        _codes.append('{0}{1:0{2}d}'.format(prefix, i // len(SITE_PREFIXES) + 1, digits))
+    return _codes
+
+
+def deg_min(values, positive, negative):
+    """ Decimal degrees formatted like the MRC files:  ##d##.####' Dir  (i.e. 48d33.8342' N)
+
+    >>> deg_min(np.array([47.2, -122.5]), 'N', 'S')
+    ["47d12.0000' N", "122d30.0000' S"]
+    """
+    abs_values = np.abs(values)
+    degrees = np.floor(abs_values).astype(int)
+    minutes = (abs_values - degrees) * 60.0
+    return ["{0}d{1:07.4f}' {2}".format(d, m, positive if v >= 0 else negative)
+            for d, m, v in zip(degrees.tolist(), minutes.tolist(), values.tolist())]
+
+
+def time_strings(seconds):
+    """ Seconds after midnight formatted like the MRC files:  h:mm:ss AM/PM
+
+    >>> time_strings([0, 43200, 45296])
+    ['12:00:00 AM', '12:00:00 PM', '12:34:56 PM']
+    """
+    _times = []
+    for s in seconds:
+        h, m, sec = s // 3600 % 24, s // 60 % 60, s % 60
+        _times.append('{0}:{1:02d}:{2:02d} {3}'.format((h - 1) % 12 + 1, m, sec, 'AM' if h < 12 else 'PM'))
+    return _times
+
+
+def number_strings(values, fmt, null_mask):
+    # Numbers formatted as strings, blank where null_mask is True
+    return ['' if null else fmt.format(v) for v, null in zip(values.tolist(), null_mask.tolist())]
+
+
+def transect_rows(rng, config, sitecode, survey_date, trk, start_seconds):
+    """ Rows (lists of strings) of one transect
+
+    :param rng: numpy RandomState
+    :param config: SynthConfig object
+    :param sitecode: site code, written in upper case like the MRC files
+    :param survey_date: datetime.date of the survey
+    :param trk: transect number
+    :param start_seconds: time of the first point, in seconds after midnight
+    :return: tuple of list of rows and time of the last point
+    """
+    n = config.points
+    # Time stamps, one per second, with some repeated
+    steps = np.ones(n, dtype=int)
+    steps[0] = 0
+    steps[rng.random_sample(n) < config.dupe_rate] = 0
+    seconds = start_seconds + np.cumsum(steps)
+    # Positions: a straight line offshore from a start point, with some GPS noise
+    lat0 = rng.uniform(47.0, 48.8)
+    lon0 = rng.uniform(-123.0, -122.2)
+    heading = rng.uniform(0, 2 * np.pi)
+    dist = np.arange(n) * 1.5e-5
+    lat = lat0 + dist * np.cos(heading) + rng.normal(0, 2e-6, n)
+    lon = lon0 + dist * np.sin(heading) + rng.normal(0, 2e-6, n)
+    # Depth gets deeper offshore
+    depth = -0.5 - np.linspace(0, rng.uniform(5, 30), n) + rng.normal(0, 0.1, n)
+    depth_interp = depth + rng.normal(0, 0.05, n)
+    video = (rng.random_sample(n) > 0.02).astype(int)
+    # Vegetation is more likely in the shallow part of the transect
+    shallow = np.linspace(0.9, 0.1, n)
+    veg = [(rng.random_sample(n) < shallow * rng.uniform(0.2, 1.0)).astype(int) for col in config.veg_columns]
+
+    date_str = '{0}/{1}/{2}'.format(survey_date.month, survey_date.day, survey_date.year)
+    time_str = time_strings(seconds.tolist())
+    lat_str = deg_min(lat, 'N', 'S')
+    lon_str = deg_min(lon, 'E', 'W')
+    nulls = lambda: rng.random_sample(n) < config.null_rate
+    columns = [
+        [sitecode.upper()] * n,
+        [str(trk)] * n,
+        [date_str] * n,
+        time_str,
+        number_strings(depth, '{0:.2f}', nulls()),
+        number_strings(depth_interp, '{0:.2f}', nulls()),
+        number_strings(video, '{0}', nulls()),
+        lat_str,
+        lon_str,
+    ]
+    columns += [number_strings(values, '{0}', nulls()) for values in veg]
+    # Malformed values in the latitude, longitude, date or time columns
+    for row in np.flatnonzero(rng.random_sample(n) < config.malformed_rate).tolist():
+        col = BASE_COLUMNS.index(['latitude', 'lon', 'date', 'time'][rng.randint(4)])
+        columns[col][row] = columns[col][row].replace('d', 'x').replace('/', '-').replace(':', '.')
+    return [list(row) for row in zip(*columns)], int(seconds[-1])
+
+
+def write_file(file_path, rng, config, sitecode, survey_date):
+    """ Write one transect data file, return the number of rows """
+    n_rows = 0
+    with open(file_path, 'wb') as fh:
+        writer = csv.writer(fh, lineterminator='\n')
+        writer.writerow(BASE_COLUMNS + config.veg_columns)
+        seconds = 8 * 3600 + rng.randint(3600)
+        for trk in range(1, config.transects + 1):
+            rows, seconds = transect_rows(rng, config, sitecode, survey_date, trk, seconds)
+            writer.writerows(rows)
+            n_rows += len(rows)
+            seconds += 60 + rng.randint(300)
+    return n_rows
+
+
+def make_tree(in_dir, config):
+    """ Write a tree of synthetic transect data files and the site list file
+
+    :param in_dir: directory for the site folders (created if it does not exist)
+    :param config: SynthConfig object
+    :return: dictionary of csv file path (key) and number of rows (value)
+    """
+    rng = np.random.RandomState(config.seed)
+    files = {}
+    codes = site_codes(config.sites)
+    for sitecode in codes:
+        site_dir = os.path.join(in_dir, sitecode)
+        if not os.path.isdir(site_dir):
+            os.makedirs(site_dir)
+        for year in config.years:
+            for visit in range(1, config.visits + 1):
+                survey_date = datetime.date(year, 6, 1) + datetime.timedelta(days=rng.randint(90))
+                file_name = '{0}_{1}_{2:02d}_TD.csv'.format(sitecode, year, visit)
+                file_path = os.path.join(site_dir, file_name)
+                files[file_path] = write_file(file_path, rng, config, sitecode, survey_date)
+    with open(os.path.join(in_dir, SITES_FILE), 'w') as fh:
+        fh.write('\n'.join(codes) + '\n')
+    return files
@@ -0,0 +1,170 @@
+# costmodel.py
+# 10/16/2026
+# Estimate the processing time of work units from their sizes, to start the longest ones first in a pool of workers
+# Work units are transect data files in csv2pt and samples in statsdb.  Each run writes the estimated and actual
+# time of its units to a csv log, and the model of each kind of unit is fit again from the most recent
+# records of the log (least squares) at the start of the next run, so the estimates improve as the log grows.
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+
+import os
+import csv
+import datetime
+import numpy as np
+
+# Name of the log file, and its columns
+LOG_FILE = 'work_costs.csv'
+LOG_COLUMNS = ['run_time', 'kind', 'unit', 'features', 'estimate', 'actual']
+
+# Kinds of work units
+CSV2PT = 'csv2pt'  # transect data file:  mb (file size), krows (thousands of rows)
+STATSDB = 'statsdb'  # sample:  surveys (number of surveys), kpoints (thousands of survey points)
+
+# Number of the most recent log records of each kind that are kept, and used to fit the model
+HISTORY = 2000
+# Number of log records of a kind needed to fit its model.  Until then the default coefficients are used
+MIN_RECORDS = 10
+
+# Default seconds for each work unit (const) and per unit of each feature:  kind (key), coefficients (value)
+DEFAULT_COEFFICIENTS = {
+    CSV2PT: {'const': 0.1, 'mb': 1.0, 'krows': 0.1},
+    STATSDB: {'const': 2.0, 'surveys': 1.0, 'kpoints': 0.5},
+}
+
+
+def format_features(features):
+    """ Features of a work unit as a log value
+
+    >>> format_features({'mb': 1.5, 'krows': 20})
+    'krows=20;mb=1.5'
+    """
+    return ';'.join('{0}={1:g}'.format(name, features[name]) for name in sorted(features))
+
+
+def parse_features(value):
+    """ Features of a work unit from a log value
+
+    >>> sorted(parse_features('krows=20;mb=1.5').items())
+    [('krows', 20.0), ('mb', 1.5)]
+    """
+    return dict((name, float(number)) for name, number in (item.split('=') for item in value.split(';') if item))
+
+
+def longest_first(estimates):
+    """ Indexes of work units in order of decreasing estimated time (equal estimates keep their order)
+
+    >>> longest_first([1.0, 5.0, 2.0, 5.0])
+    [1, 3, 2, 0]
+    """
+    return sorted(range(len(estimates)), key=lambda i: (-estimates[i], i))
+
+
+class CostModel(object):
+    """ Represents a linear model of the processing time (seconds) of each kind of work unit:
+    time = const + sum of (coefficient * feature), fit from the log of earlier runs
+
+    Properties:
+    log_file -- csv log of the estimated and actual times of work units
+    run_time -- start time of this run, written to the log records
+    coefficients -- dictionary of kind (key) and dictionary of feature name or 'const' and seconds (value)
+    history -- dictionary of kind (key) and list of log records (dictionaries), oldest first (value)
+    records -- log records of this run
+
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.run_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.coefficients = dict((kind, dict(coefs)) for kind, coefs in DEFAULT_COEFFICIENTS.items())
+        self.history = {}
+        self.records = []
+        self._latest = {}  # (kind, unit) (key), features of the most recent log record of the unit (value)
+
+    def load(self):
+        # Read the log of earlier runs, and fit the model of each kind of work unit
+        if self.log_file and os.path.exists(self.log_file):
+            try:
+                with open(self.log_file, 'rb') as fh:
+                    for record in csv.DictReader(fh):
+                        record['features'] = parse_features(record['features'])
+                        self.history.setdefault(record['kind'], []).append(record)
+            except (IOError, csv.Error, KeyError, ValueError):
+                # Unreadable log -- start over with the default coefficients
+                self.history = {}
+        for kind in self.history:
+            self.history[kind] = self.history[kind][-HISTORY:]
+            for record in self.history[kind]:
+                self._latest[(kind, record['unit'])] = record['features']
+            self._fit(kind)
+        return self
+
+    def _fit(self, kind):
+        # Least squares fit of the actual times of the logged work units of a kind
+        records = self.history[kind]
+        if len(records) < MIN_RECORDS:
+            return
+        names = ['const'] + sorted(set(name for record in records for name in record['features']))
+        x = np.array([[1.0] + [record['features'].get(name, 0.0) for name in names[1:]] for record in records])
+        y = np.array([float(record['actual']) for record in records])
+        # A negative coefficient (from noise, or from features that grow together) would rank larger units lower,
+        # so the feature with the most negative coefficient is dropped and the rest are fit again
+        used = range(len(names))
+        while True:
+            coefs = np.linalg.lstsq(x[:, used], y, rcond=-1)[0]
+            if len(used) == 1 or coefs[1:].min() >= 0:
+                break
+            del used[int(np.argmin(coefs[1:])) + 1]
+        self.coefficients[kind] = dict((name, 0.0) for name in names)
+        self.coefficients[kind].update(zip([names[i] for i in used], np.maximum(coefs, 0.0).tolist()))
+
+    def estimate(self, kind, features):
+        """ Estimated time (seconds) of a work unit from its features (dictionary of name and value) """
+        coefs = self.coefficients.get(kind, {})
+        return coefs.get('const', 0.0) + sum(coefs.get(name, 0.0) * value for name, value in features.items())
+
+    def known(self, kind, unit, name):
+        """ Value of a feature of a work unit from its most recent log record (i.e. rows of a csv file), or None """
+        return self._latest.get((kind, unit), {}).get(name)
+
+    def ratio(self, kind, name, per_name, default):
+        """ Average value of one feature per unit of another in the log of a kind (i.e. rows per MB), or default """
+        total = per_total = 0.0
+        for record in self.history.get(kind, []):
+            features = record['features']
+            if name in features and features.get(per_name):
+                total += features[name]
+                per_total += features[per_name]
+        return total / per_total if per_total else default
+
+    def record(self, kind, unit, features, estimate, actual):
+        # Add the estimated and actual time (seconds) of a work unit to the log
+        self.records.append({'run_time': self.run_time, 'kind': kind, 'unit': unit, 'features': features,
+                             'estimate': '{0:.3f}'.format(estimate), 'actual': '{0:.3f}'.format(actual)})
+
+    def summary(self, kind):
+        """ Tuple of the number of work units, the total estimated time and the total actual time of a kind
+            in this run
+        """
+        records = [record for record in self.records if record['kind'] == kind]
+        return (len(records), sum(float(record['estimate']) for record in records),
+                sum(float(record['actual']) for record in records))
+
+    def save(self):
+        # Write the log:  the most recent records of earlier runs followed by the records of this run
+        if not self.log_file or not self.records:
+            return
+        for record in self.records:
+            self.history.setdefault(record['kind'], []).append(record)
+            self._latest[(record['kind'], record['unit'])] = record['features']
+        self.records = []
+        temp_file = self.log_file + '.tmp'
+        with open(temp_file, 'wb') as fh:
+            writer = csv.DictWriter(fh, LOG_COLUMNS, lineterminator='\n')
+            writer.writeheader()
+            for kind in sorted(self.history):
+                for record in self.history[kind][-HISTORY:]:
+                    row = dict(record)
+                    row['features'] = format_features(record['features'])
+                    writer.writerow(row)
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        os.rename(temp_file, self.log_file)
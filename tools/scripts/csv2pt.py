@@ -10,12 +10,47 @@ import datetime
 t0 = time.time()
 
 import os
+import sys
 import csv
 import fnmatch
+import posixpath
+import collections
+import gzip
+import bz2
+import zipfile
 import re
+import json
+import hashlib
+import itertools
+import multiprocessing
 import numpy as np
 import pandas as pd
 
+try:
+    from os import scandir
+except ImportError:
+    # Python 2.7:  scandir package if it is installed, otherwise os.listdir and os.stat (see list_dir)
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+try:
+    import lzma
+except ImportError:
+    # Python 2.7:  backports.lzma package for .xz files if it is installed
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+import gpkg
+import ptcache
+import valreport
+import tides
+import costmodel
+import svysummary
+import samppoly
 # import svmpUtils as utils
 
 # t0 = time.time()
@@ -67,6 +102,13 @@ latCol = sourceLatCol # column name for latitude
 lonCol = sourceLonCol # column name for longitude
 vegcodeCol = 'veg_code'
 nativesgCol = 'nativesg'
+sampidCol = 'site_samp_id'  # sample polygon that contains the point (with svmp_gdb, see samppoly)
+sampCrossCol = 'samp_cross'  # fraction along the segment from the previous point to a sample polygon boundary
+
+# Sample polygons and sample table in the SVMP geodatabase, for the sample polygon of each point
+sampPolyFC = 'samp_polygons'
+siteSamplesTbl = 'site_samples'
+sampDateCol = 'date_samp_start'
 
 
 # Columns that are used to calculate nativesg attribute
@@ -76,10 +118,65 @@ NATIVESG_CODES = [
             'undiff',
             ]
 
+# Derived vegetation columns (composites):  (name, list of member veg codes), in feature class field order
+# A composite is present (1) if any member is present, absent (0) if all members are absent, and
+# null (NULL_VEG) if any member is null and none are present, or if the video is 0 or null.
+# It is added to a site visit that has at least one of its members as a column (see CsvData._calc_composites)
+# For example:  ('allsg', ['Zm', 'Phyllo', 'undiff', 'Zj']), ('kelp', ['Nerlue', 'Macpyr'])
+VEG_COMPOSITES = [
+    (nativesgCol, NATIVESG_CODES),
+]
+
 NULL_DEPTH = -9999
 NULL_VEG = -9999
 NULL_VIDEO = -9999
 
+# Fill missing interpolated depths by linear interpolation in time of the observed depths of the transect,
+# across gaps of up to this many seconds between observed depths (0 turns the filling off).
+# Default of the depth_fill_seconds parameter of main, validate_main and watch.
+# Filled rows are written to the warning log (see CsvData._fill_depth)
+DEPTH_FILL_SECONDS = 0
+
+# ------------- Data validation rules ------------- #
+# Declarative rules for the data validation warnings of a site visit:  (name, expression, severity)
+#   name -- warning type written to the warning log
+#   expression -- Python expression of NumPy arrays of the site visit data (see CsvData._rule_namespace):
+#       video, depth_obs, depth_interp, tran_num, timestamps (int64 microseconds), each veg column by name,
+#       veg (2D array of all source veg columns), dupe_ts (rows with duplicate time stamps),
+#       any_veg / all_veg (any or all of the veg columns), np and the NULL_ values,
+#       depth_filled (rows with a filled depth_interp, see DEPTH_FILL_SECONDS),
+#       tide_missing (rows with a depth but no tide height for the tide correction, see CsvData._correct_tide),
+#       and the GPS track arrays (see CsvData._track_steps):  step_dist (meters from the previous point
+#       of the transect), time_gap (seconds), speed (meters per second), stationary, time_reversal
+#     An array of booleans flags individual rows.  A single boolean flags the whole site visit
+#   severity -- 'warning' sets the data validation warning flag, 'info' is only written to the log
+# The rules for a site visit are compiled once (see RuleSet) and evaluated into a bit mask per row
+VALIDATION_RULES = [
+    ('All Video < 1', 'video.size > 0 and video.max() < 1', 'warning'),
+    ('Null Video Values', 'video == NULL_VIDEO', 'warning'),
+    ('Null Veg Values', 'any_veg(veg == NULL_VEG)', 'warning'),
+    ('Video Values > 1', 'video > 1', 'warning'),
+    ('Veg Values > 1', 'any_veg(veg > 1)', 'warning'),
+    ('Veg = 1 and Video = 0', '(video == 0) & any_veg(veg == 1)', 'warning'),
+    ('Duplicate Time Stamps', 'dupe_ts', 'warning'),
+    ('GPS Jump', 'speed > GPS_MAX_SPEED', 'warning'),
+    ('Time Reversal', 'time_reversal', 'warning'),
+    ('GPS Stationary', 'stationary', 'info'),
+    ('Depth Interp Filled', 'depth_filled', 'info'),
+    ('No Tide Height', 'tide_missing', 'warning'),
+]
+
+# GPS track checks (see CsvData._track_steps)
+TRACK_ARRAYS = ['step_dist', 'time_gap', 'speed', 'stationary', 'time_reversal']
+GPS_MAX_SPEED = 5.0  # meters per second (about 10 knots) between consecutive points of a transect
+GPS_STATIONARY_METERS = 0.5  # steps shorter than this (meters) are stationary
+GPS_STATIONARY_SECONDS = 120  # stationary runs at least this long (seconds) are flagged
+EARTH_RADIUS = 6371008.8  # mean radius (meters)
+
+# Additional validation rules for particular sites:  site code pattern (fnmatch) and list of rules
+# For example:  {'flats*': [('Depth Above Datum', '(depth_interp > 0) & (depth_interp != NULL_DEPTH)', 'info')]}
+SITE_RULES = {}
+
 # Convert Degree/minute format to Decimal Degrees
 # Assumes input in format ##d##.####' Dir  (i.e. 48d33.8342' N)
 def dm2dd(coordDegMin):
@@ -90,24 +187,390 @@ def dm2dd(coordDegMin):
         coordDD = coordDD * (-1)
     return coordDD
 
+# Line-anchored patterns for values in the source csv columns.
+# The final alternative of each matches any other line, so a multi-line buffer yields exactly one match per line
+# Degree/minute coordinates:  ##d##.####' Dir or ##d##' Dir
+LATLON_REGEX = re.compile(r"^[ \t]*([0-9]+)d([0-9]+[.]?[0-9]+)' ([nsewNSEW])[ \t]*$|^.*$", re.MULTILINE)
+# Dates:  m/d/yyyy or mm/dd/yyyy
+DATE_REGEX = re.compile(r"^[ \t]*([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})[ \t]*$|^.*$", re.MULTILINE)
+# Times:  24-hour (hh:mm:ss) or 12-hour (hh:mm:ss AM or hh:mm:ssPM), with no surrounding spaces
+TIME_REGEX = re.compile(r"^([0-9]{1,2}):([0-9]{1,2}):([0-9]{1,2})(?: ?([AP])M)?$|^.*$", re.MULTILINE)
+# Years of valid survey dates (others are reported as malformed dates)
+MIN_YEAR = 1990
+MAX_YEAR = 2100
+
+def match_column(regex, values):
+    """ Match all values of a csv column with a compiled, line-anchored regular expression in one pass
+    The values are joined into a single buffer instead of calling the regular expression once per value
+
+    :param regex: compiled regular expression (see LATLON_REGEX)
+    :param values: list of strings from a csv column
+    :return: NumPy string array of captured groups, one row per value.
+        The first group is an empty string where the value does not match the pattern
+    """
+    buffer = '\n'.join(values)
+    if buffer.count('\n') != len(values) - 1:
+        # Line breaks embedded in a value would shift the matches, so replace them first
+        buffer = '\n'.join(value.replace('\n', ' ') for value in values)
+    return np.array(regex.findall(buffer))
+
+def dm2dd_array(coords):
+    """ Validate and convert a column of Degree/minute coordinates to Decimal Degrees in one pass
+    Uses a single regular expression match over the column (see match_column),
+    then converts with NumPy array operations instead of a function call per value
+
+    :param coords: list of coordinate strings in format ##d##.####' Dir  (i.e. 48d33.8342' N)
+    :return: tuple of
+        NumPy array of decimal degrees (NaN for malformed values)
+        list of csv row numbers (1-based) with malformed values
+    """
+    n_coords = len(coords)
+    if n_coords == 0:
+        return np.array([], dtype=np.float64), []
+    parts = match_column(LATLON_REGEX, coords)
+    valid = parts[:, 0] != ''
+    coords_dd = np.empty(n_coords, dtype=np.float64)
+    coords_dd.fill(np.nan)
+    degrees = parts[valid, 0].astype(np.float64)
+    minutes = parts[valid, 1].astype(np.float64)
+    direction = np.char.upper(parts[valid, 2])
+    sign = np.where((direction == 'W') | (direction == 'S'), -1.0, 1.0)
+    coords_dd[valid] = sign * (degrees + minutes / 60)
+    error_rows = (np.flatnonzero(~valid) + 1).tolist()
+    return coords_dd, error_rows
+
+def datetime_array(dates, times):
+    """ Validate and convert columns of date and time strings to time stamps in one vectorized pass
+    Parsed with the explicit expected formats (no date format inference):
+        dates -- m/d/yyyy or mm/dd/yyyy, year MIN_YEAR to MAX_YEAR
+        times -- 24-hour (hh:mm:ss) or 12-hour (hh:mm:ss AM/PM)
+
+    :param dates: list of date strings from a csv column
+    :param times: list of time strings from a csv column
+    :return: tuple of
+        NumPy datetime64[us] array of time stamps (NaT for malformed values)
+        list of csv row numbers (1-based) with malformed dates
+        list of csv row numbers (1-based) with malformed times
+
+    >>> stamps, date_errors, time_errors = datetime_array(
+    ...     ['6/1/2014', '06/01/2014', '6/1/2014', '6/1/0214', '6/1/14', '2/30/2014', '6/1/2014', '6/1/2014'],
+    ...     ['12:00:00 AM', '12:00:00PM', '23:59:59', '10:00:00', '10:00:00', '10:00:00', ' 10:00:00', '13:00:00 PM'])
+    >>> [stamp.isoformat(' ') for stamp in stamps[:3].tolist()]
+    ['2014-06-01 00:00:00', '2014-06-01 12:00:00', '2014-06-01 23:59:59']
+    >>> date_errors, time_errors
+    ([4, 5, 6], [7, 8])
+    """
+    n_rows = len(dates)
+    if n_rows == 0:
+        return np.array([], dtype='<M8[us]'), [], []
+    date_parts = match_column(DATE_REGEX, dates)
+    time_parts = match_column(TIME_REGEX, times)
+
+    # Dates -- month and day must be valid for the year
+    date_valid = date_parts[:, 0] != ''
+    month, day, year = [np.where(date_valid, date_parts[:, i], '0').astype(np.int64) for i in range(3)]
+    month_valid = (month >= 1) & (month <= 12)
+    months = ((year - 1970) * 12 + np.where(month_valid, month, 1) - 1).astype('<M8[M]')
+    days_in_month = ((months + 1).astype('<M8[D]') - months.astype('<M8[D]')).astype(np.int64)
+    date_valid &= month_valid & (year >= MIN_YEAR) & (year <= MAX_YEAR) & (day >= 1) & (day <= days_in_month)
+    days = months.astype('<M8[D]') + np.where(date_valid, day - 1, 0)
+
+    # Times -- hours 1-12 with AM/PM, otherwise 0-23
+    time_valid = time_parts[:, 0] != ''
+    hour, minute, second = [np.where(time_valid, time_parts[:, i], '0').astype(np.int64) for i in range(3)]
+    ampm = time_parts[:, 3]
+    hour12 = ampm != ''
+    time_valid &= np.where(hour12, (hour >= 1) & (hour <= 12), hour <= 23) & (minute <= 59) & (second <= 59)
+    hour = np.where(hour12, hour % 12 + np.where(ampm == 'P', 12, 0), hour)
+    seconds = hour * 3600 + minute * 60 + second
+
+    timestamps = days.astype('<M8[us]') + (seconds * 1000000).astype('<m8[us]')
+    timestamps[~(date_valid & time_valid)] = np.datetime64('NaT')
+    date_errors = (np.flatnonzero(~date_valid) + 1).tolist()
+    time_errors = (np.flatnonzero(~time_valid) + 1).tolist()
+    return timestamps, date_errors, time_errors
+
+# String values treated as null when converting csv columns to numbers (subset of pandas read_csv defaults)
+NA_VALUES = ['', 'NA', 'N/A', 'n/a', 'NaN', 'nan', '-NaN', '-nan', 'NULL', 'null', '#N/A']
+
+# Convert a list of strings from a csv column to a NumPy array of numbers
+# Integer array if all values are whole numbers and none are null, otherwise float (nulls as NaN)
+def str2num(values):
+    _values = np.array(values, dtype=object)
+    _values[pd.Series(_values).isin(NA_VALUES).values] = 'nan'
+    _numbers = _values.astype(float)
+    if len(_numbers) and not np.isnan(_numbers).any() and (_numbers == np.floor(_numbers)).all():
+        _numbers = _numbers.astype(np.int64)
+    return _numbers
+
+# Transpose csv rows (lists of strings) into a dictionary of column name (key), list of string values (value)
+# Blank rows are skipped (same as DictReader). Short rows are padded and long rows trimmed to the header length
+def rows2columns(header, rows):
+    n_cols = len(header)
+    rows = [(row + [''] * (n_cols - len(row)))[:n_cols] for row in rows if row]
+    if rows:
+        return dict(zip(header, [list(values) for values in zip(*rows)]))
+    else:
+        return dict((col, []) for col in header)
+
+# Pass lines through from a file, updating a hashlib object with each one
+def hash_lines(lines, md5):
+    for line in lines:
+        md5.update(line)
+        yield line
+
+# ------------- Projection of lat/lon points to the output coordinate system ------------- #
+# NAD_1983_HARN_StatePlane_Washington_South_FIPS_4602_Feet (EPSG:2927), Lambert Conformal Conic (2 standard parallels)
+# Parameters from the EPSG definition. Formulas from Snyder, Map Projections - A Working Manual (USGS PP 1395), p. 107-108
+# No datum transformation is applied between WGS-84 and NAD83(HARN) (same as Project_management with no transformation)
+LCC_A = 6378137.0  # GRS 1980 semi-major axis (meters)
+LCC_F = 1 / 298.257222101  # GRS 1980 flattening
+LCC_LAT1 = 47 + 20 / 60.0  # first standard parallel
+LCC_LAT2 = 45 + 50 / 60.0  # second standard parallel
+LCC_LAT0 = 45 + 20 / 60.0  # latitude of origin
+LCC_LON0 = -120.5  # central meridian
+US_FOOT = 1200 / 3937.0  # meters per US survey foot
+LCC_FALSE_EASTING = 500000 / US_FOOT  # US survey feet (500000 meters)
+LCC_FALSE_NORTHING = 0.0  # US survey feet
+
+def _lcc_t(lat_rad, e):
+    sin_lat = np.sin(lat_rad)
+    return np.tan(np.pi / 4 - lat_rad / 2) / ((1 - e * sin_lat) / (1 + e * sin_lat)) ** (e / 2)
+
+def _lcc_m(lat_rad, e):
+    return np.cos(lat_rad) / np.sqrt(1 - (e * np.sin(lat_rad)) ** 2)
+
+def wa_south_xy(lat, lon):
+    """ Project arrays of decimal degree latitude and longitude to Washington South State Plane x, y (US survey feet)
+    Control points (x, y from PROJ for EPSG:2927, to 0.01 feet.  The EPSG false easting is 1640416.667 feet,
+    0.0003 feet more than 500000 meters):
+
+    >>> x, y = wa_south_xy(np.array([45 + 20 / 60.0, 47.0379, 46.2804]), np.array([-120.5, -122.9007, -124.0557]))
+    >>> np.round(x, 2).tolist(), np.round(y, 2).tolist()
+    ([1640416.67, 1041925.65, 741700.41], [0.0, 630715.98, 365620.17])
+    """
+    e = np.sqrt(2 * LCC_F - LCC_F ** 2)
+    phi1, phi2, phi0 = np.radians([LCC_LAT1, LCC_LAT2, LCC_LAT0])
+    m1, m2 = _lcc_m(phi1, e), _lcc_m(phi2, e)
+    t1, t2, t0 = _lcc_t(phi1, e), _lcc_t(phi2, e), _lcc_t(phi0, e)
+    n = (np.log(m1) - np.log(m2)) / (np.log(t1) - np.log(t2))
+    big_f = m1 / (n * t1 ** n)
+    rho0 = LCC_A * big_f * t0 ** n
+    rho = LCC_A * big_f * _lcc_t(np.radians(np.asarray(lat, dtype=float)), e) ** n
+    theta = n * np.radians(np.asarray(lon, dtype=float) - LCC_LON0)
+    x = LCC_FALSE_EASTING + rho * np.sin(theta) / US_FOOT
+    y = LCC_FALSE_NORTHING + (rho0 - rho * np.cos(theta)) / US_FOOT
+    return x, y
+
+# Number of rows per chunk when large csv files are read in streaming mode (see CsvStream)
+CHUNK_ROWS = 100000
+
+# Watch mode (see watch):  seconds between polls of the site folders,
+# and seconds a file must be unchanged before it is converted (so partly uploaded files are not read)
+POLL_SECONDS = 10
+SETTLE_SECONDS = 30
+
+# Rows (thousands) per MB of a transect data file, for the cost model estimate of a file that has not been
+# converted before (see tdfile_costs).  Replaced by the average in the cost model log once it has records
+KROWS_PER_MB = 11.0
+
+# Compressed transect data files (i.e. sitecode_YYYY_##_TD.csv.gz):  file name suffix (key), open function (value)
+COMPRESSED = {'.gz': gzip.open, '.bz2': bz2.BZ2File}
+if lzma:
+    COMPRESSED['.xz'] = lzma.open
+
+# Zip archives of transect data files, in a site directory or in place of it (sitecode.zip in the input directory)
+# A file in an archive has the path archive.zip/member (see open_source)
+ARCHIVE_SUFFIX = '.zip'
+
+# Size and modification time of a zip archive member, in place of an os.stat result
+MemberStat = collections.namedtuple('MemberStat', ['st_size', 'st_mtime'])
+
+
+def source_name(name):
+    """ Transect data file name without a compression suffix, for matching the search pattern """
+    root, ext = os.path.splitext(name)
+    return root if ext.lower() in COMPRESSED else name
+
+
+def split_archive(file_path):
+    """ Tuple of (zip archive path, member name) for a file in a zip archive, or (None, file_path) """
+    if ARCHIVE_SUFFIX not in file_path.lower():
+        return None, file_path
+    path = os.path.normpath(file_path)
+    member = []
+    while not os.path.isfile(path):
+        parent, name = os.path.split(path)
+        if not name or parent == path:
+            return None, file_path
+        member.insert(0, name)
+        path = parent
+    if member and path.lower().endswith(ARCHIVE_SUFFIX):
+        return path, '/'.join(member)
+    return None, file_path
+
+
+def open_source(file_path):
+    """ Open a transect data file for reading:  a csv file, a compressed csv file (see COMPRESSED),
+    or a csv file in a zip archive.  Compressed files are decompressed as they are read, without temporary files
+    """
+    zip_path, member = split_archive(file_path)
+    if zip_path:
+        # The member keeps its own handle on the archive file
+        with zipfile.ZipFile(zip_path) as archive:
+            return archive.open(member, 'rU')
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in COMPRESSED:
+        return COMPRESSED[ext](file_path, 'rb')
+    return open(file_path, 'rbU')
+
+
+def source_exists(file_path):
+    """ Flag indicating the existence of a transect data file, or of a file in a zip archive """
+    zip_path, member = split_archive(file_path)
+    if zip_path:
+        try:
+            with zipfile.ZipFile(zip_path) as archive:
+                archive.getinfo(member)
+            return True
+        except (KeyError, IOError, zipfile.BadZipfile):
+            return False
+    return os.path.exists(file_path)
+
+
+def list_archive(zip_path):
+    """ Files in a zip archive as (file name, MemberStat, path) tuples
+    Empty list if the archive cannot be read (i.e. it is still being copied)
+    """
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            infos = archive.infolist()
+    except (IOError, zipfile.BadZipfile):
+        return []
+    return [(posixpath.basename(info.filename),
+             MemberStat(info.file_size, time.mktime(info.date_time + (0, 0, -1))),
+             os.path.join(zip_path, *info.filename.split('/')))
+            for info in infos if not info.filename.endswith('/')]
+
+
+def list_dir(path):
+    """ Entries of a directory from a single listing, as (name, is_dir, stat) tuples
+    is_dir and stat are functions.  With os.scandir they use the information returned with the listing
+    (file type, and on Windows the size and modification time), so they do not cost another round trip
+    on a network share.  Empty list if the directory does not exist
+    """
+    try:
+        if scandir:
+            return [(entry.name, entry.is_dir, entry.stat) for entry in scandir(path)]
+        else:
+            return [(name,
+                     lambda full_path=os.path.join(path, name): os.path.isdir(full_path),
+                     lambda full_path=os.path.join(path, name): os.stat(full_path))
+                    for name in os.listdir(path)]
+    except OSError:
+        return []
+
+
+class Catalog(object):
+    """ Represents an index of the site directories and transect data files in the input directory
+    The input directory and each site directory are listed once, and all directory and file lookups
+    of a run (see CsvPath) come from the index
+
+    Properties:
+    in_dir -- the input directory
+    entries -- dictionary of normalized name (key) and is_dir function (value) for the entries of in_dir
+    sites -- dictionary of site code (key) and list of (transect data file name, os.stat result, file path) (value)
+        for the site directories that have been listed
+    duplicates -- dictionary of site code (key) and list of (file name, file path, path of the file used instead)
+        (value) for the transect data files of a site with the same name as another one (see tdfiles)
+
+    Transect data files can be compressed (see COMPRESSED), or in zip archives in the site directory.
+    A site without a directory can be a zip archive of the directory (sitecode.zip)
+
+    """
+
+    def __init__(self, in_dir):
+        self.in_dir = os.path.normpath(in_dir)
+        self.entries = dict((os.path.normcase(name), is_dir) for name, is_dir, stat in list_dir(self.in_dir))
+        self.sites = {}
+        self.duplicates = {}
+
+    def dir_exists(self, sitecode):
+        """ Flag indicating that the site directory exists """
+        is_dir = self.entries.get(os.path.normcase(sitecode))
+        return bool(is_dir and is_dir())
+
+    def archive(self, sitecode):
+        """ Full path to the zip archive of a site directory (sitecode.zip), or None """
+        name = os.path.normcase(sitecode + ARCHIVE_SUFFIX)
+        is_dir = self.entries.get(name)
+        if is_dir and not is_dir():
+            return os.path.join(self.in_dir, sitecode + ARCHIVE_SUFFIX)
+        return None
+
+    def tdfiles(self, sitecode, search_pattern):
+        """ List of (file name, os.stat result, file path) for the transect data files of a site, in directory order
+        For files in zip archives, the stat result is a MemberStat
+        Files with the same name (without a compression suffix) in more than one place, i.e. in two archives,
+        or in an archive and the directory, would be converted to the same output.  Only one of them is listed:
+        a file in the directory before a file in an archive, otherwise the first by path.  The others are
+        recorded in duplicates, to be reported as errors
+        """
+        if sitecode not in self.sites:
+            _tdfiles = []
+            if self.dir_exists(sitecode):
+                site_dir = os.path.join(self.in_dir, sitecode)
+                for name, is_dir, stat in list_dir(site_dir):
+                    if fnmatch.fnmatch(source_name(name), search_pattern) and not is_dir():
+                        _tdfiles.append((name, stat(), os.path.join(site_dir, name)))
+                    elif name.lower().endswith(ARCHIVE_SUFFIX) and not is_dir():
+                        _tdfiles.extend(self._archive_tdfiles(os.path.join(site_dir, name), search_pattern))
+            elif self.archive(sitecode):
+                _tdfiles.extend(self._archive_tdfiles(self.archive(sitecode), search_pattern))
+            # File path of each name:  files in the directory first, then archive members
+            used = {}
+            for name, stat, path in sorted(_tdfiles, key=lambda tdfile: (isinstance(tdfile[1], MemberStat), tdfile[2])):
+                used.setdefault(source_name(name).lower(), path)
+            self.sites[sitecode] = [tdfile for tdfile in _tdfiles if used[source_name(tdfile[0]).lower()] == tdfile[2]]
+            self.duplicates[sitecode] = [(name, path, used[source_name(name).lower()]) for name, stat, path in _tdfiles
+                                         if used[source_name(name).lower()] != path]
+        return self.sites[sitecode]
+
+    @staticmethod
+    def _archive_tdfiles(zip_path, search_pattern):
+        # Transect data files in a zip archive
+        return [(name, stat, path) for name, stat, path in list_archive(zip_path)
+                if fnmatch.fnmatch(source_name(name), search_pattern)]
+
+
 class CsvPath(object):
     """ Represents a directory path for a single site
 
     Properties:
     sitecode -- the code for the site
     csvdir -- the full path to the directory -- concatenation of the base directory and site code
+        (or the zip archive of the directory, see Catalog)
+    catalog -- Catalog object of the base directory, used for all directory and file lookups
     search_pattern -- the pattern to match for transect data files:   sitecode_YYYY_##_TD.csv
     valid -- flag to indicate if path is valid -- directory exists and their are transect files
     dir_exist -- flag to indicate if the directory exists
     files_exist -- flag to indicate if files matching the search pattern exist in the directory
     tdfiles -- list of transect data files within the directory
+    duplicates -- list of (file name, file path, path of the file used instead) for transect data files
+        with the same name as another one (see Catalog.tdfiles)
+    files -- dictionary of transect data file name (key) and (os.stat result, file path) (value)
 
     """
 
-    def __init__(self, sitecode, basedir):
+    def __init__(self, sitecode, basedir, catalog=None):
         self.sitecode = sitecode
         self.csvdir = os.path.normpath(os.path.join(basedir, sitecode))
+        self.catalog = catalog or Catalog(basedir)
         self.search_pattern = self.sitecode + '_*_*_TD.csv'
+        self._files = None  # file name (key), (os.stat result, file path) (value), from the catalog listing
+        # Site delivered as a zip archive of its directory
+        if not self.catalog.dir_exists(sitecode) and self.catalog.archive(sitecode):
+            self.csvdir = self.catalog.archive(sitecode)
 
     @property
     def valid(self):
@@ -120,10 +583,8 @@ class CsvPath(object):
     @property
     def dir_exists(self):
         """Binary attribute indicating the existence of the csv path"""
-        if os.path.exists(self.csvdir):
-            return True
-        else:
-            return False
+        return self.catalog.dir_exists(self.sitecode) or bool(self.catalog.archive(self.sitecode))
+
     @property
     def files_exist(self):
         if self.tdfiles:
@@ -134,11 +595,29 @@ class CsvPath(object):
     @property
     def tdfiles(self):
         """List of transect data files matching the specified pattern within the directory"""
-        _tdfiles = []
-        if self.dir_exists:
-            files = os.listdir(self.csvdir)
-            _tdfiles = fnmatch.filter(files, self.search_pattern)
-        return _tdfiles
+        return [name for name, stat, path in self.catalog.tdfiles(self.sitecode, self.search_pattern)]
+
+    @property
+    def duplicates(self):
+        """List of transect data files that are not converted, because another file has the same name"""
+        self.catalog.tdfiles(self.sitecode, self.search_pattern)
+        return self.catalog.duplicates[self.sitecode]
+
+    @property
+    def files(self):
+        """Dictionary of transect data file name (key) and (os.stat result, file path) (value), built once"""
+        if self._files is None:
+            self._files = dict((name, (stat, path))
+                               for name, stat, path in self.catalog.tdfiles(self.sitecode, self.search_pattern))
+        return self._files
+
+    def file_stat(self, tdfile):
+        """os.stat result of a transect data file, from the catalog listing"""
+        return self.files[tdfile][0]
+
+    def file_path(self, tdfile):
+        """Full path to a transect data file (archive.zip/member for a file in a zip archive)"""
+        return self.files[tdfile][1]
 
 
 class CsvSource(object):
@@ -148,8 +627,10 @@ class CsvSource(object):
     file_path -- full path to the csv file
     valid -- binary to flag the overall validity of the csv file
     file_exists -- binary attribute indicating the existence of the csv file
-    rows -- all rows from the csv file as extracted via DictReader
+    rows -- all rows from the csv file as dictionaries (column name: value)
+    n_rows -- number of data rows in the csv file
     all_columns -- list of all columns in the source csv file
+    content_hash -- MD5 hash of the csv file contents
     base_columns -- list of required columns that exist in the source csv file
     missing_columns -- list of required columns that are missing from the csv
     veg_columns -- list of vegetation columns in source csv file
@@ -158,6 +639,9 @@ class CsvSource(object):
     lon_errors -- list of csv rows with longitude values that don't match the expected pattern
     dataframe -- a pandas dataframe of the csv source data
 
+    The csv file is read and tokenized a single time. Validation results and the
+    dataframe are all derived from that one parse and cached on the object.
+
     """
 
     def __init__(self, file_path, veg_codes):
@@ -168,6 +652,14 @@ class CsvSource(object):
         self.sourceTimeCol = sourceTimeCol
         self.sourceDateCol = sourceDateCol
         self.veg_codes = veg_codes
+        # Cached results -- the csv file is read and tokenized only once (see _parse)
+        self._all_columns = None  # column names from the csv header
+        self._column_values = None  # dictionary of column name (key), list of string values (value)
+        self._content_hash = None  # MD5 hash of the file contents
+        self._validation = {}  # memoized validation results, keyed by property name
+        self._coords = {}  # decimal degrees and malformed rows for lat/lon columns, keyed by column
+        self._timestamps = None  # time stamps and malformed date and time rows
+        self._dataframe = None
 
     @property
     def valid(self):
@@ -175,10 +667,11 @@ class CsvSource(object):
             File must exist
             No missing base columns
             At least one vegetation column
+            At least one data row
             No malformed latitude or longitude values
             No malformed date or time values
         """
-        if self.file_exists and len(self.missing_columns) == 0 and len(self.veg_columns) > 0 and \
+        if self.file_exists and len(self.missing_columns) == 0 and len(self.veg_columns) > 0 and self.has_rows and \
                 len(self.lat_errors) == 0 and len(self.lon_errors) == 0 and len(self.time_errors) == 0 and len(self.date_errors) == 0:
             return True
         else:
@@ -187,53 +680,119 @@ class CsvSource(object):
     @property
     def file_exists(self):
         """Binary attribute indicating the existence of the csv file"""
-        if os.path.exists(self.file_path):
+        if source_exists(self.file_path):
             return True
         else:
             return False
 
-    @property
-    def rows(self):
-        """a text-based csv reader with all rows from the source csv file"""
-        _rows = []
+    def _parse(self):
+        """ Read and tokenize the csv file a single time.
+            Stores the header and the values of each column as lists of strings.
+            All other properties are derived from these cached values
+        """
+        if self._column_values is not None:
+            return
+        self._all_columns = []
+        self._column_values = {}
         try:
-            csv_file = open(self.file_path,'rbU')
-            csv_rows = csv.DictReader(csv_file)
-            for row in csv_rows:
-                _rows.append(row)
+            csv_file = open_source(self.file_path)
+            content = csv_file.read()
             csv_file.close()
-            return _rows
+            # Fingerprint of the file contents, used by the incremental ingest manifest
+            self._content_hash = hashlib.md5(content).hexdigest()
+            csv_rows = csv.reader(content.splitlines(True))
+            header = next(csv_rows)
+            column_values = rows2columns(header, csv_rows)
         except:
-            return _rows
+            return
+        self._all_columns = header
+        self._column_values = column_values
+
+    @property
+    def content_hash(self):
+        """MD5 hash of the csv file contents (None if the file could not be read)"""
+        self._parse()
+        return self._content_hash
+
+    def _column(self, col):
+        """list of string values from a column in the source csv file"""
+        self._parse()
+        return self._column_values[col]
+
+    @property
+    def rows(self):
+        """all rows from the source csv file as dictionaries, built from the cached column values"""
+        self._parse()
+        _rows = []
+        if self._all_columns:
+            columns = [self._column_values[col] for col in self._all_columns]
+            for values in zip(*columns):
+                _rows.append(dict(zip(self._all_columns, values)))
+        return _rows
+
+    @property
+    def n_rows(self):
+        """number of data rows in the source csv file, from the cached column values"""
+        self._parse()
+        if not self._all_columns:
+            return 0
+        return len(self._column_values[self._all_columns[0]])
+
+    @property
+    def has_rows(self):
+        """Binary attribute indicating the csv file has at least one data row"""
+        return self.n_rows > 0
 
     @property
     def all_columns(self):
         """list of all columns in the source csv file"""
+        self._parse()
+        return self._all_columns
+
+    def _read_header(self):
+        """Read only the header of the csv file"""
+        if self._all_columns is not None:
+            return
+        self._all_columns = []
         try:
-            csv_file = open(self.file_path,'rbU')
-            csv_rows = csv.DictReader(csv_file)
-            _all_columns = csv_rows.fieldnames
+            csv_file = open_source(self.file_path)
+            header = next(csv.reader(csv_file))
             csv_file.close()
-            return _all_columns
         except:
-            return []
+            return
+        self._all_columns = header
+
+    @property
+    def header(self):
+        """ list of all columns in the source csv file, from the first line only.
+            The file is not parsed, so the columns can be checked before reading the rows
+        """
+        self._read_header()
+        return self._all_columns
+
+    @property
+    def header_valid(self):
+        """ Flag indicating that the file exists and its header has all of the required columns
+            and at least one vegetation column
+        """
+        return self.file_exists and len(self.missing_columns) == 0 and len(self.veg_columns) > 0
 
     @property
     def base_columns(self):
         """list of required columns that are present in the source csv"""
-        _base_columns = set(self.all_columns).intersection(set(self.reqd_columns))
+        _base_columns = set(self.header).intersection(set(self.reqd_columns))
         return list(_base_columns)
 
     @property
     def missing_columns(self):
         """list of required columns that are missing from the source csv"""
-        _missing_columns = set(self.reqd_columns).difference(set(self.all_columns))
+        _missing_columns = set(self.reqd_columns).difference(set(self.header))
         return list(_missing_columns)
 
     @property
     def veg_columns(self):
         """list of vegetation columns in source csv file"""
-        _veg_columns = set(self.veg_codes).intersection(set(self.all_columns))
+        _veg_columns = set(self.veg_codes).intersection(set(self.header))
         return list(_veg_columns)
 
     @property
@@ -245,123 +804,359 @@ class CsvSource(object):
     @property
     def lat_errors(self):
         """list of rows in source csv file with erroneous latitude values"""
-        try:
-            _lat_errors = self._validate_latlon(self.sourceLatCol)
-            return _lat_errors
-        except:
-            return None
+        if 'lat_errors' not in self._validation:
+            try:
+                self._validation['lat_errors'] = self._validate_latlon(self.sourceLatCol)
+            except:
+                self._validation['lat_errors'] = None
+        return self._validation['lat_errors']
 
     @property
     def lon_errors(self):
         """list of rows in source csv file with erroneous longitude values"""
-        try:
-            _lon_errors = self._validate_latlon(self.sourceLonCol)
-            return _lon_errors
-        except:
-            return None
+        if 'lon_errors' not in self._validation:
+            try:
+                self._validation['lon_errors'] = self._validate_latlon(self.sourceLonCol)
+            except:
+                self._validation['lon_errors'] = None
+        return self._validation['lon_errors']
 
     @property
     def time_errors(self):
         """list of rows in source csv file with erroneous time values"""
-        try:
-            _time_errors = self._validate_time(self.sourceTimeCol)
-            return _time_errors
-        except:
-            return None
+        if 'time_errors' not in self._validation:
+            try:
+                self._validation['time_errors'] = self._validate_time()
+            except:
+                self._validation['time_errors'] = None
+        return self._validation['time_errors']
 
     @property
     def date_errors(self):
         """list of rows in source csv file with erroneous date values"""
-        try:
-            _date_errors = self._validate_date(self.sourceDateCol)
-            return _date_errors
-        except:
-            return None
+        if 'date_errors' not in self._validation:
+            try:
+                self._validation['date_errors'] = self._validate_date()
+            except:
+                self._validation['date_errors'] = None
+        return self._validation['date_errors']
 
     def _validate_latlon(self, col):
         """Function to validate lat or lon values based on expected pattern"""
         # Assumes input in format ##d##.####' Dir or ##d##' Dir
-        # latlon_pattern = "[0-9]+[d][0-9]+[.][0-9]+\' [nsewNSEW]"
-        latlon_pattern = "[0-9]+[d][0-9]+[.]?[0-9]+\' [nsewNSEW]"
-        error_rows = [] # initialize list of rows with errors
-        # Loop through data and validate lat/long value
-        for i, row in enumerate(self.rows):
-            csv_row = i + 1
-            coord = row[col]
-            if not re.search(latlon_pattern, coord):
-                error_rows.append(csv_row)
-        #
-        # """
-        # ALTERNATE UNUSED APPROACH, but kept as an example for reference
-        # Pandas approach: Creates a True/False series showing records that match the pattern
-        # The tilde (~) in front of series inverts the True/False values,
-        # which is the same as records that DO NOT match the pattern
-        # """
-        # validrows = self.dataframe[col].str.contains(latlong_pattern)
-        # errors = self.dataframe[~validrows]
-
+        _coords_dd, error_rows = self._latlon(col)
         return error_rows
 
-    def _validate_time(self, col):
+    def _latlon(self, col):
+        """ Decimal degree values and malformed rows for a lat or lon column.
+            Validation and conversion share a single vectorized pass, cached by column
         """
-        Function to validate time values based on expected patter
+        if col not in self._coords:
+            self._coords[col] = dm2dd_array(self._column(col))
+        return self._coords[col]
+
+    def _validate_time(self):
+        """
+        Function to validate time values based on expected pattern
         Input can be in 12-hour (AM/PM) or 24-hour format
-        :param col:
-        :return:
+        :return: list of csv rows with erroneous time values
         """
-        error_rows = [] # initialize list of rows with errors
-        # Loop through data and validate time values
-        for i, row in enumerate(self.rows):
-            csv_row = i + 1
-            time_of_survey = row[col]
-            time24hr_pattern = "^(2[0-3]|[01]?[0-9]):([0-5]?[0-9]):([0-5]?[0-9])$"
-            time12hr_pattern = "^(1[0-2]|0?[1-9]):([0-5]?[0-9]):([0-5]?[0-9])( ?[AP]M)?$"
-
-            if "M" in time_of_survey:
-                if not re.search(time12hr_pattern, time_of_survey):
-                    error_rows.append(csv_row)
-            else:
-                if not re.search(time24hr_pattern, time_of_survey):
-                    error_rows.append(csv_row)
-        return error_rows
+        _timestamps, _date_errors, time_errors = self._date_time()
+        return time_errors
 
-    def _validate_date(self, col):
+    def _validate_date(self):
         """
         Function to validate date values based on expected pattern
         Input expected to be in this format:  m/d/yyyy or mm/dd/yyyy
-        :param col:
-        :return:
+        :return: list of csv rows with erroneous date values
         """
-        error_rows = [] # initialize list of rows with errors
-        # Loop through data and validate time values
-        for i, row in enumerate(self.rows):
-            csv_row = i + 1
-            date_of_survey = row[col]
-            try:
-                [m, d, y] = date_of_survey.split('/')
-                testdate = datetime.date(int(y), int(m), int(d))
-            except:
-                error_rows.append(csv_row)
-        return error_rows
+        _timestamps, date_errors, _time_errors = self._date_time()
+        return date_errors
+
+    def _date_time(self):
+        """ Time stamps and malformed date and time rows.
+            Validation and conversion share a single vectorized pass, cached on the object
+        """
+        if self._timestamps is None:
+            self._timestamps = datetime_array(self._column(self.sourceDateCol), self._column(self.sourceTimeCol))
+        return self._timestamps
 
     @property
     def dataframe(self):
-        if self.valid:
-            _dataframe = pd.read_csv(self.file_path,
-                            usecols=self.columns,
-                            memory_map=True,
-                            converters={
-                                sourceLatCol: dm2dd,
-                                sourceLonCol: dm2dd,
-                            },
-                            parse_dates={
-                                datetimeCol: [sourceDateCol, sourceTimeCol]
-                            },
-                            keep_date_col=True
-                        )
-            return _dataframe
-        else:
+        """a pandas dataframe of the csv source data, built from the cached column values"""
+        if self._dataframe is None and self.valid:
+            self._parse()
+            coords = {
+                self.sourceLatCol: self._latlon(self.sourceLatCol)[0],
+                self.sourceLonCol: self._latlon(self.sourceLonCol)[0],
+            }
+            self._dataframe = self._make_dataframe(self._column_values, coords, self._date_time()[0])
+        return self._dataframe
+
+    def _make_dataframe(self, column_values, coords, timestamps, first_row=0):
+        """ Build a pandas dataframe from csv column values
+        :param column_values: dictionary of column name (key), list of string values (value)
+        :param coords: dictionary of lat/lon column name (key), array of decimal degrees (value)
+        :param timestamps: array of time stamps
+        :param first_row: row number (0-based) of the first row, used as the start of the dataframe index
+        :return: pandas dataframe
+        """
+        # Keep the column order of the source file (same as read_csv with usecols)
+        columns = [col for col in self.all_columns if col in self.columns]
+        data = {}
+        for col in columns:
+            values = column_values[col]
+            if col in coords:
+                data[col] = coords[col]
+            elif col in (sourceSiteCol, sourceDateCol, sourceTimeCol):
+                data[col] = values
+            else:
+                data[col] = str2num(values)
+        n_rows = len(timestamps)
+        _dataframe = pd.DataFrame(data, columns=columns, index=np.arange(first_row, first_row + n_rows))
+        # Combined date/time stamp as the first column, keeping the original date and time columns
+        _dataframe.insert(0, datetimeCol, timestamps)
+        return _dataframe
+
+
+class CsvStream(CsvSource):
+    """ Represents a large csv source data file for a single site visit, read in chunks of rows
+    Used instead of CsvSource for files too large to hold in memory.
+
+    The file is read twice, one chunk at a time.  The first pass validates the coordinates, dates and times,
+    hashes the contents and finds the earliest time stamp of each transect (needed for survey_id).
+    The second pass (chunks) returns the data for conversion (see CsvDataStream).
+    Only the per-transect time stamps and the lists of error rows are kept between chunks.
+
+    Properties (in addition to CsvSource):
+    chunk_rows -- number of rows per chunk
+    transect_mindates -- dictionary of transect number (key), earliest time stamp in int64 microseconds (value)
+
+    """
+
+    def __init__(self, file_path, veg_codes, chunk_rows=CHUNK_ROWS):
+        super(CsvStream, self).__init__(file_path, veg_codes)
+        self.chunk_rows = chunk_rows
+        self._transect_mindates = None
+        self._scan_errors = None  # dictionary of lat/lon/date/time column (key), list of error rows (value)
+        self._scan_rows = 0  # number of data rows
+
+    def _parse(self):
+        """Read only the header of the csv file.  The rows are read in chunks"""
+        self._read_header()
+
+    def _read_chunks(self, md5=None):
+        """ Generator of (row number of the first row in the chunk, dictionary of column values)
+        :param md5: optional hashlib object, updated with the file contents as they are read
+        """
+        csv_file = open_source(self.file_path)
+        try:
+            lines = csv_file
+            if md5 is not None:
+                lines = hash_lines(csv_file, md5)
+            csv_rows = csv.reader(lines)
+            header = next(csv_rows)
+            first_row = 0
+            while True:
+                rows = [row for row in itertools.islice(csv_rows, self.chunk_rows) if row]
+                if not rows:
+                    break
+                yield first_row, rows2columns(header, rows)
+                first_row += len(rows)
+        finally:
+            csv_file.close()
+
+    def _scan(self):
+        """ First pass over the file, one chunk at a time:  validate the coordinates, dates and times,
+            hash the contents and find the earliest time stamp of each transect
+        """
+        if self._scan_errors is not None:
+            return
+        errors = {self.sourceLatCol: [], self.sourceLonCol: [], self.sourceDateCol: [], self.sourceTimeCol: []}
+        mindates = {}
+        md5 = hashlib.md5()
+        nat = np.iinfo(np.int64).min
+        for first_row, column_values in self._read_chunks(md5):
+            for col in (self.sourceLatCol, self.sourceLonCol):
+                _coords_dd, error_rows = dm2dd_array(column_values[col])
+                errors[col].extend(r + first_row for r in error_rows)
+            timestamps, date_errors, time_errors = datetime_array(column_values[self.sourceDateCol],
+                                                                  column_values[self.sourceTimeCol])
+            errors[self.sourceDateCol].extend(r + first_row for r in date_errors)
+            errors[self.sourceTimeCol].extend(r + first_row for r in time_errors)
+            # Earliest time stamp of each transect in the chunk -- first row of each transect after sorting
+            trans = str2num(column_values[sourceTrkCol])
+            ts = timestamps.view(np.int64)
+            ok = ts != nat
+            trans, ts = trans[ok], ts[ok]
+            order = np.lexsort((ts, trans))
+            trans, ts = trans[order], ts[order]
+            first = np.concatenate(([0], np.flatnonzero(trans[1:] != trans[:-1]) + 1)) if len(trans) else []
+            for tran, mindate in zip(trans[first].tolist(), ts[first].tolist()):
+                mindates[tran] = min(mindate, mindates.get(tran, mindate))
+            self._scan_rows += len(column_values[sourceTrkCol])
+        self._scan_errors = errors
+        self._transect_mindates = mindates
+        self._content_hash = md5.hexdigest()
+
+    @property
+    def transect_mindates(self):
+        """dictionary of transect number (key), earliest time stamp in int64 microseconds (value)"""
+        self._scan()
+        return self._transect_mindates
+
+    @property
+    def content_hash(self):
+        """MD5 hash of the csv file contents (None if the file could not be read)"""
+        try:
+            self._scan()
+        except:
             return None
+        return self._content_hash
+
+    @property
+    def rows(self):
+        """not available for streamed files -- rows are read in chunks"""
+        return []
+
+    @property
+    def n_rows(self):
+        """not available for streamed files -- rows are read in chunks"""
+        return None
+
+    @property
+    def has_rows(self):
+        """Binary attribute indicating the csv file has at least one data row (from the first pass)"""
+        self._scan()
+        return self._scan_rows > 0
+
+    def _validate_latlon(self, col):
+        self._scan()
+        return self._scan_errors[col]
+
+    def _validate_time(self):
+        self._scan()
+        return self._scan_errors[self.sourceTimeCol]
+
+    def _validate_date(self):
+        self._scan()
+        return self._scan_errors[self.sourceDateCol]
+
+    @property
+    def dataframe(self):
+        """not available for streamed files -- use chunks"""
+        return None
+
+    def chunks(self):
+        """ Generator of CsvChunk objects, the second pass over the file
+            Each chunk has a dataframe of up to chunk_rows rows, indexed by row number in the file
+        """
+        for first_row, column_values in self._read_chunks():
+            coords = {}
+            for col in (self.sourceLatCol, self.sourceLonCol):
+                coords[col] = dm2dd_array(column_values[col])[0]
+            timestamps = datetime_array(column_values[self.sourceDateCol], column_values[self.sourceTimeCol])[0]
+            yield CsvChunk(self, self._make_dataframe(column_values, coords, timestamps, first_row))
+
+
+class CsvChunk(object):
+    """ Represents one chunk of rows from a CsvStream
+    Has the properties of a CsvSource that are used by CsvData
+
+    Properties:
+    file_path -- full path to the csv file
+    columns -- combined list of base columns and veg columns in source csv file
+    veg_columns -- list of vegetation columns in source csv file
+    dataframe -- pandas dataframe of the rows in the chunk
+
+    """
+
+    def __init__(self, csv_stream, dataframe):
+        self.file_path = csv_stream.file_path
+        self._columns = csv_stream.columns
+        self._veg_columns = csv_stream.veg_columns
+        self.dataframe = dataframe
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    @property
+    def veg_columns(self):
+        return list(self._veg_columns)
+
+
+class RuleSet(object):
+    """ Represents a set of data validation rules, compiled for evaluation into a bit mask per row
+    Bit i of the mask is set for rows flagged by rule i.  Rules that flag a whole site visit set bit i of a file mask
+
+    Properties:
+    rules -- list of (name, expression, severity)
+    codes -- compiled rule expressions
+    names -- set of names used in the rule expressions
+    warning_bits -- bit mask of the rules with severity 'warning'
+
+    """
+
+    MAX_RULES = 32
+
+    def __init__(self, rules):
+        if len(rules) > self.MAX_RULES:
+            raise ValueError("Too many validation rules: {0} (maximum {1})".format(len(rules), self.MAX_RULES))
+        self.rules = list(rules)
+        self.codes = [compile(expression, name, 'eval') for name, expression, severity in self.rules]
+        self.names = set(name for code in self.codes for name in code.co_names)
+        self.warning_bits = sum(1 << i for i, rule in enumerate(self.rules) if rule[2] == 'warning')
+
+    def evaluate(self, namespace, n_rows):
+        """ Evaluate all of the rules
+
+        :param namespace: dictionary of names used in the rule expressions
+        :param n_rows: number of rows
+        :return: tuple of row mask (uint32 array) and file mask (int)
+        """
+        row_mask = np.zeros(n_rows, dtype=np.uint32)
+        file_mask = 0
+        for bit, code in enumerate(self.codes):
+            flagged = eval(code, {}, namespace)
+            if np.ndim(flagged) == 0:
+                if flagged:
+                    file_mask |= 1 << bit
+            else:
+                row_mask |= np.asarray(flagged, dtype=np.uint32) << np.uint32(bit)
+        return row_mask, file_mask
+
+    def warns(self, fired):
+        """ Flag indicating that any of the fired rules (bit mask) is a warning """
+        return bool(fired & self.warning_bits)
+
+    def results(self, fired, file_mask, rule_rows):
+        """ List of (log name, list of point ids or None for the whole site visit) for the fired rules
+
+        :param fired: bit mask of fired rules
+        :param file_mask: bit mask of rules that flag the whole site visit
+        :param rule_rows: function returning the point ids of the rows flagged by a rule (bit number)
+        """
+        _results = []
+        for bit, (name, expression, severity) in enumerate(self.rules):
+            if fired & (1 << bit):
+                log_name = name if severity == 'warning' else '{0}: {1}'.format(severity.capitalize(), name)
+                _results.append((log_name, None if file_mask & (1 << bit) else rule_rows(bit)))
+        return _results
+
+
+# Compiled rule sets by site code
+_rule_sets = {}
+
+def site_rule_set(sitecode):
+    # Compiled validation rules for a site:  VALIDATION_RULES and the matching SITE_RULES
+    if sitecode not in _rule_sets:
+        rules = list(VALIDATION_RULES)
+        for pattern in sorted(SITE_RULES):
+            if fnmatch.fnmatch(sitecode, pattern):
+                rules.extend(SITE_RULES[pattern])
+        _rule_sets[sitecode] = RuleSet(rules)
+    return _rule_sets[sitecode]
 
 
 class CsvData(object):
@@ -371,15 +1166,34 @@ class CsvData(object):
     csv_source -- the input CsvSource object
     source_columns -- the relevant columns in the csv source that are needed for data processing
     source_veg_columns -- list of vegetation columns in source csv file
-    veg_columns -- vegetation columns -- may get updated if nativesg is added
+    veg_columns -- vegetation columns -- the source columns, followed by the derived columns (see VEG_COMPOSITES)
     df -- pandas dataframe of the csv source data
     nparray -- structured NumPy array created from the pandas dataframe
+    compact_nparray -- structured NumPy array with smaller data types, and codes for survey_id and site_code
+    transect_mindates -- optional dictionary of transect number (key), earliest time stamp (value, int64 microseconds)
+        for data that is only part of a file (see CsvStream).  Otherwise calculated from the data frame
+    transect_lastts -- optional dictionary of transect number (key), last time stamp in earlier parts of the file
+        (value, int64 microseconds).  Rows with the same time stamp are flagged as duplicates
+    tide_file -- optional tide station file (see tides) to reduce the depths to MLLW
+    depth_fill_seconds -- longest gap (seconds) between observed depths across which missing interpolated depths
+        are filled (0 for no filling, see DEPTH_FILL_SECONDS)
+    transects -- sorted array of the transect numbers
+    tran_codes -- transect code of each row (index into transects, in data frame order)
+    rules -- RuleSet object with the data validation rules for the site
+    rule_mask -- bit mask of the validation rules that flag each row (uint32 array, in data frame order)
+    file_mask -- bit mask of the validation rules that flag the whole site visit
+    warnings -- flag indicating that a validation rule with severity 'warning' was fired
 
     """
 
-    def __init__(self, csv_source):
+    def __init__(self, csv_source, transect_mindates=None, transect_lastts=None, tide_file=None,
+                 depth_fill_seconds=DEPTH_FILL_SECONDS):
         # Get some properties from the csv_source object
         self.csv_source = csv_source
+        self.transect_mindates = transect_mindates
+        self.transect_lastts = transect_lastts
+        self.tide_file = tide_file
+        self.depth_fill_seconds = depth_fill_seconds
         self.source_columns = self.csv_source.columns
         self.veg_columns = self.csv_source.veg_columns
         self.source_veg_columns = self.csv_source.veg_columns
@@ -419,18 +1233,49 @@ class CsvData(object):
             _veg_dtype.append((veg,'<i4'))
         return _veg_dtype
 
+    @property
+    def compact_dtype(self):
+        """" NumPy Data types for the compact layout (see compact_nparray) """
+        # int16 holds the 0/1 flags and the null value (-9999), float32 holds depths to the centimeter
+        compact = {surveyidCol: '<i2', siteCol: '<i2', depObsCol: '<f4', depInterpCol: '<f4', videoCol: '<i2'}
+        _compact_dtype = [(name, compact.get(name, dtype)) for name, dtype in self.base_dtype]
+        for veg in self.veg_columns:
+            _compact_dtype.append((veg, '<i2'))
+        return _compact_dtype
+
     @property
     def nparray(self):
         """" NumPy Array converted from the pandas dataframe """
-        # Convert pandas data frame to numpy record array (a type of structured array)
-        _nparray = self.df.to_records()
-        # Change datatypes to ones compatible with ArcPy
-        # This will also subset and re-order columns according to order in array
-        dtypes = self.base_dtype + self.veg_dtype
-        # Create NumPy data types object
-        td_dtype = np.dtype(dtypes)
-        # Apply data types to NumPy array
-        _nparray = _nparray.astype(td_dtype)
+        # Data types compatible with ArcPy, in the order of the feature class fields
+        return self._fill_nparray(self.base_dtype + self.veg_dtype)
+
+    @property
+    def survey_ids(self):
+        """ Sorted array of the survey ids (survey_id codes of compact_nparray index this array) """
+        return pd.factorize(self.df[surveyidCol].values, sort=True)[1]
+
+    @property
+    def site_codes(self):
+        """ Sorted array of the site codes (site_code codes of compact_nparray index this array) """
+        return pd.factorize(self.df[siteCol].values, sort=True)[1]
+
+    @property
+    def compact_nparray(self):
+        """" NumPy Array with smaller data types, for analysis in memory (not for feature classes)
+        Flags are int16, depths are float32, and survey_id and site_code are codes into survey_ids and site_codes
+        """
+        codes = {}
+        for col in (surveyidCol, siteCol):
+            codes[col] = pd.factorize(self.df[col].values, sort=True)[0]
+        return self._fill_nparray(self.compact_dtype, codes)
+
+    def _fill_nparray(self, dtypes, values=None):
+        # Structured array allocated once and filled one field at a time from the data frame columns
+        # (or from values, a dictionary of field name and array), converting each column to its data type
+        # Avoids the copies of DataFrame.to_records and astype, which hold the whole array two more times
+        _nparray = np.empty(len(self.df), dtype=np.dtype(dtypes))
+        for name in _nparray.dtype.names:
+            _nparray[name] = values[name] if values and name in values else self.df[name].values
         return _nparray
 
     def _process_data(self):
@@ -441,99 +1286,169 @@ class CsvData(object):
         self._add_pointid()
         # Sort rows by transect id and timestamp
         self._sort_rows()
+        # Fill missing interpolated depths from the observed depths
+        self._fill_depth()
+        # Reduce depths to MLLW with the tide heights
+        self._correct_tide()
         # Fill Null records with a value
         self._fill_nulls()
         # Set site_code to lower case
         self._lower_site_code()
         # Create survey_id
         self._calc_survey_id()
-        # Calculate nativesg column if at least one of the veg columns is a Native seagrass type
-        if set(self.veg_columns).intersection(set(NATIVESG_CODES)) > 0:
-            self.nativesg_columns = list(set(self.veg_columns).intersection(set(NATIVESG_CODES)))
-            self._calc_nativesg()
-        #
-
-    def _calc_nativesg(self):
-        # Calculate the nativesg column based on values in the individual seagrass observations
-        # Rows with any NULLs for native seagrass types
-        df_null = (self.df[self.nativesg_columns] == NULL_VEG).any(axis=1)
-        # Rows with any PRESENT for native seagrass types
-        df_present = (self.df[self.nativesg_columns] == 1).any(axis=1)
-        # Rows with all ABSENT for native seagrass types
-        df_absent = (self.df[self.nativesg_columns] == 0).all(axis=1)
-
-        # This Gets Maximum value of all veg columns - works when all input veg columns are non-null and video = 1
-        # Not needed, but saved for reference
-        # self.df[nativesgCol] = self.df[self.nativesg_columns].max(axis=1)
-
-        # If _any_ native seagrass observations are present, set nativesg column to present (1)
-        self.df.loc[df_present, nativesgCol] = 1
-        # If _all_ native seagrass observations are absent, set nativesg column to absent (0)
-        self.df.loc[df_absent, nativesgCol] = 0
-        # If _any_ native seagrass observations are unknown, and there are NO present observations,
-        #  set nativesg column to NULL/unknown (-9999)
-        # Note:  in pandas ~ gets the inverse of a boolean dataframe
-        self.df.loc[df_null & ~df_present, nativesgCol] = NULL_VEG
-        # Finally, If video = 0 (bad quality) or null, set nativesg column to null/unknown (-9999)
-        self.df.loc[self.df[videoCol] == 0, nativesgCol] = NULL_VEG
-        self.df.loc[self.df[videoCol] == NULL_VIDEO, nativesgCol] = NULL_VEG
-
-        # Add the native seagrass column to the veg columns list
-        self.veg_columns.append(nativesgCol)
-
-    @property
-    def video_zero(self):
-        # Validate video field.  Max of video column must be > 0
-        if self.df[videoCol].max() < 1:
-            return True
-        else:
-            return False
+        # Calculate the derived veg columns (i.e. nativesg) from the individual veg columns
+        self._calc_composites()
+
+    def _calc_composites(self):
+        # Calculate the derived veg columns (see VEG_COMPOSITES) in one pass over the veg values
+        # The veg values are compared with present, absent and null once, for all of the composites,
+        # and each composite reduces the comparisons of its member columns
+        composites = []
+        for name, codes in VEG_COMPOSITES:
+            members = [i for i, col in enumerate(self.source_veg_columns) if col in codes]
+            if members:
+                composites.append((name, members))
+        if not composites:
+            return
+        veg = self.df[self.source_veg_columns].values
+        present = veg == 1
+        absent = veg == 0
+        null = veg == NULL_VEG
+        # If video = 0 (bad quality) or null, composites are null/unknown
+        video = self.df[videoCol].values
+        bad_video = (video == 0) | (video == NULL_VIDEO)
+        for name, members in composites:
+            any_present = present[:, members].any(axis=1)
+            # Rows with other member values (i.e. Veg Values > 1) and none present are left undefined (NaN)
+            values = np.where(any_present, 1.0, np.where(absent[:, members].all(axis=1), 0.0, np.nan))
+            values[(null[:, members].any(axis=1) & ~any_present) | bad_video] = NULL_VEG
+            self.df[name] = values
+            # Add the composite column to the veg columns list
+            self.veg_columns.append(name)
 
     @property
-    def veg1_video0(self):
-        # rows where video=0 but any veg column = 1
-        df_video0 = self.df[videoCol] == 0
-        df_veg1 = (self.df[self.source_veg_columns] == 1).any(axis=1)
-        _veg1_video0 = self.df.loc[df_video0 & df_veg1, ptidCol].tolist()
-        return _veg1_video0
+    def n_rows(self):
+        """ Number of data rows """
+        return len(self.df)
 
     @property
-    def dupe_ts(self):
-        # Rows with duplicate time stamps
-        _dupe_ts = self.df[self.df.duplicated([datetimeCol])][ptidCol].tolist()
+    def timestamps(self):
+        """ Time stamps as int64 microseconds (for sorting and comparison)"""
+        return self.df[datetimeCol].values.astype('<M8[us]').view(np.int64)
+
+    def _dupe_ts(self):
+        # Rows with duplicate time stamps -- all but the first occurrence, in data frame order
+        # Stable sort of the int64 time stamps puts duplicates next to each other
+        ts = self.timestamps
+        order = np.argsort(ts, kind='mergesort')
+        sorted_ts = ts[order]
+        _dupe_ts = np.zeros(len(ts), dtype=bool)
+        _dupe_ts[order[1:][sorted_ts[1:] == sorted_ts[:-1]]] = True
+        # Rows with the last time stamp of their transect in an earlier part of the file
+        if self.transect_lastts:
+            nat = np.iinfo(np.int64).min
+            lastts = [self.transect_lastts.get(tran, nat) for tran in self.transects.tolist()]
+            _dupe_ts |= ts == np.array(lastts, dtype=np.int64)[self.tran_codes]
         return _dupe_ts
 
-    @property
-    def null_veg(self):
-        # Filter for Rows with null vegetation codes
-        df_null = (self.df[self.source_veg_columns] == NULL_VEG).any(axis=1)
-        # Make a list of row ids with null vegetation values
-        _null_veg = self.df.loc[df_null][ptidCol].tolist()
-        return _null_veg
+    def _rule_namespace(self):
+        # Arrays of the site visit data used by the validation rule expressions
+        veg = self.df[self.source_veg_columns].values
+        namespace = {
+            'np': np,
+            'NULL_DEPTH': NULL_DEPTH,
+            'NULL_VEG': NULL_VEG,
+            'NULL_VIDEO': NULL_VIDEO,
+            'GPS_MAX_SPEED': GPS_MAX_SPEED,
+            'any_veg': lambda flags: flags.any(axis=1),
+            'all_veg': lambda flags: flags.all(axis=1),
+            'video': self.df[videoCol].values,
+            'depth_obs': self.df[depObsCol].values,
+            'depth_interp': self.df[depInterpCol].values,
+            'tran_num': self.df[tranCol].values,
+            'depth_filled': self.depth_filled,
+            'tide_missing': self.tide_missing,
+            'veg': veg,
+        }
+        for i, col in enumerate(self.source_veg_columns):
+            namespace[col] = veg[:, i]
+        # Derived arrays, only calculated if a rule uses them
+        if 'timestamps' in self.rules.names:
+            namespace['timestamps'] = self.timestamps
+        if 'dupe_ts' in self.rules.names:
+            namespace['dupe_ts'] = self._dupe_ts()
+        if self.rules.names.intersection(TRACK_ARRAYS):
+            namespace.update(self._track_steps())
+        return namespace
+
+    def _track_steps(self):
+        """ GPS track arrays, in data frame order (by transect and time stamp)
+        Steps are from the previous point of the same transect, and are 0 for the first point of a transect
+        step_dist -- distance in meters (equirectangular approximation, good for the short steps of a transect)
+        time_gap -- time in seconds
+        speed -- step_dist / time_gap (0 where the time gap is 0)
+        stationary -- points in runs of steps shorter than GPS_STATIONARY_METERS lasting GPS_STATIONARY_SECONDS
+        time_reversal -- points with an earlier time stamp than the point before them in the csv file
+
+        Note: for data that is only part of a file (see CsvStream), steps across the parts are not checked
+        """
+        n = len(self.df)
+        ts = self.timestamps
+        # Steps within a transect:  rows after the first row of their transect
+        step = np.ones(n, dtype=bool)
+        step[self.transect_starts[self.transect_starts < n]] = False
+        lat = np.radians(self.df[latCol].values)
+        lon = np.radians(self.df[lonCol].values)
+        step_dist = np.zeros(n)
+        time_gap = np.zeros(n)
+        if n > 1:
+            dx = np.diff(lon) * np.cos((lat[1:] + lat[:-1]) / 2.0)
+            step_dist[1:] = EARTH_RADIUS * np.sqrt(dx ** 2 + np.diff(lat) ** 2)
+            time_gap[1:] = np.diff(ts) / 1e6
+        step_dist[~step | np.isnan(step_dist)] = 0.0
+        time_gap[~step] = 0.0
+        speed = np.zeros(n)
+        moving = time_gap > 0
+        speed[moving] = step_dist[moving] / time_gap[moving]
+
+        # Stationary runs of steps, with the point before the first step of each run
+        still = step & (step_dist < GPS_STATIONARY_METERS)
+        idx = np.arange(n)
+        first = still & ~np.concatenate(([False], still[:-1]))
+        last = still & ~np.concatenate((still[1:], [False]))
+        run_start = np.maximum.accumulate(np.where(first, idx - 1, 0))
+        run_end = np.minimum.accumulate(np.where(last, idx, n - 1)[::-1])[::-1]
+        stationary = still & (ts[run_end] - ts[run_start] >= GPS_STATIONARY_SECONDS * 1e6)
+        stationary[run_start[stationary]] = True
+
+        # Time reversals in csv file order (point ids), within each transect
+        time_reversal = np.zeros(n, dtype=bool)
+        if n > 1:
+            file_order = np.argsort(self.df[ptidCol].values, kind='mergesort')
+            file_ts = ts[file_order]
+            file_tran = self.tran_codes[file_order]
+            time_reversal[file_order[1:]] = (file_ts[1:] < file_ts[:-1]) & (file_tran[1:] == file_tran[:-1])
+
+        return {
+            'step_dist': step_dist,
+            'time_gap': time_gap,
+            'speed': speed,
+            'stationary': stationary,
+            'time_reversal': time_reversal,
+        }
 
-    @property
-    def null_video(self):
-        # Filter for Rows with null video codes
-        df_null = self.df[videoCol] == NULL_VIDEO
-        # Make a list of row ids with null vegetation values
-        _null_video = self.df.loc[df_null][ptidCol].tolist()
-        return _null_video
+    def rule_rows(self, bit):
+        """ Point ids of the rows flagged by a validation rule (bit number) """
+        return self.df[ptidCol].values[(self.rule_mask >> np.uint32(bit)) & 1 == 1].tolist()
 
     @property
-    def veg_gt1(self):
-        # Filter for rows with vegetation values > 1
-        df_gt1 = (self.df[self.source_veg_columns] > 1).any(axis=1)
-        # Make a list of row ids with null vegetation values
-        _veg_gt1 = self.df.loc[df_gt1][ptidCol].tolist()
-        return _veg_gt1
+    def rule_bits(self):
+        """ Bit mask of the validation rules that flag any row """
+        return int(np.bitwise_or.reduce(self.rule_mask)) if len(self.rule_mask) else 0
 
-    @property
-    def video_gt1(self):
-        # Filter for Rows with video values > 1
-        df_gt1 = self.df[videoCol] > 1
-        # Make a list of row ids with null vegetation values
-        _video_gt1 = self.df.loc[df_gt1][ptidCol].tolist()
-        return _video_gt1
+    def rule_results(self):
+        """ List of (warning type, list of point ids or None) for the validation rules that were fired """
+        return self.rules.results(self.rule_bits | self.file_mask, self.file_mask, self.rule_rows)
 
     @property
     def transect_video0(self):
@@ -546,10 +1461,11 @@ class CsvData(object):
         return df_max
 
     def _validate_data(self):
-        # Check validation properties
-        if self.video_zero or self.null_video or self.null_veg or self.video_gt1 \
-                or self.veg_gt1 or self.veg1_video0 or self.dupe_ts:
-            self.warnings = True
+        # Evaluate the validation rules for the site in one pass over the data
+        sitecode = os.path.basename(self.csv_source.file_path).split('_')[0].lower()
+        self.rules = site_rule_set(sitecode)
+        self.rule_mask, self.file_mask = self.rules.evaluate(self._rule_namespace(), len(self.df))
+        self.warnings = self.rules.warns(self.rule_bits | self.file_mask)
 
     def _rename_columns(self):
         # Rename some input columns to match feature class
@@ -567,6 +1483,44 @@ class CsvData(object):
         # Add point ID column
         self.df[ptidCol] = self.df.index + 1
 
+    def _fill_depth(self):
+        # Fill missing interpolated depths from the observed depths of the transect, across gaps of up to
+        # depth_fill_seconds (see DEPTH_FILL_SECONDS)
+        # One interpolation for all transects:  the time stamps are offset by transect, so transects do not overlap
+        # and a gap between transects is always longer than the maximum gap
+        # Note: for data that is only part of a file (see CsvStream), gaps across the parts are not filled
+        self.depth_filled = np.zeros(len(self.df), dtype=bool)
+        if not self.depth_fill_seconds:
+            return
+        depth_obs = self.df[depObsCol].values
+        depth_interp = self.df[depInterpCol].values.astype(np.float64)
+        observed = ~np.isnan(depth_obs)
+        rows = np.flatnonzero(np.isnan(depth_interp))
+        if not len(rows) or not observed.any():
+            return
+        max_gap = self.depth_fill_seconds * 1e6
+        ts = self.timestamps - self.timestamps.min()
+        key = (ts + self.tran_codes * (ts.max() + max_gap + 1)).astype(np.float64)
+        filled = tides.interp_max_gap(key[rows], key[observed], depth_obs[observed], max_gap)
+        rows = rows[~np.isnan(filled)]
+        depth_interp[rows] = filled[~np.isnan(filled)]
+        self.df[depInterpCol] = depth_interp
+        self.depth_filled[rows] = True
+
+    def _correct_tide(self):
+        # Reduce the observed and interpolated depths to MLLW with the tide heights of the site's station,
+        # interpolated in time for all rows at once (see tides.tide_heights)
+        # Depths without a tide height (outside the station file, or in a gap) are set to null
+        self.tide_missing = np.zeros(len(self.df), dtype=bool)
+        if not self.tide_file:
+            return
+        heights = tides.tide_heights(self.tide_file, self.timestamps)
+        no_tide = np.isnan(heights)
+        for col in (depObsCol, depInterpCol):
+            depths = self.df[col].values.astype(np.float64)
+            self.tide_missing |= no_tide & ~np.isnan(depths)
+            self.df[col] = depths + heights
+
     def _fill_nulls(self):
         # Change null depth values to a placeholder integer value
         self.df.fillna({
@@ -583,20 +1537,111 @@ class CsvData(object):
         self.df[siteCol] = self.df[siteCol].str.lower()
 
     def _calc_survey_id(self):
-        # Get the minimum date stamp for each transect and apply it back to the original data frame
-        transect_mindate = self.df.groupby(tranCol)[datetimeCol].transform(lambda x: x.min())
+        # Minimum time stamp of each transect -- the first row of the transect after sorting,
+        # or from the whole file for data that is only part of a file
+        if self.transect_mindates is not None:
+            mindates = np.array([self.transect_mindates[tran] for tran in self.transects.tolist()], dtype=np.int64)
+        else:
+            mindates = self.timestamps[self.transect_starts]
         # Create survey_id
-        # concatenate survey_id, date as string and transect number
-        self.df[surveyidCol] = self.df[siteCol] + "_" + \
-                          transect_mindate.dt.year.map(str) + \
-                          transect_mindate.dt.month.map(lambda x: '{:02d}'.format(x)) + \
-                          transect_mindate.dt.day.map(lambda x: '{:02d}'.format(x)) + "_" + \
-                          self.df[tranCol].map(lambda x: '{:02d}'.format(x))
+        # concatenate site code, date as string and transect number.  One string per transect,
+        # broadcast back to the rows by transect code
+        dates = np.datetime_as_string(mindates.astype('<M8[us]').astype('<M8[D]'))
+        suffixes = np.array(['_{0}_{1:02d}'.format(date.replace('-', ''), tran)
+                             for date, tran in zip(dates.tolist(), self.transects.tolist())], dtype=object)
+        self.df[surveyidCol] = self.df[siteCol] + pd.Series(suffixes[self.tran_codes], index=self.df.index)
 
     def _sort_rows(self):
         # Sort the dataframe by transect number and time stamp
-        # Note:  in later versions of pandas (0.17.0), this is deprecated and replaced by sort_values
-        self.df.sort([tranCol, datetimeCol], inplace=True)
+        # Transect numbers are factorized into integer codes (in transect number order) once, and reused
+        # for the survey_id and for grouping rows by transect.
+        # Stable NumPy sort on the integer keys (the last key in lexsort is the primary sort key)
+        self.transects, tran_codes = np.unique(self.df[tranCol].values, return_inverse=True)
+        order = np.lexsort((self.timestamps, tran_codes))
+        self.df = self.df.reindex(self.df.index[order])
+        self.tran_codes = tran_codes[order]
+
+    @property
+    def transect_starts(self):
+        """ Index of the first row of each transect (rows are sorted by transect) """
+        return np.searchsorted(self.tran_codes, np.arange(len(self.transects)))
+
+class CsvDataStream(object):
+    """ Represents the data for a single site visit, converted one chunk of rows at a time
+    Used for csv files too large to convert in memory (see CsvStream).
+    Each chunk is processed as a CsvData object, using the earliest time stamps of the transects from the whole file
+
+    Properties:
+    csv_source -- the input CsvStream object
+    tide_file -- optional tide station file (see CsvData)
+    depth_fill_seconds -- longest gap (seconds) across which missing interpolated depths are filled (see CsvData)
+    warnings -- flag for data validation warnings (set after all chunks have been converted)
+    rules -- RuleSet object with the data validation rules for the site (from the first chunk)
+    rule_bits -- bit mask of the validation rules that flag any row of any chunk
+    file_mask -- bit mask of the validation rules that flag every chunk as a whole
+    point_ids -- dictionary of validation rule (bit number) and point ids of the flagged rows in all chunks
+    n_rows -- number of data rows converted
+
+    Note: duplicate time stamps across chunk boundaries are found by comparing with the last time stamp
+    of the transect in the previous chunks, which assumes the rows of each transect are in time order
+
+    """
+
+    def __init__(self, csv_source, tide_file=None, depth_fill_seconds=DEPTH_FILL_SECONDS):
+        self.csv_source = csv_source
+        self.tide_file = tide_file
+        self.depth_fill_seconds = depth_fill_seconds
+        self.warnings = False
+        self.rules = None
+        self.rule_bits = 0
+        self.file_mask = 0
+        self.point_ids = {}
+        self.n_rows = 0
+        self._last_ts = {}  # transect number (key), last time stamp in the previous chunks (value)
+
+    def _chunk_data(self):
+        # Generator of CsvData objects, one per chunk, accumulating the data validation results
+        transect_mindates = self.csv_source.transect_mindates
+        for i, chunk in enumerate(self.csv_source.chunks()):
+            transectData = CsvData(chunk, transect_mindates, self._last_ts, self.tide_file, self.depth_fill_seconds)
+            self._add_warnings(transectData, i == 0)
+            yield transectData
+        if self.rules:
+            self.warnings = self.rules.warns(self.rule_bits | self.file_mask)
+
+    def nparrays(self):
+        """ Generator of structured NumPy arrays of the transect data, one per chunk """
+        for transectData in self._chunk_data():
+            yield transectData.nparray
+
+    def validate(self):
+        """ Run the data validation of all chunks, without converting them to NumPy arrays """
+        for transectData in self._chunk_data():
+            pass
+
+    def _add_warnings(self, transectData, first_chunk):
+        # Accumulate the data validation results of a chunk
+        # Rules for whole site visits must be true for every chunk (i.e. "all rows" rules like All Video < 1)
+        self.rules = transectData.rules
+        self.n_rows += transectData.n_rows
+        self.file_mask = transectData.file_mask if first_chunk else self.file_mask & transectData.file_mask
+        self.rule_bits |= transectData.rule_bits
+        for bit in range(len(self.rules.rules)):
+            if transectData.rule_bits & (1 << bit):
+                self.point_ids.setdefault(bit, []).extend(transectData.rule_rows(bit))
+        # Last time stamp of each transect, for duplicates in the next chunks
+        transects = transectData.transects
+        if len(transects):
+            last = np.append(transectData.transect_starts[1:], len(transectData.df)) - 1
+            self._last_ts.update(zip(transects.tolist(), transectData.timestamps[last].tolist()))
+
+    def rule_results(self):
+        """ List of (warning type, list of point ids or None) for the validation rules that were fired """
+        if not self.rules:
+            return []
+        return self.rules.results(self.rule_bits | self.file_mask, self.file_mask,
+                                  lambda bit: self.point_ids.get(bit, []))
+
 
 class PointFC(object):
     """ Represents the a point feature class for a single site visit
@@ -604,27 +1649,70 @@ class PointFC(object):
     Properties:
     td_nparray -- The transect point data stored as a NumPy Array
     output_fc -- full path to the output feature class
-    source_sr -- spatial reference of the source csv data
     output_sr -- spatial reference of the final output feature class
 
+    The lat/lon points are projected in NumPy (wa_south_xy) and written once in the output coordinate system
+
     """
 
     def __init__(self, td_nparray, output_fc):
         self.td_nparray = td_nparray # Transect data in a structured NumPy array
         self.output_fc = output_fc # Full path to output feature class
-        self.source_sr = arcpy.SpatialReference(4326)  # Geographic, WGS-84
         self.output_sr = arcpy.SpatialReference(2927) # NAD_1983_HARN_StatePlane_Washington_South_FIPS_4602_Feet
 
+    @staticmethod
+    def projected(nparray, x, y):
+        """ Copy of a structured array with the longitude/latitude fields replaced by projected x/y """
+        xy_array = nparray.copy()
+        xy_array[lonCol], xy_array[latCol] = x, y
+        return xy_array
+
     def create_fc(self):
+        self.create_fc_chunks(project_points([self.td_nparray]))
+
+    def create_fc_chunks(self, points):
+        """ Create the feature class from a sequence of (structured NumPy array, x, y) for chunks of rows
+            (see project_points).  The first chunk creates the feature class, and the others are appended to it
+        """
         if arcpy.Exists(self.output_fc):
             arcpy.Delete_management(in_data=self.output_fc)
-        # Create temporary lat/long version of point using "in_memory" location
         temp_fc = "in_memory/temp"
-        arcpy.da.NumPyArrayToFeatureClass(self.td_nparray, temp_fc, [lonCol, latCol], self.source_sr)
-        # Project to output coordinate system
-        arcpy.Project_management(temp_fc, self.output_fc, self.output_sr)
-        # Remove the temporary feature class
-        arcpy.Delete_management(temp_fc)
+        for i, (nparray, x, y) in enumerate(points):
+            if i == 0:
+                arcpy.da.NumPyArrayToFeatureClass(self.projected(nparray, x, y), self.output_fc, [lonCol, latCol], self.output_sr)
+            else:
+                arcpy.da.NumPyArrayToFeatureClass(self.projected(nparray, x, y), temp_fc, [lonCol, latCol], self.output_sr)
+                arcpy.Append_management(temp_fc, self.output_fc, "NO_TEST")
+                arcpy.Delete_management(temp_fc)
+
+
+class PointGpkg(object):
+    """ Represents the points for a single site visit in the point table for its survey year in a GeoPackage
+    Alternative to PointFC that does not need ArcGIS (see gpkg.GeoPackage)
+
+    Properties:
+    td_nparray -- The transect point data stored as a NumPy Array
+    geopackage -- open gpkg.GeoPackage object
+    table -- name of the point table for the survey year
+    site_visit -- site visit name (sitecode_YYYY_##)
+
+    """
+
+    def __init__(self, td_nparray, geopackage, site_visit):
+        self.td_nparray = td_nparray
+        self.geopackage = geopackage
+        self.table = site_visit.table
+        self.site_visit = site_visit.name
+
+    def create_rows(self):
+        self.create_rows_chunks(project_points([self.td_nparray]))
+
+    def create_rows_chunks(self, points):
+        """ Replace the site visit points in the table with those from a sequence of (structured NumPy array, x, y)
+            (see project_points)
+        """
+        xy_arrays = (PointFC.projected(nparray, x, y) for nparray, x, y in points)
+        self.geopackage.write_points(self.table, self.site_visit, xy_arrays, [lonCol, latCol])
 
 
 class VegCodes( object ):
@@ -656,7 +1744,91 @@ class SiteVisit(object):
         self.sitecode = sitecode
         self.yr = yr
         self.group = group
+        self.name = "_".join([sitecode, yr, group])
         self.fc = "_".join([sitecode, yr, group, 'transect','pt'])
+        self.table = gpkg.table_name(yr)  # point table in a GeoPackage
+
+
+class Manifest(object):
+    """ Represents the content manifest of transect data files that have been converted to point feature classes
+    Stored as a JSON file next to the output geodatabase, and used to skip unchanged files on later runs
+
+    Properties:
+    manifest_file -- full path to the manifest file
+    exists -- function to test if the output of a csv file exists (arcpy.Exists, or GeoPackage.path_exists)
+    entries -- dictionary of csv file path (key) and dictionary of file attributes (value):
+        size, mtime, hash (MD5 of contents), veg_version (version of the veg code list), fc (output feature class)
+
+    """
+
+    def __init__(self, out_gdb, exists=None):
+        gdb_dir, gdb_name = os.path.split(os.path.normpath(out_gdb))
+        self.manifest_file = os.path.join(gdb_dir, os.path.splitext(gdb_name)[0] + '_csv2pt_manifest.json')
+        self.exists = exists or arcpy.Exists
+        self.entries = {}
+
+    @staticmethod
+    def key(file_path):
+        """Normalized csv file path used as the manifest key"""
+        return os.path.normcase(os.path.normpath(os.path.abspath(file_path)))
+
+    @staticmethod
+    def veg_version(veg_list):
+        """Version identifier for a list of vegetation codes (MD5 hash of the sorted codes)"""
+        return hashlib.md5('\n'.join(sorted(veg_list)).encode('utf-8')).hexdigest()
+
+    def load(self):
+        # Read the manifest file from a previous run, if there is one
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, 'r') as fh:
+                    self.entries = json.load(fh)
+            except ValueError:
+                # Unreadable manifest -- start over with a full load
+                self.entries = {}
+
+    def save(self):
+        ptcache.write_json(self.entries, self.manifest_file)
+
+    def unchanged(self, file_path, veg_version, fc_path, stat=None):
+        """ Flag indicating the csv file has not changed since its feature class was created
+            Compares file size and modification time, the veg code list version and the output feature class,
+            and the feature class must still exist.  stat is the os.stat result of the file, if already known
+        """
+        entry = self.entries.get(self.key(file_path))
+        if not entry:
+            return False
+        stat = stat or os.stat(file_path)
+        if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+            return False
+        if entry['veg_version'] != veg_version or entry['fc'] != fc_path:
+            return False
+        return bool(self.exists(fc_path))
+
+    def same_content(self, file_path, file_hash, veg_version, fc_path):
+        """ Flag indicating the csv file contents (by hash) are the same as when its feature class was created
+            Catches files that were touched or copied without changes
+        """
+        entry = self.entries.get(self.key(file_path))
+        if not entry or file_hash is None:
+            return False
+        return entry['hash'] == file_hash and entry['veg_version'] == veg_version and entry['fc'] == fc_path \
+            and bool(self.exists(fc_path))
+
+    def update(self, file_path, file_hash, veg_version, fc_path, stat=None):
+        # Record the current state of a csv file and its output feature class
+        stat = stat or os.stat(file_path)
+        self.entries[self.key(file_path)] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'hash': file_hash,
+            'veg_version': veg_version,
+            'fc': fc_path,
+        }
+
+    def remove(self, file_path):
+        # Remove a csv file from the manifest, so it is processed again on the next run
+        self.entries.pop(self.key(file_path), None)
 
 
 class LogFile(object):
@@ -679,6 +1851,8 @@ class LogFile(object):
             return 'Directory,FileName,ErrorType,Details\n'
         if self.log_type == 'csv2ptWarningLog':
             return 'Directory,FileName,WarningType,Details\n'
+        if self.log_type == 'csv2ptValidationSummary':
+            return 'Directory,FileName,Status,Rows,Errors,Warnings\n'
 
     def open_log(self):
         # Open the log file for writing
@@ -691,100 +1865,242 @@ class LogFile(object):
         self.fh.close()
         self.fh = None
 
+    def write_lines(self, lines):
+        # Open the log file if it is not already open
+        if not self.fh:
+            self.open_log()
+        for line in lines:
+            self.fh.write(line)
+
+    def write_findings(self, findings):
+        self.write_lines(self.finding_lines(findings))
+
+    @staticmethod
+    def finding_lines(findings):
+        """ Log file lines for a list of findings:  (directory, file name, error or warning type, rows, details)
+            rows is a list of row numbers, written to the details column, or None
+        """
+        lines = []
+        for csv_dir, csv_file, err_type, rows, details in findings:
+            if rows is not None:
+                details = 'Rows: ' + ';'.join(str(r) for r in rows)
+            lines.append(",".join((csv_dir, csv_file, err_type, details)) + "\n")
+        return lines
+
     def write_csverr(self, csvsource):
+        self.write_findings(self.csverr_findings(csvsource))
 
+    @staticmethod
+    def csverr_findings(csvsource, header_only=False):
+        """ Errors of an invalid csv source file, as findings (see finding_lines).
+            Built separately from writing so they can be built in a worker process
+            With header_only = True, only the file and column errors are checked, so the file is not parsed
+        """
         csv_dir = os.path.normpath(os.path.dirname(csvsource.file_path))
         csv_file = os.path.basename(csvsource.file_path)
-
-        # Open the log file if it is not already open
-        if not self.fh:
-            self.open_log()
+        findings = []
 
         if not csvsource.file_exists:
-            err_type = "File Does Not Exist"
-            details = ""
-            self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
+            findings.append((csv_dir, csv_file, "File Does Not Exist", None, ""))
         else:
             if csvsource.missing_columns:
-                err_type = "Missing Columns"
-                details = ';'.join(csvsource.missing_columns)
-                self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
+                findings.append((csv_dir, csv_file, "Missing Columns", None, ';'.join(csvsource.missing_columns)))
                 # File has no vegetation columns
             if csvsource.veg_columns == []:
-                err_type = "No Vegetation Columns"
-                details = ""
-                self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
+                findings.append((csv_dir, csv_file, "No Vegetation Columns", None, ""))
+            if header_only:
+                return findings
+                # File has a header but no data rows
+            if not csvsource.has_rows:
+                findings.append((csv_dir, csv_file, "No Data Rows", None, ""))
                 # File has latitude format errors
             if csvsource.lat_errors:
-                err_type = "Bad Latitude Values"
-                details = 'Rows: ' + ';'.join(str(r) for r in csvsource.lat_errors)
-                self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
+                findings.append((csv_dir, csv_file, "Bad Latitude Values", csvsource.lat_errors, ""))
                 # file has longitude format errors
             if csvsource.lon_errors:
-                err_type = "Bad Longitude Values"
-                details = 'Rows: ' + ';'.join(str(r) for r in csvsource.lon_errors)
-                self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
+                findings.append((csv_dir, csv_file, "Bad Longitude Values", csvsource.lon_errors, ""))
             if csvsource.time_errors:
-                err_type = "Bad Time Values"
-                details = 'Rows: ' + ';'.join(str(r) for r in csvsource.time_errors)
-                self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
+                findings.append((csv_dir, csv_file, "Bad Time Values", csvsource.time_errors, ""))
             if csvsource.date_errors:
-                err_type = "Bad Date Values"
-                details = 'Rows: ' + ';'.join(str(r) for r in csvsource.date_errors)
-                self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
+                findings.append((csv_dir, csv_file, "Bad Date Values", csvsource.date_errors, ""))
+        return findings
 
     def write_direrr(self, csv_dir):
+        self.write_findings(self.direrr_findings(csv_dir))
 
-        # Open the log file if it is not already open
-        if not self.fh:
-            self.open_log()
-
+    @staticmethod
+    def direrr_findings(csv_dir):
+        """ Errors of a site directory that does not exist or has no transect data files, as findings """
         if not csv_dir.dir_exists:
-            err_type = "Directory Does Not Exist"
-            self.fh.write(",".join((csv_dir.csvdir, "", err_type, "")) + "\n")
+            return [(csv_dir.csvdir, "", "Directory Does Not Exist", None, "")]
         elif not csv_dir.files_exist:
-            err_type = "No Transect Files Found"
-            self.fh.write(",".join((csv_dir.csvdir, csv_dir.search_pattern, err_type, "")) + "\n")
+            return [(csv_dir.csvdir, csv_dir.search_pattern, "No Transect Files Found", None, "")]
+        return []
 
+    def write_duperr(self, csv_dir):
+        self.write_findings(self.duperr_findings(csv_dir))
+
+    @staticmethod
+    def duperr_findings(csv_dir):
+        """ Errors of the transect data files of a site directory that have the same name as another file
+            (in another zip archive, or in the directory), as findings.  These files are not converted
+        """
+        return [(os.path.normpath(os.path.dirname(path)), name, "Duplicate File Name", None,
+                 "Not converted. Using " + used) for name, path, used in csv_dir.duplicates]
+
+    @staticmethod
+    def excerr_findings(file_path, error):
+        """ Error of a transect data file that could not be converted because of an exception, as findings """
+        return [(os.path.normpath(os.path.dirname(file_path)), os.path.basename(file_path), "Conversion Failed", None,
+                 "{0}: {1}".format(type(error).__name__, error))]
 
     def write_datawarn(self, csvdata):
+        self.write_findings(self.datawarn_findings(csvdata))
 
+    @staticmethod
+    def datawarn_findings(csvdata):
+        """ Data validation warnings of a site visit, as findings (see finding_lines).
+            Built separately from writing so they can be built in a worker process
+        """
         csv_dir = os.path.normpath(os.path.dirname(csvdata.csv_source.file_path))
         csv_file = os.path.basename(csvdata.csv_source.file_path)
+        return [(csv_dir, csv_file, err_type, rows, "") for err_type, rows in csvdata.rule_results()]
 
-        # Open the log file if it is not already open
-        if not self.fh:
-            self.open_log()
 
-        if csvdata.video_zero:
-            err_type = "All Video < 1"
-            details = ""
-            self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
-        if csvdata.null_video:
-            err_type = "Null Video Values"
-            # print(', '.join(str(x) for x in list_of_ints))
-            details = 'Rows: ' + ';'.join(str(i) for i in csvdata.null_video)
-            self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
-        if csvdata.null_veg:
-            err_type = "Null Veg Values"
-            details = 'Rows: ' + ';'.join(str(i) for i in csvdata.null_veg)
-            self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
-        if csvdata.video_gt1:
-            err_type = "Video Values > 1"
-            details = 'Rows: ' + ';'.join(str(i) for i in csvdata.video_gt1)
-            self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
-        if csvdata.veg_gt1:
-            err_type = "Veg Values > 1"
-            details = 'Rows: ' + ';'.join(str(i) for i in csvdata.veg_gt1)
-            self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
-        if csvdata.veg1_video0:
-            err_type = "Veg = 1 and Video = 0"
-            details = 'Rows: ' + ';'.join(str(i) for i in csvdata.veg1_video0)
-            self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
-        if csvdata.dupe_ts:
-            err_type = "Duplicate Time Stamps"
-            details = 'Rows: ' + ';'.join(str(i) for i in csvdata.dupe_ts)
-            self.fh.write(",".join((csv_dir, csv_file, err_type, details)) + "\n")
+class SiteVisitResult(object):
+    """ Represents the result of parsing, validating and converting a transect data file for a single site visit
+    Built by process_tdfile, possibly in a worker process, and returned to the main process for writing
+
+    Properties:
+    file_path -- full path to the csv file
+    valid -- flag indicating that the csv source file is valid
+    nparray -- structured NumPy array of the transect data (None if not valid)
+    file_hash -- MD5 hash of the csv file contents
+    stream -- CsvDataStream object for a large file converted in chunks (used instead of nparray)
+    errors -- error findings for an invalid csv source file (see LogFile.finding_lines)
+    warnings -- findings for data validation warnings
+    n_rows -- number of data rows (not set for a streamed file)
+    seconds -- processing time in the worker process (for the cost model log, see costmodel)
+
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.valid = False
+        self.nparray = None
+        self.file_hash = None
+        self.stream = None
+        self.errors = []
+        self.warnings = []
+        self.n_rows = None
+        self.seconds = None
+
+
+def process_tdfile(task):
+    """ Parse, validate and convert a single transect data file into a structured NumPy array
+    Module level function so it can be run in a pool of worker processes.  No ArcGIS calls are made here,
+    writing the feature class and the log files is left to the main process
+
+    :param task: tuple of the csv file path, the list of vegetation codes, the tide station file (or None)
+        and the longest gap (seconds) across which missing depths are filled (see CsvData)
+    :return: SiteVisitResult object
+    """
+    file_path, veg_list, tide_file, depth_fill_seconds = task
+    t_start = time.time()
+    result = SiteVisitResult(file_path)
+    csvSource = CsvSource(file_path, veg_list)
+    result.file_hash = csvSource.content_hash
+    if csvSource.valid:
+        result.valid = True
+        transectData = CsvData(csvSource, tide_file=tide_file, depth_fill_seconds=depth_fill_seconds)
+        if transectData.warnings or transectData.rule_bits or transectData.file_mask:
+            result.warnings = LogFile.datawarn_findings(transectData)
+        result.nparray = transectData.nparray
+        result.n_rows = transectData.n_rows
+    else:
+        result.errors = LogFile.csverr_findings(csvSource)
+    result.seconds = time.time() - t_start
+    return result
+
+
+def tdfile_costs(cost_model, file_path, file_stat):
+    """ Features of a transect data file for the cost model (see costmodel):  size (MB) and rows (thousands)
+    The rows are from the last conversion of the file in the cost model log, or estimated from the size
+
+    :param cost_model: costmodel.CostModel object
+    :param file_path: csv file path
+    :param file_stat: os.stat result (or MemberStat) of the csv file
+    :return: dictionary of feature name and value
+    """
+    mb = file_stat.st_size / 1048576.0
+    krows = cost_model.known(costmodel.CSV2PT, file_path, 'krows')
+    if krows is None:
+        krows = mb * cost_model.ratio(costmodel.CSV2PT, 'krows', 'mb', KROWS_PER_MB)
+    return {'mb': mb, 'krows': krows}
+
+
+def stream_tdfile(file_path, veg_list, chunk_rows=CHUNK_ROWS, tide_file=None, depth_fill_seconds=DEPTH_FILL_SECONDS):
+    """ Validate a large transect data file in chunks, and set up its chunked conversion
+    The data are converted while the feature class is written (see CsvDataStream),
+    so the warning findings are only available after that
+
+    :param file_path: csv file path
+    :param veg_list: list of vegetation codes
+    :param chunk_rows: number of rows per chunk
+    :param tide_file: tide station file for the site (or None)
+    :param depth_fill_seconds: longest gap (seconds) across which missing depths are filled (see CsvData)
+    :return: SiteVisitResult object
+    """
+    result = SiteVisitResult(file_path)
+    csvSource = CsvStream(file_path, veg_list, chunk_rows)
+    result.file_hash = csvSource.content_hash
+    if csvSource.valid:
+        result.valid = True
+        result.stream = CsvDataStream(csvSource, tide_file, depth_fill_seconds)
+    else:
+        result.errors = LogFile.csverr_findings(csvSource)
+    return result
+
+
+def validate_tdfile(task):
+    """ Validate a single transect data file without converting it to a feature class (see validate_main)
+    Module level function so it can be run in a pool of worker processes
+
+    :param task: tuple of the csv file path, the list of vegetation codes,
+        the number of rows per chunk for a large file (None to read the whole file at once)
+        the tide station file (or None) and the longest gap (seconds) across which missing depths are filled
+    :return: SiteVisitResult object, without the NumPy array
+    """
+    file_path, veg_list, chunk_rows, tide_file, depth_fill_seconds = task
+    result = SiteVisitResult(file_path)
+    if chunk_rows:
+        csvSource = CsvStream(file_path, veg_list, chunk_rows)
+    else:
+        csvSource = CsvSource(file_path, veg_list)
+    if csvSource.valid:
+        result.valid = True
+        if chunk_rows:
+            transectData = CsvDataStream(csvSource, tide_file, depth_fill_seconds)
+            transectData.validate()
+        else:
+            transectData = CsvData(csvSource, tide_file=tide_file, depth_fill_seconds=depth_fill_seconds)
+        result.n_rows = transectData.n_rows
+        if transectData.rule_bits or transectData.file_mask:
+            result.warnings = LogFile.datawarn_findings(transectData)
+    else:
+        result.errors = LogFile.csverr_findings(csvSource)
+    return result
+
+
+def make_pool(workers):
+    """ Create a pool of worker processes
+    When run from an ArcGIS tool, sys.executable is the ArcGIS application,
+    so the workers must be pointed at the python interpreter instead
+    """
+    python_exe = os.path.join(sys.exec_prefix, 'pythonw.exe')
+    if os.path.exists(python_exe):
+        multiprocessing.set_executable(python_exe)
+    return multiprocessing.Pool(workers)
 
 
 def timeStamped(fname, fmt='{fname}_%Y%m%d_%H%M%S.csv'):
@@ -802,66 +2118,669 @@ def msg(msg):
     arcpy.AddMessage(msg)
 
 
-def main(in_dir, sites_file, vegcode_table, out_gdb, err_dir):
-    # Main function to run code
+def output_path(site_visit, out_gdb, geopackage=None):
+    # Full path to the point feature class of a site visit, or the path identifying its points in a GeoPackage
+    if geopackage:
+        return geopackage.point_path(site_visit.table, site_visit.name)
+    else:
+        return os.path.join(out_gdb, site_visit.fc)
 
-    # Generate list of sites from text file
-    site_codes = make_sitelist(sites_file)
 
-    # Get list of vegetation codes available
-    vegCodes = VegCodes(vegcode_table)
+def read_sample_polygons(svmp_gdb):
+    """ Sample polygons from the SVMP geodatabase, with the site code and year of each sample (see samppoly)
+    The vertices are read in the coordinate system of the output points (see PointFC)
+
+    :param svmp_gdb: SVMP geodatabase with the samp_polygons feature class and the site_samples table
+    :return: samppoly.SamplePolygons object
+    """
+    # Site code and year of each sample, so the points of a site visit are only tested against its own samples
+    samples = {}
+    samples_table = os.path.join(svmp_gdb, siteSamplesTbl)
+    if arcpy.Exists(samples_table):
+        with arcpy.da.SearchCursor(samples_table, [sampidCol, siteCol, sampDateCol]) as cursor:
+            for samp_id, site_code, date_samp in cursor:
+                if samp_id and site_code and date_samp:
+                    samples[samp_id] = (site_code, date_samp.year)
+    polygons = samppoly.SamplePolygons()
+    with arcpy.da.SearchCursor(os.path.join(svmp_gdb, sampPolyFC), [sampidCol, 'SHAPE@'],
+                               spatial_reference=arcpy.SpatialReference(2927)) as cursor:
+        for samp_id, shape in cursor:
+            if not samp_id or shape is None:
+                continue
+            rings = []
+            for part in shape:
+                ring = []
+                for point in part:
+                    # The interior rings (holes) of a part follow its exterior ring, separated by None
+                    if point is None:
+                        rings.append(ring)
+                        ring = []
+                    else:
+                        ring.append((point.X, point.Y))
+                rings.append(ring)
+            site_code, year = samples.get(samp_id, (None, None))
+            polygons.add(samp_id, rings, site_code, year)
+    return polygons
+
+
+def project_points(nparrays):
+    """ Pass structured NumPy arrays of transect points through as (array, x, y), with the points projected
+    once (see wa_south_xy) for the sample tagging, the point cache and the point output
+    """
+    for nparray in nparrays:
+        x, y = wa_south_xy(nparray[latCol], nparray[lonCol])
+        yield nparray, x, y
+
 
-    # initiate Log File objects
-    error_log = LogFile(err_dir,'csv2ptErrorLog')
-    warning_log = LogFile(err_dir,'csv2ptWarningLog')
+def tag_samples(points, sample_polygons, site_visit):
+    """ Pass (structured NumPy array, x, y) of transect points through, adding the sample polygon columns:
+    the site_samp_id of the sample polygon that contains the point ('' outside), and the fraction along
+    the segment from the previous point where the track crosses a polygon boundary (samppoly.NULL_CROSS elsewhere)
 
-    # Loop through all of the sites in the site list
+    :param points: sequence of (structured NumPy array, x, y) for a site visit (see project_points)
+    :param sample_polygons: samppoly.SamplePolygons object
+    :param site_visit: SiteVisit object
+    """
+    indexes = sample_polygons.candidates(site_visit.sitecode, site_visit.yr)
+    samp_ids = np.array([''] + [sample_polygons.samp_ids[i] for i in indexes], dtype='S25')
+    previous = None  # survey_id, x, y and polygon of the last point of the previous chunk
+    for nparray, x, y in points:
+        survey_ids = nparray[surveyidCol]
+        location = sample_polygons.locate(x, y, indexes)
+        current = (survey_ids, x, y, location)
+        # A track that continues from the previous chunk starts with the last point of that chunk
+        if previous is not None:
+            current = tuple(np.concatenate((last, values)) for last, values in zip(previous, current))
+        track_ids, track_x, track_y, track_location = current
+        new_track = np.concatenate(([True], track_ids[1:] != track_ids[:-1]))
+        fractions = sample_polygons.crossings(track_x, track_y, track_location, new_track, indexes)
+        if previous is not None:
+            fractions = fractions[1:]
+        if len(nparray):
+            previous = (survey_ids[-1:], x[-1:], y[-1:], location[-1:])
+        tagged = np.empty(len(nparray), dtype=nparray.dtype.descr + [(sampidCol, 'S25'), (sampCrossCol, '<f8')])
+        for name in nparray.dtype.names:
+            tagged[name] = nparray[name]
+        tagged[sampidCol] = samp_ids[location + 1]
+        tagged[sampCrossCol] = fractions
+        yield tagged, x, y
+
+
+def cached(point_cache, site_visit):
+    # Flag indicating that the site visit is in the point cache, or there is no cache
+    return point_cache is None or point_cache.exists(site_visit.yr, site_visit.sitecode, site_visit.name)
+
+
+def cache_points(points, writer):
+    """ Pass (structured NumPy array, x, y) of transect points through, while writing them to a point cache
+
+    :param points: sequence of (structured NumPy array, x, y) for a site visit (see project_points)
+    :param writer: ptcache.SiteVisitWriter object, closed after the last array
+    """
+    for nparray, x, y in points:
+        writer.append(nparray, x, y)
+        yield nparray, x, y
+    writer.close()
+
+
+def validate_main(in_dir, sites_file, vegcode_table, err_dir, workers=1, stream_size=None, report_db=None,
+                  tide_stations=None, depth_fill_seconds=DEPTH_FILL_SECONDS):
+    # Check all of the transect data files without converting them:  columns, coordinates, dates and times,
+    # and the data validation warnings.  Writes the error and warning logs and a summary log, no feature classes
+    # A pre-pass reads only the header line of each file, and rejects files with missing columns.
+    # The other files are validated in a pool of worker processes (with workers > 1)
+    # csv files larger than stream_size (MB) are validated in chunks of rows (see CsvStream)
+    # With tide_stations, depths are reduced to MLLW and rows without a tide height are reported (see tides)
+    # With depth_fill_seconds, missing interpolated depths are filled and reported (see CsvData._fill_depth)
+    t_start = time.time()
+    site_codes = make_sitelist(sites_file)
+    veg_list = VegCodes(vegcode_table).veg_list
+    stations = tides.read_stations(tide_stations) if tide_stations else {}
+
+    error_log = LogFile(err_dir, 'csv2ptErrorLog')
+    warning_log = LogFile(err_dir, 'csv2ptWarningLog')
+    summary_log = LogFile(err_dir, 'csv2ptValidationSummary')
+    report = valreport.ValidationReport(report_db).open(in_dir) if report_db else None
+
+    # Header pre-pass
+    # list of (CsvPath object, list of transect data files, dictionary of file (key) and header errors (value))
+    catalog = Catalog(in_dir)
+    csv_dirs = []
+    tasks = []  # list of transect data files with valid headers, in site list order
     for site in site_codes:
-        msg("----- Processing site: {0} -----".format(site))
-
-        # Locate and validate directory.  Get list of transect data files
-        csvDir = CsvPath(site, in_dir)
-
-        # Process valid directories
-        if csvDir.valid:
-            # # If there are matching transect files in the directory, process them
-            # if csvDir.tdfiles:
-            # Process all transect data files in the directory
-            for tdfile in csvDir.tdfiles:
-                # Site Visit object
-                [sitecode, yr, group] = os.path.basename(tdfile).split('_')[0:3]
-                site_visit = SiteVisit(sitecode, yr, group)
-                # Create an csv source object
-                csvSource = CsvSource(os.path.join(csvDir.csvdir,tdfile), vegCodes.veg_list)
-
-                # If the source CSV file is valid, convert to point feature class
-                if csvSource.valid:
-                    fc_path = os.path.join(out_gdb, site_visit.fc)
-                    transectData = CsvData(csvSource)
-                    # Write validation warnings to log file
-                    if transectData.warnings:
-                        msg("Data Validation Warnings.\nWriting to log file: {1}".format(csvSource.file_path, warning_log.log_file))
-                        warning_log.write_datawarn(transectData)
-                    msg("Creating Point feature class {0}".format(fc_path))
-                    ptFC = PointFC(transectData.nparray, fc_path)
-                    ptFC.create_fc()
+        csvDir = CsvPath(site, in_dir, catalog)
+        tdfiles = csvDir.tdfiles
+        header_errors = {}
+        tide_file = stations.get(site.lower())
+        for tdfile in tdfiles:
+            file_path = csvDir.file_path(tdfile)
+            csvSource = CsvSource(file_path, veg_list)
+            if not csvSource.header_valid:
+                header_errors[tdfile] = LogFile.csverr_findings(csvSource, header_only=True)
+            elif stream_size and csvDir.file_stat(tdfile).st_size > stream_size * 1024 * 1024:
+                tasks.append((file_path, veg_list, CHUNK_ROWS, tide_file, depth_fill_seconds))
+            else:
+                tasks.append((file_path, veg_list, None, tide_file, depth_fill_seconds))
+        csv_dirs.append((csvDir, tdfiles, header_errors))
+    n_rejected = sum(len(header_errors) for csvDir, tdfiles, header_errors in csv_dirs)
+    msg("Header check: {0} of {1} transect data files rejected".format(n_rejected, n_rejected + len(tasks)))
+
+    pool = None
+    if workers > 1 and len(tasks) > 1:
+        msg("Validating {0} transect data files with {1} worker processes".format(len(tasks), workers))
+        pool = make_pool(workers)
+        results = pool.imap(validate_tdfile, tasks)
+    else:
+        results = (validate_tdfile(task) for task in tasks)
+
+    counts = {'Valid': 0, 'Valid With Warnings': 0, 'Invalid': 0, 'Invalid Header': 0}
+    total_rows = 0
+    try:
+        for csvDir, tdfiles, header_errors in csv_dirs:
+            msg("----- Validating site: {0} -----".format(csvDir.sitecode))
+            for duperr in LogFile.duperr_findings(csvDir):
+                msg("Duplicate file name. Not converted: {0}".format(os.path.join(duperr[0], duperr[1])))
+                error_log.write_findings([duperr])
+                if report:
+                    report.add_file(duperr[0], duperr[1], False, [duperr])
+            if tdfiles:
+                for tdfile in tdfiles:
+                    if tdfile in header_errors:
+                        result = SiteVisitResult(csvDir.file_path(tdfile))
+                        result.errors = header_errors[tdfile]
+                        status = 'Invalid Header'
+                    else:
+                        result = next(results)
+                        if not result.valid:
+                            status = 'Invalid'
+                        elif result.warnings:
+                            status = 'Valid With Warnings'
+                        else:
+                            status = 'Valid'
+                    counts[status] += 1
+                    total_rows += result.n_rows or 0
+                    if result.errors:
+                        msg("Invalid source csv file {0}".format(result.file_path))
+                        error_log.write_findings(result.errors)
+                    if result.warnings:
+                        warning_log.write_findings(result.warnings)
+                    summary_log.write_lines([",".join((
+                        csvDir.csvdir, tdfile, status, '' if result.n_rows is None else str(result.n_rows),
+                        ';'.join(finding[2] for finding in result.errors),
+                        ';'.join(finding[2] for finding in result.warnings))) + "\n"])
+                    if report:
+                        report.add_file(csvDir.csvdir, tdfile, result.valid, result.errors, result.warnings)
+            else:
+                msg("Directory, {0}, does not exist, "
+                    "or has no files matching the pattern: {1}_YYYY_##_TD.csv".format(csvDir.csvdir, csvDir.sitecode))
+                error_log.write_direrr(csvDir)
+                if report:
+                    direrr = LogFile.direrr_findings(csvDir)
+                    report.add_file(csvDir.csvdir, direrr[0][1], False, direrr)
+        if pool:
+            pool.close()
+    except:
+        # Stop the workers without waiting for the rest of the queued files
+        if pool:
+            pool.terminate()
+        raise
+    finally:
+        if pool:
+            pool.join()
+        if report:
+            report.close()
+
+    for log in (error_log, warning_log, summary_log):
+        if log.fh:
+            log.close_log()
+
+    msg("Validated {0} transect data files, {1} rows in {2:.1f} seconds".format(
+        sum(counts.values()), total_rows, time.time() - t_start))
+    for status in ('Valid', 'Valid With Warnings', 'Invalid', 'Invalid Header'):
+        msg("  {0}: {1}".format(status, counts[status]))
+    if sum(counts.values()):
+        msg("Summary written to {0}".format(summary_log.log_file))
+
+
+class Ingest(object):
+    """ Represents the outputs of a conversion:  point feature classes (or GeoPackage), cache, manifest and logs
+    Opened once and shared by all of the transect data files of a run (see main),
+    or kept open between the polls of the watch mode (see watch)
+
+    Properties:
+    out_gdb -- output geodatabase for the point feature classes
+    veg_list -- list of vegetation codes
+    veg_version -- version identifier of the vegetation codes (see Manifest)
+    incremental -- flag to skip csv files that are unchanged since the last run
+    geopackage -- GeoPackage object for the points, instead of out_gdb (or None)
+    manifest -- Manifest object of the csv files already converted
+    point_cache -- PointCache object for the columnar cache of the points (or None)
+    error_log, warning_log -- LogFile objects
+    report -- ValidationReport object for the errors and warnings (or None)
+    tide_stations -- dictionary of site code (key) and tide station file (value) for the tide correction
+    depth_fill_seconds -- longest gap (seconds) across which missing interpolated depths are filled (see CsvData)
+    survey_summaries -- list of SurveySummary objects of the point outputs, for statsdb (see svysummary)
+    sample_polygons -- SamplePolygons object for the sample polygon of each point (or None, see samppoly)
+
+    """
+
+    def __init__(self, vegcode_table, out_gdb, err_dir, incremental=False, out_gpkg=None, cache_dir=None,
+                 report_db=None, in_dir=None, tide_stations=None, svmp_gdb=None, depth_fill_seconds=DEPTH_FILL_SECONDS):
+        self.out_gdb = out_gdb
+        self.incremental = incremental
+        self.depth_fill_seconds = depth_fill_seconds or 0
+
+        # Get list of vegetation codes available
+        vegCodes = VegCodes(vegcode_table)
+        self.veg_list = vegCodes.veg_list
+        self.veg_version = Manifest.veg_version(self.veg_list)
+
+        # Manifest of csv files already converted to feature classes (or GeoPackage points)
+        self.geopackage = None
+        if out_gpkg:
+            self.geopackage = gpkg.GeoPackage(out_gpkg).open()
+            self.manifest = Manifest(out_gpkg, self.geopackage.path_exists)
+        else:
+            self.manifest = Manifest(out_gdb)
+        self.manifest.load()
+
+        # Columnar cache of the points
+        self.point_cache = ptcache.PointCache(cache_dir).create() if cache_dir else None
+
+        # Per-survey summaries of the points, next to each point output
+        self.survey_summaries = [svysummary.SurveySummary(out_gpkg or out_gdb).load()]
+        if cache_dir:
+            self.survey_summaries.append(svysummary.SurveySummary(cache_dir).load())
+
+        # initiate Log File objects
+        self.error_log = LogFile(err_dir,'csv2ptErrorLog')
+        self.warning_log = LogFile(err_dir,'csv2ptWarningLog')
+        self.report = valreport.ValidationReport(report_db).open(in_dir) if report_db else None
+
+        # Tide station files of the sites
+        self.tide_stations = tides.read_stations(tide_stations) if tide_stations else {}
+
+        # Sample polygons, loaded once
+        self.sample_polygons = None
+        if svmp_gdb:
+            self.sample_polygons = read_sample_polygons(svmp_gdb)
+            msg("Tagging points with {0} sample polygons from {1}".format(len(self.sample_polygons), svmp_gdb))
+
+    def tide_file(self, sitecode):
+        """ Tide station file of a site, or None if its depths are not corrected """
+        return self.tide_stations.get(sitecode.lower())
+
+    def version(self, site_visit):
+        """ Version identifier of the conversion settings of a site visit (see Manifest):  the vegetation codes,
+            the size and modification time of its tide station file, the depth filling gap and its sample polygons
+        """
+        parts = [self.veg_version]
+        tide_file = self.tide_file(site_visit.sitecode)
+        if tide_file:
+            tide_stat = os.stat(tide_file)
+            parts += [tide_file, tide_stat.st_size, tide_stat.st_mtime]
+        if self.depth_fill_seconds:
+            parts.append('depth_fill={0:g}'.format(self.depth_fill_seconds))
+        if self.sample_polygons is not None:
+            parts.append(self.sample_polygons.version(site_visit.sitecode, site_visit.yr))
+        if len(parts) == 1:
+            return self.veg_version
+        return hashlib.md5('|'.join('{0}'.format(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def output_path(self, site_visit):
+        """ Full path to the point feature class of a site visit, or the path of its points in the GeoPackage """
+        return output_path(site_visit, self.out_gdb, self.geopackage)
+
+    def unchanged(self, file_path, site_visit, file_stat=None):
+        """ Flag indicating that a csv file is unchanged since it was converted (only with incremental = True) """
+        return self.incremental \
+            and self.manifest.unchanged(file_path, self.version(site_visit), self.output_path(site_visit),
+                                        file_stat) \
+            and cached(self.point_cache, site_visit) and self.summarized(site_visit)
+
+    def summarized(self, site_visit):
+        """ Flag indicating that the surveys of a site visit are in the survey summaries """
+        return all(summary.has_site_visit(site_visit.name) for summary in self.survey_summaries)
+
+    def write(self, csvDir, tdfile, result):
+        """ Write the points and the logs for the result of a transect data file
+
+        :param csvDir: CsvPath object of the site directory
+        :param tdfile: transect data file name
+        :param result: SiteVisitResult object from process_tdfile or stream_tdfile
+        """
+        self.write_points(csvDir, tdfile, result)
+        self.write_logs(csvDir, tdfile, result)
+
+    def write_points(self, csvDir, tdfile, result):
+        """ Write the points for the result of a transect data file, and record the file in the manifest
+        Separate from write_logs, so the points can be written as soon as a result arrives (see main)
+
+        :param csvDir: CsvPath object of the site directory
+        :param tdfile: transect data file name
+        :param result: SiteVisitResult object from process_tdfile or stream_tdfile
+        """
+        [sitecode, yr, group] = os.path.basename(tdfile).split('_')[0:3]
+        site_visit = SiteVisit(sitecode, yr, group)
+        fc_path = self.output_path(site_visit)
+        version = self.version(site_visit)
+        point_cache = self.point_cache
+
+        # If the source CSV file is valid, convert to point feature class
+        if result.valid:
+            # File was modified, but the contents are the same
+            if self.incremental \
+                    and self.manifest.same_content(result.file_path, result.file_hash, version, fc_path) \
+                    and cached(point_cache, site_visit) and self.summarized(site_visit):
+                msg("Contents unchanged since last run. Keeping points {0}".format(fc_path))
+                # The warnings of a large file come from its chunks, so they are read without converting them
+                if result.stream:
+                    result.stream.validate()
+            else:
+                # Arrays of transect points -- the whole file, or one per chunk of a large file --
+                # each with its projected x and y
+                points = project_points(result.stream.nparrays() if result.stream else [result.nparray])
+                if self.sample_polygons is not None:
+                    points = tag_samples(points, self.sample_polygons, site_visit)
+                points = svysummary.summarize(points, self.survey_summaries, site_visit.name,
+                                              self.veg_list + [column for column, codes in VEG_COMPOSITES])
+                if point_cache:
+                    msg("Writing points to cache {0}".format(point_cache.cache_dir))
+                    points = cache_points(points, point_cache.writer(yr, sitecode, site_visit.name))
+                if self.geopackage:
+                    msg("Writing points to GeoPackage table {0}".format(fc_path))
+                    PointGpkg(result.nparray, self.geopackage, site_visit).create_rows_chunks(points)
                 else:
-                    # Log invalid csv source files to error log
-                    msg("Invalid source csv file {0}.\nWriting to error log file: {1}".format(csvSource.file_path, error_log.log_file))
-                    error_log.write_csverr(csvSource)
-        # Log Invalid directories to Error Log
+                    msg("Creating Point feature class {0}".format(fc_path))
+                    PointFC(result.nparray, fc_path).create_fc_chunks(points)
+            # Warnings of a large file are known once all of the chunks have been converted
+            if result.stream and (result.stream.rule_bits or result.stream.file_mask):
+                result.warnings = LogFile.datawarn_findings(result.stream)
+            self.manifest.update(result.file_path, result.file_hash, version, fc_path,
+                                 csvDir.file_stat(tdfile))
         else:
-            # write a line to the log file about the error
-            msg("Directory, {0}, does not exist, "
-                "or has no files matching the pattern: {1}_YYYY_##_TD.csv .\n"
-                "Writing to error log file: {2}".format(csvDir.csvdir, csvDir.sitecode, error_log.log_file))
-            error_log.write_direrr(csvDir)
+            self.manifest.remove(result.file_path)
 
-    # Close the log files if they were opened
-    if error_log.fh:
-        error_log.close_log()
-    if warning_log.fh:
-        warning_log.close_log()
+    def write_logs(self, csvDir, tdfile, result):
+        """ Write the warnings or errors for the result of a transect data file to the logs (and report database)
+
+        :param csvDir: CsvPath object of the site directory
+        :param tdfile: transect data file name
+        :param result: SiteVisitResult object, after write_points
+        """
+        if result.valid:
+            # Write validation warnings to log file
+            if result.warnings:
+                msg("Data Validation Warnings.\nWriting to log file: {0}".format(self.warning_log.log_file))
+                self.warning_log.write_findings(result.warnings)
+        else:
+            # Log invalid csv source files to error log
+            msg("Invalid source csv file {0}.\nWriting to error log file: {1}".format(result.file_path,
+                                                                                     self.error_log.log_file))
+            self.error_log.write_findings(result.errors)
+        if self.report:
+            self.report.add_file(csvDir.csvdir, tdfile, result.valid, result.errors, result.warnings)
+
+    def write_duperr(self, csvDir):
+        # Log transect data files with the same name as another file to Error Log (see Catalog.tdfiles)
+        for duperr in LogFile.duperr_findings(csvDir):
+            msg("Duplicate file name. Not converted: {0}\nWriting to error log file: {1}".format(
+                os.path.join(duperr[0], duperr[1]), self.error_log.log_file))
+            self.error_log.write_findings([duperr])
+            if self.report:
+                self.report.add_file(duperr[0], duperr[1], False, [duperr])
+
+    def write_excerr(self, csvDir, tdfile, error):
+        # Log a transect data file that raised an exception while it was converted to Error Log (see watch)
+        findings = LogFile.excerr_findings(csvDir.file_path(tdfile), error)
+        msg("Conversion failed: {0}\n{1}\nWriting to error log file: {2}".format(
+            csvDir.file_path(tdfile), findings[0][4], self.error_log.log_file))
+        self.error_log.write_findings(findings)
+        if self.report:
+            self.report.add_file(csvDir.csvdir, tdfile, False, findings)
+
+    def write_direrr(self, csvDir):
+        # Log invalid directories to Error Log
+        msg("Directory, {0}, does not exist, "
+            "or has no files matching the pattern: {1}_YYYY_##_TD.csv .\n"
+            "Writing to error log file: {2}".format(csvDir.csvdir, csvDir.sitecode, self.error_log.log_file))
+        self.error_log.write_direrr(csvDir)
+        if self.report:
+            direrr = LogFile.direrr_findings(csvDir)
+            self.report.add_file(csvDir.csvdir, direrr[0][1], False, direrr)
+
+    def save(self):
+        # Save the state of the processed files, and write out the buffered log lines and report records
+        self.manifest.save()
+        for summary in self.survey_summaries:
+            summary.save()
+        for log in (self.error_log, self.warning_log):
+            if log.fh:
+                log.fh.flush()
+        if self.report:
+            self.report.flush()
+
+    def close(self):
+        # Save the state of the processed files (including a partial run), and close the outputs
+        self.manifest.save()
+        for summary in self.survey_summaries:
+            summary.save()
+        if self.geopackage:
+            self.geopackage.close()
+        if self.report:
+            self.report.close()
+        # Close the log files if they were opened
+        for log in (self.error_log, self.warning_log):
+            if log.fh:
+                log.close_log()
+
+
+def main(in_dir, sites_file, vegcode_table, out_gdb, err_dir, workers=1, incremental=False, stream_size=None,
+         out_gpkg=None, cache_dir=None, report_db=None, validate_only=False, tide_stations=None, svmp_gdb=None,
+         depth_fill_seconds=DEPTH_FILL_SECONDS):
+    # Main function to run code
+    # With workers > 1, the csv files are parsed, validated and converted in a pool of worker processes.
+    # Feature classes and log files are always written by this process.  The points of each file are written
+    # as soon as its result arrives, so converted points do not wait in memory, and the logs in site list order
+    # With incremental = True, csv files that are unchanged since the last run (see Manifest) are skipped
+    # csv files larger than stream_size (MB) are converted in chunks of rows by this process (see CsvStream)
+    # With out_gpkg, points are written to one table per survey year in that GeoPackage instead of out_gdb
+    # With cache_dir, points are also written to a columnar cache for the statistics stage (see ptcache)
+    # A summary of each survey is written next to the points, for the statistics stage (see svysummary)
+    # With report_db, errors and warnings are also written to a SQLite database for queries (see valreport)
+    # With validate_only = True, the files are only checked (see validate_main)
+    # With tide_stations (site to tide station file), the depths are reduced to MLLW (see tides)
+    # With svmp_gdb, each point is tagged with the sample polygon that contains it (see samppoly)
+    # With depth_fill_seconds, missing interpolated depths are filled from the observed depths across gaps of up to
+    # that many seconds (see CsvData._fill_depth)
+    # The processing time of each csv file is estimated from its size (see costmodel), and the longest files are
+    # started first in the worker pool.  Estimated and actual times are logged in err_dir to improve the estimates
+    if validate_only:
+        validate_main(in_dir, sites_file, vegcode_table, err_dir, workers, stream_size, report_db, tide_stations,
+                      depth_fill_seconds)
+        return
+
+    # Generate list of sites from text file
+    site_codes = make_sitelist(sites_file)
+
+    # Vegetation codes, manifest, outputs and logs
+    ingest = Ingest(vegcode_table, out_gdb, err_dir, incremental, out_gpkg, cache_dir, report_db, in_dir,
+                    tide_stations, svmp_gdb, depth_fill_seconds)
+    veg_list = ingest.veg_list
+
+    # Locate and validate all directories, and get the list of transect data files for each one
+    # The input directory and each site directory are listed once, with the file sizes and modification times
+    catalog = Catalog(in_dir)
+    cost_model = costmodel.CostModel(os.path.join(err_dir, costmodel.LOG_FILE)).load()
+    # list of (CsvPath object, list of transect data files, set of unchanged files, set of large files)
+    csv_dirs = []
+    tasks = []  # list of transect data files to process in memory, in site list order
+    task_files = []  # (CsvPath object, transect data file) of each task
+    task_costs = []  # cost model features of each task
+    for site in site_codes:
+        csvDir = CsvPath(site, in_dir, catalog)
+        tdfiles = csvDir.tdfiles
+        unchanged = set()
+        streamed = set()
+        for tdfile in tdfiles:
+            file_path = csvDir.file_path(tdfile)
+            file_stat = csvDir.file_stat(tdfile)
+            site_visit = SiteVisit(*tdfile.split('_')[0:3])
+            if ingest.unchanged(file_path, site_visit, file_stat):
+                unchanged.add(tdfile)
+            elif stream_size and file_stat.st_size > stream_size * 1024 * 1024:
+                streamed.add(tdfile)
+            else:
+                tasks.append((file_path, veg_list, ingest.tide_file(csvDir.sitecode), ingest.depth_fill_seconds))
+                task_files.append((csvDir, tdfile))
+                task_costs.append(tdfile_costs(cost_model, file_path, file_stat))
+        csv_dirs.append((csvDir, tdfiles, unchanged, streamed))
+
+    # In the worker pool, the tasks are started longest first so a large file does not finish last,
+    # and the results are returned as they finish.  Processed one at a time, they are returned in task order
+    estimates = [cost_model.estimate(costmodel.CSV2PT, costs) for costs in task_costs]
+    task_index = dict((task[0], i) for i, task in enumerate(tasks))  # csv file path (key), task index (value)
+    pool = None
+    if workers > 1 and len(tasks) > 1:
+        msg("Processing {0} transect data files with {1} worker processes".format(len(tasks), workers))
+        pool = make_pool(workers)
+        results = pool.imap_unordered(process_tdfile, [tasks[i] for i in costmodel.longest_first(estimates)])
+    else:
+        results = (process_tdfile(task) for task in tasks)
+    written = {}  # task index (key), result with its points written, waiting for its logs (value)
+
+    try:
+        # Loop through all of the sites in the site list
+        for csvDir, tdfiles, unchanged, streamed in csv_dirs:
+            msg("----- Processing site: {0} -----".format(csvDir.sitecode))
+            ingest.write_duperr(csvDir)
+
+            # Process valid directories
+            if tdfiles:
+                # Process all transect data files in the directory
+                for tdfile in tdfiles:
+                    if tdfile in unchanged:
+                        msg("Unchanged since last run. Skipping {0}".format(csvDir.file_path(tdfile)))
+                        continue
+                    # Parsed and validated csv source
+                    if tdfile in streamed:
+                        msg("Large file. Converting in chunks of {0} rows".format(CHUNK_ROWS))
+                        result = stream_tdfile(csvDir.file_path(tdfile), veg_list, CHUNK_ROWS,
+                                               ingest.tide_file(csvDir.sitecode), ingest.depth_fill_seconds)
+                        # Write the points and logs
+                        ingest.write(csvDir, tdfile, result)
+                        continue
+                    # Write the points of the results that arrive before the result of this file
+                    i = task_index[csvDir.file_path(tdfile)]
+                    while i not in written:
+                        result = next(results)
+                        j = task_index[result.file_path]
+                        ingest.write_points(task_files[j][0], task_files[j][1], result)
+                        result.nparray = None
+                        if result.valid:
+                            costs = dict(task_costs[j], krows=result.n_rows / 1000.0)
+                            cost_model.record(costmodel.CSV2PT, result.file_path, costs, estimates[j],
+                                              result.seconds)
+                        written[j] = result
+                    # Write the logs in site list order
+                    ingest.write_logs(csvDir, tdfile, written.pop(i))
+            # Log Invalid directories to Error Log
+            else:
+                ingest.write_direrr(csvDir)
+        n_files, estimated, actual = cost_model.summary(costmodel.CSV2PT)
+        if n_files:
+            msg("Converted {0} transect data files in {1:.1f} seconds of processing time (estimated {2:.1f})".format(
+                n_files, actual, estimated))
+        if pool:
+            pool.close()
+    except:
+        # Stop the workers without waiting for the rest of the queued files
+        if pool:
+            pool.terminate()
+        raise
+    finally:
+        if pool:
+            pool.join()
+        cost_model.save()
+        ingest.close()
+
+
+def watch(in_dir, sites_file, vegcode_table, out_gdb, err_dir, stream_size=None, out_gpkg=None, cache_dir=None,
+          report_db=None, tide_stations=None, svmp_gdb=None, depth_fill_seconds=DEPTH_FILL_SECONDS,
+          poll_seconds=POLL_SECONDS, settle_seconds=SETTLE_SECONDS, max_polls=None):
+    # Watch mode:  poll the site folders, and convert new or changed transect data files as they arrive
+    # The vegetation codes, manifest, outputs and logs are opened once and kept open between polls (see Ingest)
+    # The site folders are listed once per poll (see Catalog), and the site list file is read again each time
+    # A file is converted once its size and modification time are the same for settle_seconds,
+    # so files that are still being uploaded are not read.  Invalid files are retried when they change,
+    # as are files that raise an exception while they are converted (written to the error log)
+    # Runs until interrupted (Ctrl+C), or for max_polls polls
+    ingest = Ingest(vegcode_table, out_gdb, err_dir, True, out_gpkg, cache_dir, report_db, in_dir, tide_stations,
+                    svmp_gdb, depth_fill_seconds)
+    pending = {}  # file path (key), tuple of (size, mtime) and time first seen with that size and mtime (value)
+    failed = {}  # file path (key), (size, mtime) of invalid files (value)
+    reported = set()  # duplicate file names already written to the error log (see Catalog.tdfiles)
+    polls = 0
+    msg("Watching {0} for new or changed transect data files".format(in_dir))
+    try:
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            now = time.time()
+            catalog = Catalog(in_dir)
+            listed = set()  # file paths in the site folders at this poll
+            duplicates = set()
+            for site in make_sitelist(sites_file):
+                csvDir = CsvPath(site, in_dir, catalog)
+                duplicates.update(csvDir.duplicates)
+                if set(csvDir.duplicates) - reported:
+                    ingest.write_duperr(csvDir)
+                    reported.update(csvDir.duplicates)
+                for tdfile in csvDir.tdfiles:
+                    file_path = csvDir.file_path(tdfile)
+                    listed.add(file_path)
+                    file_stat = csvDir.file_stat(tdfile)
+                    file_state = (file_stat.st_size, file_stat.st_mtime)
+                    site_visit = SiteVisit(*tdfile.split('_')[0:3])
+                    if failed.get(file_path) == file_state or ingest.unchanged(file_path, site_visit, file_stat):
+                        continue
+                    # Wait until the file has stopped changing
+                    if file_path not in pending or pending[file_path][0] != file_state:
+                        pending[file_path] = (file_state, now)
+                    if now - pending[file_path][1] < settle_seconds:
+                        continue
+                    del pending[file_path]
+                    msg("----- New or changed file: {0} -----".format(file_path))
+                    tide_file = ingest.tide_file(csvDir.sitecode)
+                    try:
+                        if stream_size and file_stat.st_size > stream_size * 1024 * 1024:
+                            result = stream_tdfile(file_path, ingest.veg_list, CHUNK_ROWS, tide_file,
+                                                   ingest.depth_fill_seconds)
+                        else:
+                            result = process_tdfile((file_path, ingest.veg_list, tide_file,
+                                                     ingest.depth_fill_seconds))
+                        ingest.write(csvDir, tdfile, result)
+                    except Exception as e:
+                        # One bad or locked file must not stop the watch
+                        ingest.write_excerr(csvDir, tdfile, e)
+                        failed[file_path] = file_state
+                        continue
+                    if result.valid:
+                        failed.pop(file_path, None)
+                    else:
+                        failed[file_path] = file_state
+            # Forget files that were deleted or renamed (or whose site was removed from the site list)
+            for file_path in [file_path for file_path in pending if file_path not in listed]:
+                del pending[file_path]
+            for file_path in [file_path for file_path in failed if file_path not in listed]:
+                del failed[file_path]
+            reported &= duplicates
+            ingest.save()
+            if max_polls is None or polls < max_polls:
+                time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        msg("Stopped watching {0}".format(in_dir))
+    finally:
+        ingest.close()
 
 
 if __name__ == '__main__':
@@ -891,7 +2810,53 @@ if __name__ == '__main__':
     err_dir = in_dir
     # err_dir = "Y:/projects/dnr_svmp2016/data/IslandCoMRC/err_logs"
 
-    main(in_dir, sites_file, vegcode_table, out_gdb, err_dir)
+    # Input parameter 6: Number of worker processes for parsing and validating csv files
+    workers = 1
+    # workers = multiprocessing.cpu_count()
+
+    # Input parameter 7: Skip csv files that are unchanged since the last run
+    incremental = False
+
+    # Input parameter 8: Size (MB) above which csv files are converted in chunks of rows
+    stream_size = None
+
+    # Input parameter 9: GeoPackage to store the points in one table per survey year, instead of out_gdb
+    out_gpkg = None
+    # out_gpkg = "Y:/projects/dnr_svmp2016/data/examples/examples_points.gpkg"
+
+    # Input parameter 10: Directory for a columnar cache of the points, used by the statistics stage
+    cache_dir = None
+    # cache_dir = "Y:/projects/dnr_svmp2016/data/examples/point_cache"
+
+    # Input parameter 11: SQLite database for the errors and warnings, in addition to the log files
+    report_db = None
+    # report_db = "Y:/projects/dnr_svmp2016/data/examples/csv2pt_report.sqlite"
+
+    # Input parameter 12: Only validate the csv files, without creating feature classes
+    validate_only = False
+
+    # Input parameter 13: csv file of site codes and tide stations, to reduce the depths to MLLW (see tides)
+    tide_stations = None
+    # tide_stations = "Y:/projects/dnr_svmp2016/data/tides/tide_stations.csv"
+
+    # Input parameter 14: SVMP geodatabase with sample polygons, to tag each point with its sample (see samppoly)
+    svmp_gdb = None
+    # svmp_gdb = "Y:/projects/dnr_svmp2016/db/SVMP_DB_v5.2_20170815.mdb"
+
+    # Input parameter 15: Longest gap (seconds) between observed depths to fill missing interpolated depths across
+    depth_fill_seconds = DEPTH_FILL_SECONDS
+    # depth_fill_seconds = 10
+
+    # Watch the site folders and convert new or changed files as they arrive, until interrupted (Ctrl+C)
+    # Started from the command line:  python csv2pt.py --watch
+    watch_folders = '--watch' in sys.argv[1:]
+
+    if watch_folders:
+        watch(in_dir, sites_file, vegcode_table, out_gdb, err_dir, stream_size, out_gpkg, cache_dir, report_db,
+              tide_stations, svmp_gdb, depth_fill_seconds)
+    else:
+        main(in_dir, sites_file, vegcode_table, out_gdb, err_dir, workers, incremental, stream_size, out_gpkg,
+             cache_dir, report_db, validate_only, tide_stations, svmp_gdb, depth_fill_seconds)
 
     t1 = time.time()
 
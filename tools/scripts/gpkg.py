@@ -0,0 +1,290 @@
+# gpkg.py
+# 10/16/2026
+# Store transect points in a GeoPackage (SQLite) database, with one point table per survey year
+# Alternative to one point feature class per site visit
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+
+import os
+import sqlite3
+import datetime
+import numpy as np
+
+# GeoPackage identifiers (OGC GeoPackage 1.2)
+GPKG_APPLICATION_ID = 0x47504B47  # 'GPKG'
+GPKG_USER_VERSION = 10200
+
+# Spatial reference of the point tables -- NAD_1983_HARN_StatePlane_Washington_South_FIPS_4602_Feet
+SRS_ID = 2927
+SRS_NAME = 'NAD83(HARN) / Washington South (ftUS)'
+SRS_WKT = (
+    'PROJCS["NAD83(HARN) / Washington South (ftUS)",GEOGCS["NAD83(HARN)",'
+    'DATUM["NAD83_High_Accuracy_Reference_Network",SPHEROID["GRS 1980",6378137,298.257222101,'
+    'AUTHORITY["EPSG","7019"]],AUTHORITY["EPSG","6152"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],'
+    'UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4152"]],'
+    'PROJECTION["Lambert_Conformal_Conic_2SP"],PARAMETER["latitude_of_origin",45.3333333333333],'
+    'PARAMETER["central_meridian",-120.5],PARAMETER["standard_parallel_1",47.3333333333333],'
+    'PARAMETER["standard_parallel_2",45.8333333333333],PARAMETER["false_easting",1640416.667],'
+    'PARAMETER["false_northing",0],UNIT["US survey foot",0.304800609601219,AUTHORITY["EPSG","9003"]],'
+    'AXIS["Easting",EAST],AXIS["Northing",NORTH],AUTHORITY["EPSG","2927"]]'
+)
+
+# Columns added to each point table
+FID_COL = 'fid'  # Primary key
+GEOM_COL = 'geom'  # Point geometry
+SITEVISIT_COL = 'site_visit'  # Site visit the point came from:  sitecode_YYYY_##
+
+# Columns with an index in each point table
+INDEX_COLUMNS = [
+    'survey_id',
+    'site_code',
+    'date_time_samp',
+    SITEVISIT_COL,
+]
+
+# Number of rows per executemany call
+BATCH_ROWS = 10000
+
+# GeoPackage binary geometry of a 2D point:  header (no envelope, little endian) followed by a WKB point
+POINT_BLOB_DTYPE = np.dtype([
+    ('magic', 'S2'),
+    ('version', 'u1'),
+    ('flags', 'u1'),
+    ('srs_id', '<i4'),
+    ('byte_order', 'u1'),
+    ('wkb_type', '<u4'),
+    ('x', '<f8'),
+    ('y', '<f8'),
+])
+
+# GeoPackage DATETIME format (ISO-8601, UTC)
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def is_gpkg(path):
+    """ Flag indicating that a path is a GeoPackage rather than a geodatabase """
+    return bool(path) and path.lower().endswith('.gpkg')
+
+
+def table_name(year):
+    """ Name of the point table for a survey year """
+    return 'transect_pt_{0}'.format(year)
+
+
+def quote(name):
+    """ SQL identifier in double quotes """
+    return '"{0}"'.format(name.replace('"', '""'))
+
+
+def point_blobs(x, y):
+    """ List of GeoPackage point geometries (binary) from arrays of x and y coordinates """
+    points = np.zeros(len(x), dtype=POINT_BLOB_DTYPE)
+    points['magic'] = b'GP'
+    points['flags'] = 1
+    points['srs_id'] = SRS_ID
+    points['byte_order'] = 1
+    points['wkb_type'] = 1
+    points['x'] = x
+    points['y'] = y
+    data = points.tobytes()
+    size = POINT_BLOB_DTYPE.itemsize
+    return [sqlite3.Binary(data[i:i + size]) for i in range(0, len(data), size)]
+
+
+def point_xy(blobs):
+    """ Arrays of x and y coordinates from a list of GeoPackage point geometries written by point_blobs """
+    points = np.frombuffer(b''.join(bytes(blob) for blob in blobs), dtype=POINT_BLOB_DTYPE)
+    return points['x'].copy(), points['y'].copy()
+
+
+def sql_type(dtype):
+    """ GeoPackage column type for a NumPy data type """
+    if dtype.kind in 'iub':
+        return 'INTEGER'
+    elif dtype.kind == 'f':
+        return 'DOUBLE'
+    elif dtype.kind == 'M':
+        return 'DATETIME'
+    elif dtype.kind == 'S':
+        return 'TEXT({0})'.format(dtype.itemsize)
+    else:
+        return 'TEXT'
+
+
+def sql_values(values):
+    """ List of SQL values for a column of a structured NumPy array """
+    if values.dtype.kind == 'M':
+        return [s + 'Z' for s in np.datetime_as_string(values.astype('<M8[us]'), unit='ms').tolist()]
+    elif values.dtype.kind == 'S':
+        return values.astype('U').tolist()
+    else:
+        return values.tolist()
+
+
+class GeoPackage(object):
+    """ Represents a GeoPackage database of transect points, with one point table per survey year
+    Each table holds the points of all site visits for the year, and is indexed on the columns in INDEX_COLUMNS
+
+    Properties:
+    path -- full path to the GeoPackage file
+    conn -- sqlite3 connection to the database (None until opened)
+    tables -- list of point tables in the GeoPackage
+
+    """
+
+    def __init__(self, path):
+        self.path = os.path.normpath(path)
+        self.conn = None
+
+    def open(self):
+        # Connect to the database, and create the GeoPackage metadata tables if it is new
+        self.conn = sqlite3.connect(self.path)
+        if self.conn.execute('PRAGMA application_id').fetchone()[0] != GPKG_APPLICATION_ID:
+            self._create_metadata()
+        return self
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def _create_metadata(self):
+        with self.conn:
+            self.conn.execute('PRAGMA application_id = {0}'.format(GPKG_APPLICATION_ID))
+            self.conn.execute('PRAGMA user_version = {0}'.format(GPKG_USER_VERSION))
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, '
+                'srs_id INTEGER NOT NULL PRIMARY KEY, organization TEXT NOT NULL, '
+                'organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT)')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, '
+                'data_type TEXT NOT NULL, identifier TEXT UNIQUE, description TEXT DEFAULT \'\', '
+                'last_change DATETIME NOT NULL DEFAULT (strftime(\'%Y-%m-%dT%H:%M:%fZ\',\'now\')), '
+                'min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER, '
+                'CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id))')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS gpkg_geometry_columns (table_name TEXT NOT NULL, '
+                'column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL, '
+                'z TINYINT NOT NULL, m TINYINT NOT NULL, '
+                'CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name), '
+                'CONSTRAINT fk_gc_tn FOREIGN KEY (table_name) REFERENCES gpkg_contents(table_name), '
+                'CONSTRAINT fk_gc_srs FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys (srs_id))')
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)', [
+                    ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', None),
+                    ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', None),
+                    ('WGS 84 geodetic', 4326, 'EPSG', 4326,
+                     'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,'
+                     'AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,'
+                     'AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],'
+                     'AUTHORITY["EPSG","4326"]]', None),
+                    (SRS_NAME, SRS_ID, 'EPSG', SRS_ID, SRS_WKT, None),
+                ])
+
+    @property
+    def tables(self):
+        """List of point tables in the GeoPackage"""
+        rows = self.conn.execute("SELECT table_name FROM gpkg_contents WHERE data_type = 'features'")
+        return sorted(str(row[0]) for row in rows)
+
+    def _columns(self, table):
+        # List of column names in a table
+        return [str(row[1]) for row in self.conn.execute('PRAGMA table_info({0})'.format(quote(table)))]
+
+    def _create_table(self, table, dtype):
+        # Create a point table from the data types of a structured NumPy array, with its indexes
+        columns = ['{0} INTEGER PRIMARY KEY AUTOINCREMENT'.format(quote(FID_COL)),
+                   '{0} POINT'.format(quote(GEOM_COL)),
+                   '{0} TEXT'.format(quote(SITEVISIT_COL))]
+        columns += ['{0} {1}'.format(quote(name), sql_type(dtype[name])) for name in dtype.names]
+        self.conn.execute('CREATE TABLE {0} ({1})'.format(quote(table), ', '.join(columns)))
+        for col in INDEX_COLUMNS:
+            self.conn.execute('CREATE INDEX {0} ON {1} ({2})'.format(
+                quote('idx_{0}_{1}'.format(table, col)), quote(table), quote(col)))
+        self.conn.execute('INSERT INTO gpkg_contents (table_name, data_type, identifier, srs_id) '
+                          "VALUES (?, 'features', ?, ?)", (table, table, SRS_ID))
+        self.conn.execute("INSERT INTO gpkg_geometry_columns VALUES (?, ?, 'POINT', ?, 0, 0)",
+                          (table, GEOM_COL, SRS_ID))
+
+    def _add_columns(self, table, dtype):
+        # Add columns that are new to the table (i.e. vegetation types not in other site visits)
+        existing = set(col.lower() for col in self._columns(table))
+        for name in dtype.names:
+            if name.lower() not in existing:
+                self.conn.execute('ALTER TABLE {0} ADD COLUMN {1} {2}'.format(
+                    quote(table), quote(name), sql_type(dtype[name])))
+
+    def point_path(self, table, site_visit):
+        """ Path identifying the points of a site visit:  GeoPackage path / table / site visit """
+        return os.path.join(self.path, table, site_visit)
+
+    def path_exists(self, path):
+        """ Flag indicating that the points identified by a path from point_path exist """
+        table_path, site_visit = os.path.split(path)
+        return self.exists(os.path.basename(table_path), site_visit)
+
+    def exists(self, table, site_visit):
+        """ Flag indicating that the point table has points for the site visit """
+        if table not in self.tables:
+            return False
+        row = self.conn.execute('SELECT 1 FROM {0} WHERE {1} = ? LIMIT 1'.format(quote(table), quote(SITEVISIT_COL)),
+                                (site_visit,)).fetchone()
+        return row is not None
+
+    def write_points(self, table, site_visit, nparrays, xy_fields):
+        """ Replace the points of a site visit in a point table, creating or extending the table as needed
+        All chunks are written in one transaction
+
+        :param table: point table name
+        :param site_visit: site visit name (sitecode_YYYY_##)
+        :param nparrays: sequence of structured NumPy arrays of projected transect points
+        :param xy_fields: names of the x and y coordinate fields, which are stored as the point geometry
+        """
+        with self.conn:
+            if table in self.tables:
+                self.conn.execute('DELETE FROM {0} WHERE {1} = ?'.format(quote(table), quote(SITEVISIT_COL)),
+                                  (site_visit,))
+            for nparray in nparrays:
+                fields = [name for name in nparray.dtype.names if name not in xy_fields]
+                dtype = np.dtype([(name, nparray.dtype[name]) for name in fields])
+                if table in self.tables:
+                    self._add_columns(table, dtype)
+                else:
+                    self._create_table(table, dtype)
+                insert_sql = 'INSERT INTO {0} ({1}) VALUES ({2})'.format(
+                    quote(table), ', '.join(quote(col) for col in [GEOM_COL, SITEVISIT_COL] + fields),
+                    ', '.join(['?'] * (len(fields) + 2)))
+                for start in range(0, len(nparray), BATCH_ROWS):
+                    batch = nparray[start:start + BATCH_ROWS]
+                    columns = [point_blobs(batch[xy_fields[0]], batch[xy_fields[1]]), [site_visit] * len(batch)]
+                    columns += [sql_values(batch[name]) for name in fields]
+                    self.conn.executemany(insert_sql, zip(*columns))
+            self.conn.execute('UPDATE gpkg_contents SET last_change = ? WHERE table_name = ?',
+                              (datetime.datetime.utcnow().strftime(DATETIME_FORMAT)[:-4] + 'Z', table))
+
+    def survey_tables(self, year):
+        """ Dictionary of survey_ids (key) and the point table (value) the survey points are within """
+        _survey_tables = {}
+        for table in self.tables:
+            if table == table_name(year):
+                for row in self.conn.execute('SELECT DISTINCT survey_id FROM {0}'.format(quote(table))):
+                    _survey_tables[str(row[0])] = table
+        return _survey_tables
+
+    def survey_points(self, table, survey_id, field_names):
+        """ Points of a survey, in time order
+
+        :param table: point table name
+        :param survey_id: survey identifier
+        :param field_names: list of attribute columns
+        :return: tuple of fid list, x array, y array and dictionary of column name (key) and list of values (value)
+            Values of the date_time_samp column are datetime objects
+        """
+        sql = 'SELECT {0} FROM {1} WHERE survey_id = ? ORDER BY date_time_samp, {2}'.format(
+            ', '.join(quote(col) for col in [FID_COL, GEOM_COL] + field_names), quote(table), quote(FID_COL))
+        rows = self.conn.execute(sql, (survey_id,)).fetchall()
+        columns = list(zip(*rows)) if rows else [[]] * (len(field_names) + 2)
+        x, y = point_xy(columns[1])
+        values = dict(zip(field_names, [list(values) for values in columns[2:]]))
+        if 'date_time_samp' in values:
+            values['date_time_samp'] = [datetime.datetime.strptime(v, DATETIME_FORMAT) for v in values['date_time_samp']]
+        return list(columns[0]), x, y, values
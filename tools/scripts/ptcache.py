@@ -0,0 +1,237 @@
+# ptcache.py
+# 10/16/2026
+# Columnar cache of transect points, for fast reads of survey points in the statistics stage
+# Each site visit is stored as one NumPy .npy file per column, partitioned by year and site:
+#   cache_dir/YYYY/sitecode/sitecode_YYYY_##/<column>.npy
+# with an index of survey_id and row ranges for each year:  cache_dir/YYYY/index.json
+# The column files can be opened with np.load(mmap_mode='r'), so only the rows of a survey are read.
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+
+import os
+import json
+import shutil
+import numpy as np
+
+# File that marks a directory as a point cache
+CACHE_FILE = 'point_cache.json'
+CACHE_FORMAT = 1
+
+# Name of the index file in each year directory
+INDEX_FILE = 'index.json'
+
+# Columns added to the transect point columns
+X_COL = 'x'  # projected x coordinate
+Y_COL = 'y'  # projected y coordinate
+OID_COL = 'OID'  # Row number within the site visit, starting at 1 (returned by survey_points, not stored)
+
+SURVEYID_COL = 'survey_id'
+DATETIME_COL = 'date_time_samp'
+
+
+def is_cache(path):
+    """ Flag indicating that a path is a point cache directory """
+    return bool(path) and os.path.isfile(os.path.join(path, CACHE_FILE))
+
+
+def survey_ranges(survey_ids, offset=0):
+    """ List of [survey_id, start, stop] for each run of rows with the same survey_id
+
+    >>> survey_ranges(np.array(['a', 'a', 'b', 'b', 'b', 'a']), 10)
+    [['a', 10, 12], ['b', 12, 15], ['a', 15, 16]]
+    """
+    if not len(survey_ids):
+        return []
+    change = np.flatnonzero(survey_ids[1:] != survey_ids[:-1]) + 1
+    starts = np.concatenate(([0], change))
+    stops = np.concatenate((change, [len(survey_ids)]))
+    ids = survey_ids[starts]
+    if ids.dtype.kind == 'S':
+        ids = ids.astype('U')
+    return [[str(sid), int(start) + offset, int(stop) + offset] for sid, start, stop in zip(ids, starts, stops)]
+
+
+def write_json(data, json_file):
+    # Write a JSON file (also the csv2pt manifest and the survey summary)
+    # Write to a temporary file first, so an interrupted run does not leave a truncated file
+    temp_file = json_file + '.tmp'
+    with open(temp_file, 'w') as fh:
+        json.dump(data, fh, indent=1, sort_keys=True)
+    if os.path.exists(json_file):
+        os.remove(json_file)
+    os.rename(temp_file, json_file)
+
+
+class PointCache(object):
+    """ Represents a columnar cache of transect points, partitioned by year and site
+
+    Properties:
+    cache_dir -- full path to the cache directory
+    indexes -- dictionary of year (key) and survey index (value) for the years that have been read
+        survey index is a dictionary of survey_id (key) and list of [site visit directory, start, stop] (value)
+
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = os.path.normpath(cache_dir)
+        self.indexes = {}
+        self._columns = {}  # memory mapped columns, by site visit directory and column name
+
+    def create(self):
+        # Create the cache directory and its marker file, if they are new
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        if not is_cache(self.cache_dir):
+            write_json({'format': CACHE_FORMAT}, os.path.join(self.cache_dir, CACHE_FILE))
+        return self
+
+    def site_visit_dir(self, sitecode, site_visit):
+        """ Site visit directory, relative to the year directory """
+        return '/'.join([sitecode, site_visit])
+
+    def exists(self, year, sitecode, site_visit):
+        """ Flag indicating that the cache has points for the site visit """
+        return os.path.isdir(os.path.join(self.cache_dir, year, sitecode, site_visit))
+
+    def index(self, year):
+        """ Survey index for a year """
+        if year not in self.indexes:
+            index_file = os.path.join(self.cache_dir, year, INDEX_FILE)
+            if os.path.exists(index_file):
+                with open(index_file, 'r') as fh:
+                    self.indexes[year] = json.load(fh)
+            else:
+                self.indexes[year] = {}
+        return self.indexes[year]
+
+    def _update_index(self, year, sv_dir, ranges):
+        # Replace the index entries of a site visit with new row ranges, and save the index
+        index = self.index(year)
+        for survey_id in list(index):
+            index[survey_id] = [entry for entry in index[survey_id] if entry[0] != sv_dir]
+            if not index[survey_id]:
+                del index[survey_id]
+        for survey_id, start, stop in ranges:
+            index.setdefault(survey_id, []).append([sv_dir, start, stop])
+        write_json(index, os.path.join(self.cache_dir, year, INDEX_FILE))
+
+    def writer(self, year, sitecode, site_visit):
+        """ SiteVisitWriter object to replace the points of a site visit """
+        return SiteVisitWriter(self, year, sitecode, site_visit)
+
+    def survey_tables(self, year):
+        """ Dictionary of survey_ids (key) and the site visit directory (value) of their first rows """
+        return dict((survey_id, entries[0][0]) for survey_id, entries in self.index(year).items())
+
+    def column(self, year, sv_dir, name):
+        """ Memory mapped column of a site visit """
+        key = (year, sv_dir, name)
+        if key not in self._columns:
+            column_file = os.path.join(self.cache_dir, year, *(sv_dir.split('/') + [name + '.npy']))
+            self._columns[key] = np.load(column_file, mmap_mode='r')
+        return self._columns[key]
+
+    def survey_points(self, year, survey_id, field_names):
+        """ Points of a survey, in time order
+
+        :param year: survey year
+        :param survey_id: survey identifier
+        :param field_names: list of columns.  Include X_COL, Y_COL and OID_COL for the coordinates and row numbers
+        :return: dictionary of column name (key) and NumPy array (value)
+        """
+        entries = self.index(year).get(survey_id, [])
+        order = np.argsort(self._survey_column(year, entries, DATETIME_COL), kind='mergesort')
+        return dict((name, self._survey_column(year, entries, name)[order]) for name in field_names)
+
+    def _survey_column(self, year, entries, name):
+        # Rows of a column for a list of [site visit directory, start, stop]
+        parts = []
+        for sv_dir, start, stop in entries:
+            if name == OID_COL:
+                parts.append(np.arange(start + 1, stop + 1))
+            else:
+                parts.append(np.array(self.column(year, sv_dir, name)[start:stop]))
+        return np.concatenate(parts) if parts else np.array([])
+
+    def close(self):
+        # Release the memory mapped columns
+        self._columns = {}
+
+
+class SiteVisitWriter(object):
+    """ Writes the points of a site visit to a point cache, one chunk of rows at a time
+    The columns are written to a temporary directory that replaces the site visit directory on close
+
+    Properties:
+    sv_dir -- site visit directory, relative to the year directory
+    rows -- number of rows written
+    ranges -- list of [survey_id, start, stop] for the rows written
+
+    """
+
+    def __init__(self, point_cache, year, sitecode, site_visit):
+        self.point_cache = point_cache
+        self.year = year
+        self.sv_dir = point_cache.site_visit_dir(sitecode, site_visit)
+        self.out_dir = os.path.join(point_cache.cache_dir, year, sitecode, site_visit)
+        self.temp_dir = self.out_dir + '.tmp'
+        self.rows = 0
+        self.ranges = []
+        self._first = None  # First chunk, kept in memory in case it is the only one
+        self._files = {}  # Raw column data files, once there is more than one chunk
+        self._dtypes = {}
+
+    def append(self, nparray, x, y):
+        """ Add a chunk of rows:  structured NumPy array of transect points and arrays of projected x and y """
+        columns = [(name, nparray[name]) for name in nparray.dtype.names] + [(X_COL, x), (Y_COL, y)]
+        if self._first is None and not self._files:
+            self._first = columns
+        else:
+            if self._first is not None:
+                self._spill(self._first)
+                self._first = None
+            self._spill(columns)
+        for survey_id, start, stop in survey_ranges(nparray[SURVEYID_COL], self.rows):
+            if self.ranges and self.ranges[-1][0] == survey_id and self.ranges[-1][2] == start:
+                self.ranges[-1][2] = stop
+            else:
+                self.ranges.append([survey_id, start, stop])
+        self.rows += len(nparray)
+
+    def _spill(self, columns):
+        # Append columns to the raw data files
+        if not self._files:
+            self._make_temp_dir()
+        for name, values in columns:
+            if name not in self._files:
+                self._files[name] = open(os.path.join(self.temp_dir, name + '.bin'), 'wb')
+                self._dtypes[name] = values.dtype
+            np.ascontiguousarray(values).tofile(self._files[name])
+
+    def _make_temp_dir(self):
+        if os.path.isdir(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        os.makedirs(self.temp_dir)
+
+    def close(self):
+        """ Write the .npy column files, replace the site visit directory and update the survey index """
+        if self._files:
+            for name, fh in self._files.items():
+                fh.close()
+                raw_file = os.path.join(self.temp_dir, name + '.bin')
+                header = {'descr': np.lib.format.dtype_to_descr(self._dtypes[name]),
+                          'fortran_order': False,
+                          'shape': (self.rows,)}
+                with open(os.path.join(self.temp_dir, name + '.npy'), 'wb') as npy, open(raw_file, 'rb') as raw:
+                    np.lib.format.write_array_header_1_0(npy, header)
+                    shutil.copyfileobj(raw, npy)
+                os.remove(raw_file)
+            self._files = {}
+        else:
+            self._make_temp_dir()
+            for name, values in self._first or []:
+                np.save(os.path.join(self.temp_dir, name + '.npy'), np.ascontiguousarray(values))
+            self._first = None
+        if os.path.isdir(self.out_dir):
+            shutil.rmtree(self.out_dir)
+        os.rename(self.temp_dir, self.out_dir)
+        self.point_cache._update_index(self.year, self.sv_dir, self.ranges)
@@ -0,0 +1,184 @@
+# samppoly.py
+# 10/16/2026
+# Sample polygon membership of transect points, computed at ingest (see csv2pt)
+# Each point is tagged with the site_samp_id of the sample polygon that contains it, using a vectorized
+# ray casting (even-odd) test of the polygon edges after a bounding box prefilter.  Where a survey track crosses
+# a sample polygon boundary, the fraction along the segment from the previous point to the crossing is stored
+# at the point after the crossing, so the length of a track inside a polygon can be found without clipping.
+# Coordinates are projected x/y in the coordinate system of the polygons (see csv2pt.wa_south_xy)
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+
+import hashlib
+import numpy as np
+
+# Crossing fraction of a point where the segment from the previous point does not cross a polygon boundary
+NULL_CROSS = -9999
+
+# Number of points times polygon edges tested at once (limits the memory of the ray casting test)
+BLOCK_CELLS = 1000000
+
+
+def ring_edges(rings):
+    """ Tuple of x1, y1, x2, y2 arrays of the edges of a polygon, from its rings (lists of x, y vertices)
+    Rings may be closed (last vertex the same as the first) or not.  Holes are rings too (even-odd rule)
+
+    >>> [edge.tolist() for edge in ring_edges([[(0, 0), (10, 0), (0, 10)]])]
+    [[0.0, 10.0, 0.0], [0.0, 0.0, 10.0], [10.0, 0.0, 0.0], [0.0, 10.0, 0.0]]
+    """
+    starts, ends = [], []
+    for ring in rings:
+        vertices = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+        starts.append(vertices)
+        ends.append(np.roll(vertices, -1, axis=0))
+    if not starts:
+        return tuple(np.empty(0) for i in range(4))
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    return starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+
+
+def points_in_polygon(x, y, edges):
+    """ Flags of the points inside a polygon (ray casting to +x, even-odd rule)
+
+    >>> square = ring_edges([[(0, 0), (10, 0), (10, 10), (0, 10)], [(4, 4), (6, 4), (6, 6), (4, 6)]])
+    >>> points_in_polygon(np.array([2.0, 15.0, 2.0, 5.0]), np.array([2.0, 5.0, -1.0, 5.0]), square).tolist()
+    [True, False, False, False]
+    """
+    x1, y1, x2, y2 = edges
+    inside = np.zeros(len(x), dtype=bool)
+    step = max(1, BLOCK_CELLS // max(len(x1), 1))
+    for start in range(0, len(x), step):
+        px = x[start:start + step, np.newaxis]
+        py = y[start:start + step, np.newaxis]
+        # Edges that straddle the horizontal line through the point, and cross it to the right of the point
+        straddle = (y1 > py) != (y2 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            inside[start:start + step] = (straddle & (px < x_cross)).sum(axis=1) % 2 == 1
+    return inside
+
+
+def segment_crossing(x0, y0, x1, y1, edges):
+    """ Fraction along the segment from (x0, y0) to (x1, y1) of its first crossing of a polygon edge, or None
+    Only the first crossing is returned:  a segment that crosses the polygon boundary more than once
+    (i.e. cuts across a bay of the polygon) gives the fraction of the first crossing only
+
+    >>> square = ring_edges([[(0, 0), (10, 0), (10, 10), (0, 10)]])
+    >>> segment_crossing(5.0, 5.0, 15.0, 5.0, square)
+    0.5
+    >>> segment_crossing(-5.0, 5.0, 15.0, 5.0, square)
+    0.25
+    """
+    ex1, ey1, ex2, ey2 = edges
+    rx, ry = x1 - x0, y1 - y0
+    sx, sy = ex2 - ex1, ey2 - ey1
+    qx, qy = ex1 - x0, ey1 - y0
+    denom = rx * sy - ry * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (qx * sy - qy * sx) / denom
+        u = (qx * ry - qy * rx) / denom
+        hits = (denom != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    if not hits.any():
+        return None
+    return float(t[hits].min())
+
+
+class SamplePolygons(object):
+    """ Represents the sample polygons, and the site code and year of each sample (from site_samples)
+
+    Properties:
+    samp_ids -- list of site_samp_id of each polygon
+    edges -- list of edge arrays of each polygon (see ring_edges)
+    bboxes -- list of (xmin, ymin, xmax, ymax) of each polygon
+    samples -- dictionary of (site code, year) (key) and list of polygon indexes (value)
+    unassigned -- list of indexes of polygons without a site code and year (tested for every site visit)
+
+    """
+
+    def __init__(self):
+        self.samp_ids = []
+        self.edges = []
+        self.bboxes = []
+        self.samples = {}
+        self.unassigned = []
+        self._versions = {}
+
+    def __len__(self):
+        return len(self.samp_ids)
+
+    def add(self, samp_id, rings, site_code=None, year=None):
+        """ Add a sample polygon
+
+        :param samp_id: site_samp_id
+        :param rings: list of rings (lists of x, y vertices), including holes
+        :param site_code: site code of the sample (or None)
+        :param year: year of the sample (or None)
+        """
+        edges = ring_edges(rings)
+        if not len(edges[0]):
+            return
+        index = len(self.samp_ids)
+        self.samp_ids.append(samp_id)
+        self.edges.append(edges)
+        self.bboxes.append((edges[0].min(), edges[1].min(), edges[0].max(), edges[1].max()))
+        if site_code and year:
+            self.samples.setdefault((site_code.lower(), int(year)), []).append(index)
+        else:
+            self.unassigned.append(index)
+
+    def candidates(self, sitecode, year):
+        """ Indexes of the polygons that the points of a site visit are tested against """
+        return self.samples.get((sitecode.lower(), int(year)), []) + self.unassigned
+
+    def version(self, sitecode, year):
+        """ Version identifier of the polygons of a site visit (MD5 hash of their ids and vertices) """
+        key = (sitecode.lower(), int(year))
+        if key not in self._versions:
+            md5 = hashlib.md5()
+            for i in self.candidates(sitecode, year):
+                md5.update(self.samp_ids[i].encode('utf-8'))
+                for edge in self.edges[i]:
+                    md5.update(edge.tobytes())
+            self._versions[key] = md5.hexdigest()
+        return self._versions[key]
+
+    def locate(self, x, y, indexes):
+        """ Position in indexes of the polygon that contains each point (-1 outside all of them)
+        Only the points inside the bounding box of a polygon are tested.  Where polygons overlap,
+        the first one in indexes is used
+        """
+        location = np.empty(len(x), dtype=np.int32)
+        location.fill(-1)
+        for k, i in enumerate(indexes):
+            xmin, ymin, xmax, ymax = self.bboxes[i]
+            todo = np.flatnonzero((location == -1) & (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax))
+            if len(todo):
+                location[todo[points_in_polygon(x[todo], y[todo], self.edges[i])]] = k
+        return location
+
+    def crossings(self, x, y, location, new_track, indexes):
+        """ Fraction along the segment from the previous point to the first polygon boundary crossing
+        at each point where the polygon changes along a track (NULL_CROSS elsewhere)
+        Limits:  each point stores one crossing, so a segment that crosses more than one boundary records
+        only the first, and a segment that leaves a polygon and enters it again between two points
+        (both points in the same polygon) records none.  The track is then treated as inside the polygon
+        for the whole segment, and svysummary counts one crossing (or none) for it
+
+        :param x, y: projected coordinates of the points
+        :param location: positions of the containing polygons (see locate)
+        :param new_track: flags of the points that start a track (no segment from the previous point)
+        :param indexes: polygon indexes (see candidates)
+        """
+        fractions = np.empty(len(x), dtype=np.float64)
+        fractions.fill(NULL_CROSS)
+        changed = np.flatnonzero(~new_track[1:] & (location[1:] != location[:-1])) + 1
+        for j in changed.tolist():
+            # The segment leaves one polygon, enters another, or both
+            fraction = None
+            for k in (location[j - 1], location[j]):
+                if k >= 0:
+                    t = segment_crossing(x[j - 1], y[j - 1], x[j], y[j], self.edges[indexes[k]])
+                    if t is not None and (fraction is None or t < fraction):
+                        fraction = t
+            if fraction is not None:
+                fractions[j] = fraction
+        return fractions
@@ -10,12 +10,20 @@ import numpy as np
 import datetime
 import pandas as pd
 import svmpUtils as utils
+import gpkg
+import ptcache
+import costmodel
+import svysummary
 import arcpy
 import os
 import timeit
 
 arcpy.env.overwriteOutput = True
 
+# Survey points (thousands) per survey, for the cost model estimate of a sample that has not been processed before
+# (see sample_costs).  Replaced by the average in the cost model log once it has records
+KPOINTS_PER_SURVEY = 1.0
+
 
 def create_output_table(type, timestamp, suffix, gdb):
     if type == "site":
@@ -650,6 +658,8 @@ class Survey(object):
     ptfc_full -- full path to the point feature class containing the survey points
     ptfc_array -- Numpy array with survey points and attributes
     ptfc_list -- the numpy array as a list of lists (each internal list corresponds to a row in the source data)
+    summary -- entry of the survey in the survey summary written by csv2pt (see svysummary), or None
+        Used for the depths prior to clipping instead of the point data frame
 
     """
     def __init__(self, id, maxdepflag, mindepflag, sitevisit):
@@ -665,6 +675,7 @@ class Survey(object):
         self.ptfc_df = None
         self.lnfc_df = None
         self.pts_exist = False
+        self.summary = None
 
 
     def __repr__(self):
@@ -694,6 +705,28 @@ class Survey(object):
         df.sort([utils.surveyidCol, utils.datetimesampCol], inplace=True)
         self.ptfc_df = df
 
+    def set_ptgpkg_df(self, geopackage, pt_field_names):
+        """ Create a pandas dataframe of survey points and specified attributes from a GeoPackage point table
+            and set the ptfc_df property to that dataframe.  Points are returned in time order
+        """
+        field_names = [f for f in pt_field_names if f not in ('OID@', 'SHAPE@XY')]
+        fids, x, y, values = geopackage.survey_points(self.ptfc, self.id, field_names)
+        values['OID@'] = fids
+        values['SHAPE@XY'] = list(zip(x.tolist(), y.tolist()))
+        self.ptfc_df = pd.DataFrame(values, columns=pt_field_names)
+
+    def set_ptcache_df(self, point_cache, year, pt_field_names):
+        """ Create a pandas dataframe of survey points and specified attributes from a columnar point cache
+            and set the ptfc_df property to that dataframe.  Points are returned in time order
+        """
+        field_names = [f for f in pt_field_names if f not in ('OID@', 'SHAPE@XY')]
+        values = point_cache.survey_points(year, self.id, field_names + [ptcache.OID_COL, ptcache.X_COL, ptcache.Y_COL])
+        values['OID@'] = values.pop(ptcache.OID_COL)
+        values['SHAPE@XY'] = list(zip(values.pop(ptcache.X_COL).tolist(), values.pop(ptcache.Y_COL).tolist()))
+        if values[utils.surveyidCol].dtype.kind == 'S':
+            values[utils.surveyidCol] = values[utils.surveyidCol].astype('U')
+        self.ptfc_df = pd.DataFrame(values, columns=pt_field_names)
+
     @property
     def ptfc_list(self):
         """ Returns the point feature array as a list"""
@@ -707,6 +740,8 @@ class Survey(object):
         """ Maximum (i.e., deepest) depth on the survey line, prior to clipping
             Must have video = 1, and not be the null depth value ( depInterp != -9999)
         """
+        if self.summary is not None:
+            return svysummary.survey_depths(self.summary)[0]
         if self.ptfc_df is not None:
             df = self.ptfc_df[(self.ptfc_df[utils.videoCol] == 1) & (self.ptfc_df[utils.depInterpCol] != utils.NULL_DEPTH)]
             return df[utils.depInterpCol].min()
@@ -718,6 +753,8 @@ class Survey(object):
         """ Minimum depth (i.e. shallowest) on the survey line, prior to clipping
             Must have video = 1, and not be the null depth value ( depInterp != -9999)
         """
+        if self.summary is not None:
+            return svysummary.survey_depths(self.summary)[1]
         if self.ptfc_df is not None:
             df = self.ptfc_df[(self.ptfc_df[utils.videoCol] == 1) & (self.ptfc_df[utils.depInterpCol] != utils.NULL_DEPTH)]
             return df[utils.depInterpCol].max()
@@ -729,6 +766,9 @@ class Survey(object):
         """ Maximum (i.e., deepest) depth of selected veg_code on the survey line, prior to clipping
             Must have video = 1, and not be the null depth value ( depInterp != -9999)
         """
+        veg_depths = self._summary_veg_depths()
+        if veg_depths is not None:
+            return veg_depths[0]
         if self.ptfc_df is not None:
             df = self.ptfc_df[(self.ptfc_df[utils.videoCol] == 1) & (self.ptfc_df[utils.depInterpCol] != utils.NULL_DEPTH)
                               & (self.ptfc_df[self.veg_code] == 1)]
@@ -744,6 +784,9 @@ class Survey(object):
         """ Maximum (i.e., deepest) depth of selected veg_code on the survey line, prior to clipping
             Must have video = 1, and not be the null depth value ( depInterp != -9999)
         """
+        veg_depths = self._summary_veg_depths()
+        if veg_depths is not None:
+            return veg_depths[1]
         if self.ptfc_df is not None:
             df = self.ptfc_df[(self.ptfc_df[utils.videoCol] == 1) & (self.ptfc_df[utils.depInterpCol] != utils.NULL_DEPTH)
                               & (self.ptfc_df[self.veg_code] == 1)]
@@ -754,6 +797,14 @@ class Survey(object):
         else:
             return None
 
+    def _summary_veg_depths(self):
+        """ Minimum and maximum depth of the selected veg_code from the survey summary,
+            or None if the survey or veg_code is not summarized
+        """
+        if self.summary is not None:
+            return svysummary.survey_depths(self.summary, self.veg_code)
+        return None
+
     @property
     def len(self):
         """ Total Length of the clipped survey line
@@ -931,6 +982,67 @@ class SurveyFCPtGroup(object):
                 _survey_fc[survey] = fc
         return _survey_fc
 
+    def set_survey_df(self, survey, pt_field_names):
+        """ Set the point data frame of a survey from its feature class """
+        survey.set_ptfc_df(pt_field_names)
+
+    def close(self):
+        pass
+
+
+class SurveyGpkgPtGroup(object):
+    """ Represents the Survey Point table for a particular year within a GeoPackage (see gpkg.GeoPackage)
+    Alternative to SurveyFCPtGroup.  The survey ids come from the indexed survey_id column of one table,
+    instead of scanning every feature class
+
+    Properties:
+    gdb -- GeoPackage with transect point tables
+    year -- year of interest
+    geopackage -- open gpkg.GeoPackage object
+    survey_fc -- dictionary of survey ids (key) and point table (value)
+
+    """
+
+    def __init__(self, gdb, year):
+        self.gdb = gdb
+        self.year = year
+        self.geopackage = gpkg.GeoPackage(gdb).open()
+        self.survey_fc = self.geopackage.survey_tables(year)
+
+    def set_survey_df(self, survey, pt_field_names):
+        """ Set the point data frame of a survey from its point table """
+        survey.set_ptgpkg_df(self.geopackage, pt_field_names)
+
+    def close(self):
+        self.geopackage.close()
+
+
+class SurveyCachePtGroup(object):
+    """ Represents the Survey Points for a particular year within a columnar point cache (see ptcache.PointCache)
+    Alternative to SurveyFCPtGroup.  The survey ids and their row ranges come from the index for the year,
+    and survey points are read from memory mapped column files
+
+    Properties:
+    gdb -- point cache directory
+    year -- year of interest
+    point_cache -- ptcache.PointCache object
+    survey_fc -- dictionary of survey ids (key) and site visit directory (value)
+
+    """
+
+    def __init__(self, gdb, year):
+        self.gdb = gdb
+        self.year = year
+        self.point_cache = ptcache.PointCache(gdb)
+        self.survey_fc = self.point_cache.survey_tables(year)
+
+    def set_survey_df(self, survey, pt_field_names):
+        """ Set the point data frame of a survey from the cached columns """
+        survey.set_ptcache_df(self.point_cache, self.year, pt_field_names)
+
+    def close(self):
+        self.point_cache.close()
+
 
 class SamplePoly(object):
     """ Represents an individual sample polygon
@@ -1093,6 +1205,17 @@ def make_sitelist(sites_file):
     site_list = [line.strip() for line in open(sites_file,'r') if not line.isspace()]
     return site_list
 
+def sample_costs(cost_model, sample):
+    """ Features of a sample for the cost model (see costmodel):  number of surveys and survey points (thousands)
+    The points are from the last run of the sample in the cost model log, or estimated from the number of surveys
+    """
+    n_surveys = sum(len(transect.surveys) for transect in sample.transects)
+    kpoints = cost_model.known(costmodel.STATSDB, sample.id, 'kpoints')
+    if kpoints is None:
+        kpoints = n_surveys * cost_model.ratio(costmodel.STATSDB, 'kpoints', 'surveys', KPOINTS_PER_SURVEY)
+    return {'surveys': n_surveys, 'kpoints': kpoints}
+
+
 def del_fc(fc):
     if arcpy.Exists(fc):
         arcpy.Delete_management(fc)
@@ -1226,7 +1349,16 @@ def main(transect_gdb, svmp_gdb, stats_gdb, survey_year, veg_code, sites_file, s
     # # ------- List of available point feature classes and associated survey_ids -------
     #  NOTE:  This is quite slow -- may be able to improve by re-writing with da.Walk approach
     msg("Generating list of point transect features in {0}".format(transect_gdb))
-    surveypt_fcs = SurveyFCPtGroup(transect_gdb, survey_year)
+    if ptcache.is_cache(transect_gdb):
+        surveypt_fcs = SurveyCachePtGroup(transect_gdb, survey_year)
+    elif gpkg.is_gpkg(transect_gdb):
+        surveypt_fcs = SurveyGpkgPtGroup(transect_gdb, survey_year)
+    else:
+        surveypt_fcs = SurveyFCPtGroup(transect_gdb, survey_year)
+    # Per-survey depths written by csv2pt, so the point data are only needed for the transect lines
+    survey_summary = svysummary.SurveySummary(transect_gdb).load()
+    if survey_summary.surveys:
+        msg("Using survey summary {0}".format(survey_summary.summary_file))
 
     # -----------------  Fields for Transect Line feature classes
     # Base Field names (without Object ID and Shape fields), field types, and lengths
@@ -1241,7 +1373,9 @@ def main(transect_gdb, svmp_gdb, stats_gdb, survey_year, veg_code, sites_file, s
 
     #----- Create the template feature class for the temporary transect lines
     msg("Creating a template feature class for temporary transect lines")
-    template_ln = create_template_ln(transect_gdb, base_field_names, base_field_types, base_field_lengths)
+    # Points in a GeoPackage or point cache are read only, so the template goes in the statistics geodatabase
+    template_gdb = transect_gdb if isinstance(surveypt_fcs, SurveyFCPtGroup) else stats_gdb
+    template_ln = create_template_ln(template_gdb, base_field_names, base_field_types, base_field_lengths)
 
     # ----------- Initialize dictionary to hold transect and site results
     transect_results = {}
@@ -1262,6 +1396,10 @@ def main(transect_gdb, svmp_gdb, stats_gdb, survey_year, veg_code, sites_file, s
         samp_vegatnst
     ]
 
+    # Processing time of each sample, estimated from its size and logged with the actual time (see costmodel)
+    cost_model = costmodel.CostModel(os.path.join(os.path.dirname(os.path.abspath(stats_gdb)),
+                                                  costmodel.LOG_FILE)).load()
+
     # -------  Process all sample groups and calculate associated statistics --------------
     for samp_group in samp_groups:
         if samp_group.samples:
@@ -1277,6 +1415,9 @@ def main(transect_gdb, svmp_gdb, stats_gdb, survey_year, veg_code, sites_file, s
                 site_results[site_results_id] = [site_results_id, sample.id, sample.veg_code] + utils.site_results_zero
             #---- Calculate transect results
             elif samp_group.stats in ("ts","t"):
+                sample_start = timeit.default_timer()
+                costs = sample_costs(cost_model, sample)
+                estimate = cost_model.estimate(costmodel.STATSDB, costs)
                 # Create an empty line feature class for the sample transects/surveys
                 lnfc_path = sample.make_line_fc(template_ln) # output to in-memory workspace
 
@@ -1297,7 +1438,8 @@ def main(transect_gdb, svmp_gdb, stats_gdb, survey_year, veg_code, sites_file, s
                             continue
 
                         # Get pandas data frame of the survey's points and specified attributes
-                        survey.set_ptfc_df(pt_field_names)
+                        surveypt_fcs.set_survey_df(survey, pt_field_names)
+                        survey.summary = survey_summary.get(survey.id)
                         # Create a line feature from the point data frame
                         survey.make_line_feature_df(lnfc_path, ln_field_names)
 
@@ -1381,6 +1523,16 @@ def main(transect_gdb, svmp_gdb, stats_gdb, survey_year, veg_code, sites_file, s
                 del_fc(sample.lnfc_path)
                 del_fc(sample.lnfc_clip_path)
 
+                # Log the estimated and actual processing time of the sample
+                costs['kpoints'] = sum(len(survey.ptfc_df) for transect in sample.transects
+                                       for survey in transect.surveys if survey.ptfc_df is not None) / 1000.0
+                cost_model.record(costmodel.STATSDB, sample.id, costs, estimate, timeit.default_timer() - sample_start)
+
+    n_samples, estimated, actual = cost_model.summary(costmodel.STATSDB)
+    if n_samples:
+        msg("Processed {0} samples in {1:.1f} seconds (estimated {2:.1f})".format(n_samples, actual, estimated))
+    cost_model.save()
+
     # -------------------- Populate Results Tables ----------------------------
     timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
 
@@ -1420,6 +1572,7 @@ def main(transect_gdb, svmp_gdb, stats_gdb, survey_year, veg_code, sites_file, s
 
     # Remove template line feature class
     del_fc(template_ln)
+    surveypt_fcs.close()
 
     main_elapsed = timeit.default_timer() - main_start_time
     main_elapsed_mins = main_elapsed / 60
@@ -1428,7 +1581,8 @@ def main(transect_gdb, svmp_gdb, stats_gdb, survey_year, veg_code, sites_file, s
 
 if __name__ == '__main__':
 
-    # Input parameter 1:  Geodatabase with individual transect point data -- REQUIRED
+    # Input parameter 1:  Geodatabase with individual transect point data, GeoPackage (.gpkg)
+    # or point cache directory -- REQUIRED
     # transect_gdb = "Y:/projects/dnr_svmp2016/data/svmp_pt_data/svmptoolsv4_td2fc_testing_11-15.mdb"
     transect_gdb = "Y:/projects/dnr_svmp2016/data/svmp_pt_data/svmptoolsv4_td2fc_testing_2014_2015.mdb"
     # transect_gdb = "Y:/projects/dnr_svmp2016/db/no_results_site_data/tran_points_NO_RESULTS.mdb"
@@ -0,0 +1,241 @@
+# svysummary.py
+# 10/16/2026
+# Per-survey summary of transect points, written by csv2pt as the points are converted and read by statsdb
+# For each survey:  number of points, time span, bounding box (decimal degrees), minimum and maximum valid depth,
+# and minimum and maximum depth where each vegetation code is present.  Valid depths have video = 1
+# and are not null, the same points used by the unclipped depth statistics of statsdb.Survey
+# Points tagged with their sample polygon (see samppoly) also give the samples of each survey
+# and the number of sample polygon boundary crossings
+# Stored as a JSON file next to the point output (geodatabase, GeoPackage or point cache directory):
+#   <output name>_survey_summary.json
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+
+import os
+import json
+import datetime
+import numpy as np
+import ptcache
+
+SUMMARY_SUFFIX = '_survey_summary.json'
+SUMMARY_FORMAT = 1
+
+# Transect point columns (see csv2pt)
+SURVEYID_COL = 'survey_id'
+DATETIME_COL = 'date_time_samp'
+LAT_COL = 'latitude'
+LON_COL = 'lon'
+DEPTH_COL = 'depth_interp'
+VIDEO_COL = 'video'
+SAMPID_COL = 'site_samp_id'
+CROSS_COL = 'samp_cross'
+
+NULL_DEPTH = -9999
+NULL_CROSS = -9999
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def summary_file(out_path):
+    """ Full path to the summary file of a point output (geodatabase, GeoPackage or point cache directory)
+
+    >>> summary_file('/data/svmp_pts.gdb').replace(os.sep, '/')
+    '/data/svmp_pts_survey_summary.json'
+    """
+    out_dir, out_name = os.path.split(os.path.normpath(out_path))
+    return os.path.join(out_dir, os.path.splitext(out_name)[0] + SUMMARY_SUFFIX)
+
+
+def _value(number):
+    # JSON value of a float (None for NaN)
+    return None if np.isnan(number) else float(number)
+
+
+def _depth(value):
+    # Depth from a JSON value (NaN for None, like the minimum or maximum of no points)
+    return np.nan if value is None else value
+
+
+def _timestamp(microseconds):
+    # ISO time stamp from int64 microseconds
+    return (EPOCH + datetime.timedelta(microseconds=int(microseconds))).isoformat(' ')
+
+
+def survey_depths(entry, veg_code=None):
+    """ Tuple of minimum and maximum valid depth of a survey summary entry, or of the points with a vegetation code
+    NaN where the survey has no such points, or None if the vegetation code is not in the summary
+    """
+    if veg_code is None:
+        return _depth(entry['depth_min']), _depth(entry['depth_max'])
+    if veg_code not in entry['veg']:
+        return None
+    return tuple(_depth(value) for value in entry['veg'][veg_code])
+
+
+class SiteVisitSummary(object):
+    """ Accumulates the per-survey summary of the transect points of a site visit, one array (or chunk) at a time
+
+    Properties:
+    veg_names -- list of vegetation columns to summarize (columns missing from the points are skipped)
+    surveys -- dictionary of survey_id (key) and list of values (value):  number of points, start and end time
+        (int64 microseconds), minimum and maximum latitude and longitude, minimum and maximum valid depth,
+        and dictionary of vegetation code (key) and minimum and maximum depth of presence (value)
+    samples -- dictionary of survey_id (key) and set of site_samp_id and number of boundary crossings (value),
+        for points tagged with their sample polygon
+
+    """
+
+    def __init__(self, veg_names):
+        self.veg_names = list(veg_names)
+        self.surveys = {}
+        self.samples = {}
+
+    def add(self, nparray):
+        """ Add a structured NumPy array of transect points to the summary """
+        if not len(nparray):
+            return
+        # Rows are in transect and time order, so each survey is a run of rows (or a few, across chunks)
+        survey_ids = nparray[SURVEYID_COL]
+        starts = np.concatenate(([0], np.flatnonzero(survey_ids[1:] != survey_ids[:-1]) + 1))
+        counts = np.diff(np.concatenate((starts, [len(nparray)])))
+        times = nparray[DATETIME_COL].astype('<M8[us]').view(np.int64)
+        depth = nparray[DEPTH_COL].astype(np.float64)
+        valid = (nparray[VIDEO_COL] == 1) & (depth != NULL_DEPTH) & ~np.isnan(depth)
+        valid_depth = np.where(valid, depth, np.nan)
+        columns = [
+            np.minimum.reduceat(times, starts), np.maximum.reduceat(times, starts),
+            np.fmin.reduceat(nparray[LAT_COL], starts), np.fmax.reduceat(nparray[LAT_COL], starts),
+            np.fmin.reduceat(nparray[LON_COL], starts), np.fmax.reduceat(nparray[LON_COL], starts),
+            np.fmin.reduceat(valid_depth, starts), np.fmax.reduceat(valid_depth, starts),
+        ]
+        veg_names = [name for name in self.veg_names if name in nparray.dtype.names]
+        veg_columns = []
+        for name in veg_names:
+            veg_depth = np.where(valid & (nparray[name] == 1), depth, np.nan)
+            veg_columns.append((np.fmin.reduceat(veg_depth, starts), np.fmax.reduceat(veg_depth, starts)))
+
+        for i, survey_id in enumerate(survey_ids[starts].tolist()):
+            values = [int(counts[i])] + [column[i] for column in columns]
+            veg = dict((name, [mins[i], maxs[i]]) for name, (mins, maxs) in zip(veg_names, veg_columns))
+            if survey_id in self.surveys:
+                values, veg = self._merge(self.surveys[survey_id], values, veg)
+            self.surveys[survey_id] = values + [veg]
+
+        if SAMPID_COL in nparray.dtype.names:
+            for survey_id, start, count in zip(survey_ids[starts].tolist(), starts.tolist(), counts.tolist()):
+                rows = slice(start, start + count)
+                samp_ids, n_crossings = self.samples.setdefault(survey_id, [set(), 0])
+                samp_ids.update(samp_id for samp_id in np.unique(nparray[SAMPID_COL][rows]).tolist() if samp_id)
+                self.samples[survey_id][1] = n_crossings + int((nparray[CROSS_COL][rows] != NULL_CROSS).sum())
+
+    @staticmethod
+    def _merge(current, values, veg):
+        # Combine the values of a survey from another run of rows with the values so far
+        merged = [current[0] + values[0]]
+        for i in range(1, len(values)):
+            # Odd positions are minimums, even positions are maximums
+            merged.append(np.fmin(current[i], values[i]) if i % 2 else np.fmax(current[i], values[i]))
+        merged_veg = dict(current[-1])
+        for name, (low, high) in veg.items():
+            old_low, old_high = merged_veg.get(name, (np.nan, np.nan))
+            merged_veg[name] = [np.fmin(old_low, low), np.fmax(old_high, high)]
+        return merged, merged_veg
+
+    def entries(self, site_visit):
+        """ Dictionary of survey_id (key) and summary entry (value) for the survey summary file """
+        _entries = {}
+        for survey_id, values in self.surveys.items():
+            n_points, start, end, lat_min, lat_max, lon_min, lon_max, depth_min, depth_max, veg = values
+            _entries[survey_id] = {
+                'site_visit': site_visit,
+                'n_points': n_points,
+                'start': _timestamp(start),
+                'end': _timestamp(end),
+                'lat_min': _value(lat_min),
+                'lat_max': _value(lat_max),
+                'lon_min': _value(lon_min),
+                'lon_max': _value(lon_max),
+                'depth_min': _value(depth_min),
+                'depth_max': _value(depth_max),
+                'veg': dict((name, [_value(low), _value(high)]) for name, (low, high) in veg.items()),
+            }
+            if survey_id in self.samples:
+                samp_ids, n_crossings = self.samples[survey_id]
+                _entries[survey_id]['samples'] = sorted(samp_ids)
+                _entries[survey_id]['n_crossings'] = n_crossings
+        return _entries
+
+
+class SurveySummary(object):
+    """ Represents the survey summary file of a point output
+
+    Properties:
+    summary_file -- full path to the summary file
+    surveys -- dictionary of survey_id (key) and summary entry (value, see SiteVisitSummary.entries)
+    site_visits -- dictionary of site visit (key) and list of its survey_ids (value)
+    changed -- flag indicating the summary has changed since it was loaded
+
+    """
+
+    def __init__(self, out_path):
+        self.summary_file = summary_file(out_path)
+        self.surveys = {}
+        self.site_visits = {}
+        self.changed = False
+
+    def load(self):
+        # Read the summary file, if there is one
+        if os.path.exists(self.summary_file):
+            try:
+                with open(self.summary_file, 'r') as fh:
+                    data = json.load(fh)
+                if data.get('format') == SUMMARY_FORMAT:
+                    self.surveys = data['surveys']
+                    self.site_visits = data['site_visits']
+            except (ValueError, KeyError):
+                # Unreadable summary -- statsdb reads the points instead
+                self.surveys = {}
+                self.site_visits = {}
+        return self
+
+    def save(self):
+        if not self.changed:
+            return
+        ptcache.write_json({'format': SUMMARY_FORMAT, 'site_visits': self.site_visits, 'surveys': self.surveys},
+                           self.summary_file)
+        self.changed = False
+
+    def has_site_visit(self, site_visit):
+        """ Flag indicating the surveys of a site visit are in the summary """
+        return site_visit in self.site_visits
+
+    def replace(self, site_visit, entries):
+        # Replace the surveys of a site visit with new summary entries
+        for survey_id in self.site_visits.pop(site_visit, []):
+            if self.surveys.get(survey_id, {}).get('site_visit') == site_visit:
+                del self.surveys[survey_id]
+        self.surveys.update(entries)
+        self.site_visits[site_visit] = sorted(entries)
+        self.changed = True
+
+    def get(self, survey_id):
+        """ Summary entry of a survey, or None """
+        return self.surveys.get(survey_id)
+
+
+def summarize(nparrays, summaries, site_visit, veg_names):
+    """ Pass structured NumPy arrays of transect points through, while summarizing their surveys
+    The surveys of the site visit are replaced in each survey summary after the last array
+
+    :param nparrays: sequence of structured NumPy arrays for a site visit, or of tuples that start with
+        the array (i.e. with its projected x and y, see csv2pt.project_points)
+    :param summaries: list of SurveySummary objects
+    :param site_visit: site visit name (i.e. core001_2014_01)
+    :param veg_names: list of vegetation columns
+    """
+    site_visit_summary = SiteVisitSummary(veg_names)
+    for nparray in nparrays:
+        site_visit_summary.add(nparray[0] if isinstance(nparray, tuple) else nparray)
+        yield nparray
+    entries = site_visit_summary.entries(site_visit)
+    for summary in summaries:
+        summary.replace(site_visit, entries)
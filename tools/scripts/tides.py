@@ -0,0 +1,106 @@
+# tides.py
+# 10/16/2026
+# Tide heights from local tide tables, for reducing transect depths to MLLW during csv2pt ingest
+# Each tide station is a csv file of time and tide height (meters above MLLW), i.e. a NOAA CO-OPS download:
+#   Date Time, Water Level
+#   2014-06-01 00:00,1.234
+# Times must be in the same time zone as the transect data files.
+# Sites are mapped to stations by a csv file of site code and station, in the same directory as the station files:
+#   site_code,station
+#   core001,9447130
+# where the station file is <station>.csv (or the station is a csv file name)
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+
+import os
+import csv
+import numpy as np
+import pandas as pd
+
+# Tide heights are not interpolated across gaps in a station file longer than this (minutes)
+MAX_GAP_MINUTES = 60
+
+# Tide station series already read in this process:  station file (key), (times, heights) (value)
+_series = {}
+
+
+def read_stations(stations_file):
+    """ Dictionary of site code (key, lower case) and station file path (value) from a site to station file
+    Blank lines, comment lines (#) and a site_code header line are skipped
+
+    :param stations_file: csv file of site code and station
+    :return: dictionary of site code and full path to the station file
+    """
+    base_dir = os.path.dirname(os.path.abspath(stations_file))
+    stations = {}
+    missing = set()
+    with open(stations_file, 'r') as fh:
+        for row in csv.reader(fh):
+            if len(row) < 2 or row[0].strip().startswith('#') or row[0].strip().lower() == 'site_code':
+                continue
+            site_code, station = row[0].strip().lower(), row[1].strip()
+            if not station.lower().endswith('.csv'):
+                station += '.csv'
+            station_file = os.path.join(base_dir, station)
+            if not os.path.isfile(station_file):
+                missing.add(station_file)
+            stations[site_code] = station_file
+    if missing:
+        raise ValueError("Tide station files not found: {0}".format(', '.join(sorted(missing))))
+    return stations
+
+
+def station_series(station_file):
+    """ Time stamps (int64 microseconds, sorted) and tide heights (float64) of a station file
+    Rows without a height are dropped.  Each station file is read once per process
+    """
+    if station_file not in _series:
+        df = pd.read_csv(station_file, usecols=[0, 1], skipinitialspace=True)
+        times = pd.to_datetime(df.iloc[:, 0]).values.astype('<M8[us]').view(np.int64)
+        heights = df.iloc[:, 1].values.astype(np.float64)
+        keep = ~np.isnan(heights)
+        order = np.argsort(times[keep], kind='mergesort')
+        _series[station_file] = (times[keep][order], heights[keep][order])
+    return _series[station_file]
+
+
+def interp_max_gap(x, xp, fp, max_gap):
+    """ Linear interpolation (np.interp) that does not extrapolate or bridge long gaps:  NaN for points outside
+    the sample points, or between two sample points more than max_gap apart (unless at a sample point)
+    Also used by csv2pt to fill missing depths from the observed depths of a transect
+
+    >>> interp_max_gap(np.array([0, 5, 15, 25, 30, 40]), np.array([10, 20, 30]), np.array([1.0, 2.0, 4.0]), 10).tolist()
+    [nan, nan, 1.5, 3.0, 4.0, nan]
+    >>> interp_max_gap(np.array([15, 25]), np.array([10, 20, 30]), np.array([1.0, 2.0, 4.0]), 5).tolist()
+    [nan, nan]
+
+    :param x: points to interpolate at
+    :param xp: sample points, sorted
+    :param fp: values at the sample points
+    :param max_gap: longest gap between sample points that is interpolated across
+    :return: float64 array of interpolated values
+    """
+    x, xp = np.asarray(x), np.asarray(xp)
+    if not len(xp):
+        return np.empty(len(x)) * np.nan
+    values = np.interp(x.astype(np.float64), xp.astype(np.float64), fp)
+    # Sample points at or before, and after each point
+    pos = np.searchsorted(xp, x, side='right')
+    before = np.maximum(pos - 1, 0)
+    after = np.minimum(pos, len(xp) - 1)
+    exact = (pos > 0) & (xp[before] == x)
+    inside = (pos > 0) & (pos < len(xp)) & (xp[after] - xp[before] <= max_gap)
+    values[~(exact | inside)] = np.nan
+    return values
+
+
+def tide_heights(station_file, timestamps):
+    """ Tide heights at time stamps, interpolated linearly in time from a station file
+    NaN for time stamps outside the station file, or in a gap of more than MAX_GAP_MINUTES
+
+    :param station_file: full path to the station file
+    :param timestamps: int64 microseconds
+    :return: float64 array of tide heights
+    """
+    times, heights = station_series(station_file)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    return interp_max_gap(timestamps, times, heights, MAX_GAP_MINUTES * 60 * 1e6)
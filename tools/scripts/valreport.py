@@ -0,0 +1,136 @@
+# valreport.py
+# 10/16/2026
+# Store the errors and data validation warnings of csv2pt runs in a SQLite database, for queries across sites and years
+# Complements the csv log files.  Rows flagged by a finding are stored as ranges of consecutive row numbers,
+# so a finding for thousands of rows is usually a few records.
+# Developed in ArcGIS provided Python 2.7, NumPy 1.9.3
+#
+# Tables:
+#   runs -- one record per csv2pt run:  run_id, run_time, in_dir
+#   files -- one record per csv file (or site directory with errors) processed in a run:
+#       file_id, run_id, directory, file_name, site_code, year, valid
+#   findings -- one record per finding and range of rows:
+#       file_id, log_type ('error' or 'warning'), finding_type, details, row_start, row_stop (inclusive)
+#       row_start and row_stop are NULL for findings about the whole file
+# View:
+#   current_findings -- findings with their file information, from the most recent run of each file
+
+import os
+import sqlite3
+import datetime
+import numpy as np
+
+# Number of records written per executemany call
+BATCH_ROWS = 10000
+
+# Values of the log_type column
+ERROR = 'error'
+WARNING = 'warning'
+
+
+def row_ranges(rows):
+    """ List of (start, stop) for the runs of consecutive numbers in a list of row numbers, stop is inclusive
+    Duplicates are dropped and the ranges are in row order
+
+    >>> row_ranges([7, 1, 2, 3, 5, 6, 3, 10])
+    [(1, 3), (5, 7), (10, 10)]
+    """
+    _rows = np.unique(np.asarray(rows, dtype=np.int64))
+    if not len(_rows):
+        return []
+    breaks = np.flatnonzero(np.diff(_rows) != 1) + 1
+    starts = _rows[np.concatenate(([0], breaks))]
+    stops = _rows[np.concatenate((breaks - 1, [len(_rows) - 1]))]
+    return list(zip(starts.tolist(), stops.tolist()))
+
+
+class ValidationReport(object):
+    """ Represents a SQLite database of the findings of csv2pt runs
+    Records are buffered and written in batches.  Call flush or close to write the remaining records
+
+    Properties:
+    path -- full path to the database file
+    conn -- sqlite3 connection to the database (None until opened)
+    run_id -- identifier of the current run (set by open)
+
+    """
+
+    def __init__(self, path):
+        self.path = os.path.normpath(path)
+        self.conn = None
+        self.run_id = None
+        self._next_file_id = None
+        self._files = []  # buffered files records
+        self._findings = []  # buffered findings records
+
+    def open(self, in_dir=None):
+        # Connect to the database, create the tables if it is new, and start a new run
+        self.conn = sqlite3.connect(self.path)
+        with self.conn:
+            self._create_tables()
+            cursor = self.conn.execute('INSERT INTO runs (run_time, in_dir) VALUES (?, ?)',
+                                       (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), in_dir))
+            self.run_id = cursor.lastrowid
+        self._next_file_id = (self.conn.execute('SELECT max(file_id) FROM files').fetchone()[0] or 0) + 1
+        return self
+
+    def close(self):
+        if self.conn:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+    def _create_tables(self):
+        self.conn.execute('CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                          'run_time TEXT, in_dir TEXT)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS files (file_id INTEGER PRIMARY KEY, run_id INTEGER, '
+                          'directory TEXT, file_name TEXT, site_code TEXT, year TEXT, valid INTEGER)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS findings (file_id INTEGER, log_type TEXT, '
+                          'finding_type TEXT, details TEXT, row_start INTEGER, row_stop INTEGER)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_files_path ON files (directory, file_name)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_files_site ON files (year, site_code)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_findings_file ON findings (file_id)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_findings_type ON findings (finding_type)')
+        self.conn.execute(
+            'CREATE VIEW IF NOT EXISTS current_findings AS '
+            'SELECT f.run_id, f.directory, f.file_name, f.site_code, f.year, f.valid, '
+            'x.log_type, x.finding_type, x.details, x.row_start, x.row_stop '
+            'FROM files f JOIN findings x ON x.file_id = f.file_id '
+            'WHERE f.file_id = (SELECT max(file_id) FROM files g '
+            'WHERE g.directory = f.directory AND g.file_name = f.file_name)')
+
+    def add_file(self, directory, file_name, valid, errors=(), warnings=()):
+        """ Add a processed csv file (or site directory) and its findings
+
+        :param directory: directory of the csv file
+        :param file_name: csv file name (search pattern for a site directory error)
+        :param valid: flag indicating that the csv file is valid
+        :param errors: list of error findings:  (directory, file name, type, rows, details) as built by LogFile
+        :param warnings: list of warning findings, same as errors
+        """
+        file_id = self._next_file_id
+        self._next_file_id += 1
+        # Site code and year from the file name (sitecode_YYYY_##_TD.csv), or the site directory name
+        parts = file_name.split('_')
+        site_code = parts[0].lower() if len(parts) > 2 else os.path.basename(directory).lower()
+        year = parts[1] if len(parts) > 2 and parts[1].isdigit() else None
+        self._files.append((file_id, self.run_id, directory, file_name, site_code, year, int(bool(valid))))
+        for log_type, findings in ((ERROR, errors), (WARNING, warnings)):
+            for finding_dir, finding_file, finding_type, rows, details in findings:
+                if not rows:
+                    self._findings.append((file_id, log_type, finding_type, details or None, None, None))
+                else:
+                    for start, stop in row_ranges(rows):
+                        self._findings.append((file_id, log_type, finding_type, None, start, stop))
+        if len(self._findings) >= BATCH_ROWS or len(self._files) >= BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        # Write the buffered records in one transaction
+        if not self._files and not self._findings:
+            return
+        with self.conn:
+            self.conn.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)', self._files)
+            self.conn.executemany('INSERT INTO findings VALUES (?, ?, ?, ?, ?, ?)', self._findings)
+        self._files = []
+        self._findings = []